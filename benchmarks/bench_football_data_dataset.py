@@ -0,0 +1,69 @@
+"""
+Benchmark of loading the full football-data history: parsing every raw season csv (what each consumer did before the
+typed dataset) against reading the typed season partitioned dataset built by scrapers/football_data_dataset.py.
+The synthetic seasons repeat one row with the columns of a recent season file, in a local directory.
+
+Run from the repo root:
+    python -m benchmarks.bench_football_data_dataset --seasons 32
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from scrapers.football_data_dataset import parse_season_file, read_football_data_dataset
+from scrapers.scraper_constants import ScraperConstants as sc
+from schemas.pandas_schemas import FootballDataSchema
+from utils.parquet_utils import save_partitioned_parquet_locally, update_partition_list_locally
+
+HEADER = ("Div,Date,Time,HomeTeam,AwayTeam,FTHG,FTAG,FTR,HTHG,HTAG,HTR,Referee,HS,AS,HST,AST,HF,AF,HC,AC,HY,AY,HR,"
+          "AR,B365H,B365D,B365A,BWH,BWD,BWA,PSH,PSD,PSA,WHH,WHD,WHA,MaxH,MaxD,MaxA,AvgH,AvgD,AvgA,B365>2.5,B365<2.5,"
+          "P>2.5,P<2.5,Max>2.5,Max<2.5,Avg>2.5,Avg<2.5,AHh,B365AHH,B365AHA,PAHH,PAHA,MaxAHH,MaxAHA,AvgAHH,AvgAHA,"
+          "B365CH,B365CD,B365CA,PSCH,PSCD,PSCA,MaxCH,MaxCD,MaxCA,AvgCH,AvgCD,AvgCA")
+ROW = ("E0,16/08/2024,20:00,Man United,Fulham,1,0,H,0,0,D,R Jones,14,10,5,2,12,10,7,8,2,3,0,0" +
+       ",1.6" * (len(HEADER.split(",")) - 24))
+
+
+def build_season_files(seasons: int, matches: int) -> dict:
+    """
+    :return: {season: csv bytes} of the synthetic seasons
+    """
+    data = (HEADER + "\n" + "\n".join([ROW] * matches) + "\n").encode("utf-8")
+    return {f"{year % 100:02d}{(year + 1) % 100:02d}": data for year in range(2024 - seasons + 1, 2025)}
+
+
+def parse_raw_seasons(season_files: dict) -> pd.DataFrame:
+    with ThreadPoolExecutor(max_workers=sc.FOOTBALL_DATA_MAX_WORKERS) as executor:
+        season_dfs = list(executor.map(lambda item: parse_season_file(item[1], item[0]), season_files.items()))
+    return FootballDataSchema().coerce(pd.concat(season_dfs, ignore_index=True))
+
+
+def time_call(func, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark loading the full football-data history.")
+    parser.add_argument("--seasons", type=int, default=32, help="Number of seasons")
+    parser.add_argument("--matches", type=int, default=380, help="Number of matches in each season")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs (the best is reported)")
+    args = parser.parse_args()
+
+    season_files = build_season_files(args.seasons, args.matches)
+    parse_seconds, dataset_df = time_call(lambda: parse_raw_seasons(season_files), args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_partitioned_parquet_locally(dataset_df, directory, partition_cols=sc.FOOTBALL_DATA_PARTITION_COLUMNS,
+                                         file_name=sc.FOOTBALL_DATA_DATASET_FILE_NAME)
+        update_partition_list_locally(directory)
+        read_seconds, read_df = time_call(lambda: read_football_data_dataset(directory=directory), args.repeat)
+
+    print(f"seasons={args.seasons} rows={len(dataset_df)} columns={len(dataset_df.columns)}")
+    print(f"parse raw csvs and coerce: {parse_seconds:.3f}s")
+    print(f"read typed dataset:        {read_seconds:.3f}s ({len(read_df)} rows)")
@@ -0,0 +1,84 @@
+"""
+Benchmark of sequential fetch latency: a module level requests.get per page (the previous calls, a new connection
+every time) against the pooled HttpClient (keep-alive connections), and the HTTP/2 client if httpx is installed.
+A local server serves the match report fixture over HTTP/1.1 keep-alive connections, gzipped when the client accepts
+it. --handshake_delay stalls every new connection to stand in for the TCP and TLS handshake with fbref.com,
+which the local server does not have.
+
+Run from the repo root:
+    python -m benchmarks.bench_http_client --requests 50 --handshake_delay 0.05
+"""
+import argparse
+import gzip
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from benchmarks.fixtures import MATCH_REPORT_FIXTURE
+from utils.http_utils import HttpClient, httpx
+
+PAGE = MATCH_REPORT_FIXTURE.read_bytes()
+GZIPPED_PAGE = gzip.compress(PAGE)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Called once per connection
+        time.sleep(self.server.handshake_delay)
+        super().setup()
+
+    def do_GET(self):
+        body = GZIPPED_PAGE if "gzip" in self.headers.get("Accept-Encoding", "") else PAGE
+        self.send_response(200)
+        if body is GZIPPED_PAGE:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.bytes_sent += len(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fetch_pages(get, url: str, num_requests: int) -> list:
+    latencies = []
+    for i in range(num_requests):
+        start = time.perf_counter()
+        response = get(f"{url}/en/matches/{i}")
+        assert response.content == PAGE
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark sequential fetches with and without the pooled client.")
+    parser.add_argument("--requests", type=int, default=50, help="Number of pages fetched by each client")
+    parser.add_argument("--handshake_delay", type=float, default=0.05,
+                        help="Seconds every new connection is stalled for, standing in for the TCP/TLS handshake")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.handshake_delay = args.handshake_delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    clients = [("requests.get", requests.get), ("HttpClient", HttpClient(pool_size=1).get)]
+    if httpx:
+        # HTTP/2 is only negotiated over TLS, so this measures the httpx client over HTTP/1.1
+        clients.append(("HttpClient(http2)", HttpClient(pool_size=1, http2=True).get))
+
+    print(f"requests={args.requests} handshake_delay={args.handshake_delay}s page={len(PAGE) / 1024:.0f}KB "
+          f"gzipped={len(GZIPPED_PAGE) / 1024:.0f}KB")
+    for name, get in clients:
+        server.bytes_sent = 0
+        latencies = sorted(fetch_pages(get, url, args.requests))
+        print(f"{name:<18} mean {statistics.mean(latencies) * 1000:.1f}ms "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms "
+              f"transferred {server.bytes_sent / 1024:.0f}KB")
+
+    server.shutdown()
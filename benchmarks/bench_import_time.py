@@ -0,0 +1,77 @@
+"""
+Benchmark of the time it takes to import the entry points of the scrapers, measured with python -X importtime in a
+new interpreter so nothing is already imported. Each entry point has a budget in ms, and the benchmark exits with an
+error if the best of the runs is over it, so it can guard against a module level import of a heavy dependency
+(pandas, boto3, bs4, selenium, pyarrow) creeping back into a command that does not need it.
+
+Run from the repo root:
+    python -m benchmarks.bench_import_time --runs 5
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+# Budgets in ms, with room for slower machines. The cli only parses the command, the status command needs boto3
+# and the fbref scraper needs pandas and boto3
+IMPORT_BUDGETS_MS = {
+    "scrapers.cli": 50,
+    "scrapers.cli, utils.ledger_utils, utils.schedule_index_utils, utils.s3_transfer_utils": 400,
+    "scrapers.fbref": 1200,
+}
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure_import_ms(statement: str) -> tuple:
+    """
+    :param statement: The modules to import, e.g. "scrapers.cli"
+    :return: (total import time in ms, {top level module: cumulative ms}) of the modules imported by the statement,
+    the interpreter's own startup imports are not included
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {statement}"],
+                            capture_output=True, text=True, check=True)
+    total_us = 0
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            total_us += int(self_us)
+            # Modules imported directly by the statement (or by the interpreter startup) are not indented
+            if len(indent) == 1:
+                modules[module] = int(cumulative_us) / 1000
+    return total_us / 1000, modules
+
+
+def get_startup_imports(runs: int) -> tuple:
+    """
+    :return: (best import time in ms, modules) of the imports the interpreter does before running any statement
+    """
+    return min((measure_import_ms("sys") for _ in range(runs)), key=lambda run: run[0])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the scrapers' entry points.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of imports of each entry point, the best is kept")
+    parser.add_argument("--top", type=int, default=5, help="Number of the slowest imported modules to print")
+    args = parser.parse_args()
+
+    startup_ms, startup_modules = get_startup_imports(args.runs)
+    over_budget = []
+    print(f"interpreter startup imports {startup_ms:.1f}ms (subtracted)")
+    for statement, budget_ms in IMPORT_BUDGETS_MS.items():
+        runs = [measure_import_ms(statement) for _ in range(args.runs)]
+        total_ms, modules = min(runs, key=lambda run: run[0])
+        import_ms = total_ms - startup_ms
+        slowest = sorted(((module, ms) for module, ms in modules.items() if module not in startup_modules),
+                         key=lambda item: item[1], reverse=True)[:args.top]
+        print(f"{'OK  ' if import_ms <= budget_ms else 'OVER'} import {statement}: {import_ms:.1f}ms "
+              f"(budget {budget_ms}ms)")
+        print("     " + ", ".join(f"{module} {ms:.1f}ms" for module, ms in slowest))
+        if import_ms > budget_ms:
+            over_budget.append(statement)
+
+    if over_budget:
+        print(f"{len(over_budget)} entry point(s) over the import time budget")
+        sys.exit(1)
@@ -0,0 +1,60 @@
+"""
+Benchmark of the process pool parsing stage. Parses copies of the match report fixture in the current process and
+with pools of parser processes, and reports pages/sec for each number of workers. Process start up is excluded, as
+the pool is started once per run. Also reports the pickled size of the html sent to a worker and of the records sent
+back.
+
+Run from the repo root:
+    python -m benchmarks.bench_parse_workers --workers 0 1 2 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.fixtures import MATCH_REPORT_FIXTURE
+from scrapers.fbref import parse_match_report_records
+
+
+def parse_in_process(pages: list, parser_name: str):
+    return [parse_match_report_records(html, parser_name) for html in pages]
+
+
+def parse_with_pool(pool: ProcessPoolExecutor, pages: list, parser_name: str):
+    return list(pool.map(parse_match_report_records, pages, [parser_name] * len(pages)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark parsing match reports with a process pool.")
+    parser.add_argument("--pages", type=int, default=40, help="Number of match reports to parse")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4],
+                        help="Numbers of parser processes to compare, 0 parses in the current process")
+    parser.add_argument("--parser", type=str, default="lxml", choices=["lxml", "html.parser"],
+                        help="Parser backend")
+    args = parser.parse_args()
+
+    # The per table logging of the scraper would dominate the timings
+    logging.disable(logging.INFO)
+
+    html = MATCH_REPORT_FIXTURE.read_bytes()
+    pages = [html] * args.pages
+    records = parse_match_report_records(html, args.parser)
+    print(f"cpus={os.cpu_count()} pages={args.pages} parser={args.parser} "
+          f"html={len(pickle.dumps(html)) / 1024:.0f}KB records={len(pickle.dumps(records)) / 1024:.0f}KB")
+
+    for workers in args.workers:
+        if workers == 0:
+            start = time.perf_counter()
+            parse_in_process(pages, args.parser)
+            elapsed = time.perf_counter() - start
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=logging.disable, initargs=(logging.INFO,)) as pool:
+                # Start the workers and import the scraper in each of them before timing
+                parse_with_pool(pool, [html] * workers, args.parser)
+                start = time.perf_counter()
+                parse_with_pool(pool, pages, args.parser)
+                elapsed = time.perf_counter() - start
+        print(f"workers={workers:<3} {elapsed:.2f}s {args.pages / elapsed:.1f} pages/sec")
@@ -0,0 +1,84 @@
+"""
+Benchmark of building the player rows of a match report: the PlayerColumnBuilder used by scrape_team_player_data
+against the previous dict-of-dicts implementation. Reports the time and the peak memory allocated (tracemalloc) to
+build the rows of both teams from the table index of the match report fixture.
+
+Run from the repo root:
+    python -m benchmarks.bench_player_rows
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+import pandas as pd
+from benchmarks.fixtures import MATCH_REPORT_FIXTURE
+from scrapers.fbref import build_table_index, get_team_ids_from_table_index, PlayerColumnBuilder, PLAYER_COLUMNS
+from scrapers.parsers import LxmlParser
+
+TABLE_TABS = ["summary", "passing", "passing_types", "defense", "possession", "misc"]
+
+
+def build_rows_with_dict_of_dicts(table_index: dict, team_id: str) -> pd.DataFrame:
+    """
+    The previous implementation: a dict per player keyed by the player name
+    """
+    data_dict = {}
+    for tab in TABLE_TABS:
+        for table_cells in table_index.get(f"stats_{team_id}_{tab}") or []:
+            if not table_cells:
+                continue
+            player_name = next(value for col, value in table_cells if col == "player")
+            if player_name not in data_dict:
+                data_dict[player_name] = {}
+            for col, value in table_cells:
+                if col == "player":
+                    continue
+                elif col not in data_dict[player_name] or not data_dict[player_name][col]:
+                    data_dict[player_name][col] = value
+
+    df = pd.DataFrame.from_dict(data_dict, orient="index").reset_index()
+    return df.rename(columns={"index": "player"})
+
+
+def build_rows_with_column_builder(table_index: dict, team_id: str) -> pd.DataFrame:
+    summary_rows = table_index.get(f"stats_{team_id}_summary") or []
+    builder = PlayerColumnBuilder(PLAYER_COLUMNS, size=sum(1 for table_cells in summary_rows if table_cells))
+    for tab in TABLE_TABS:
+        table_rows = table_index.get(f"stats_{team_id}_{tab}")
+        if table_rows is not None:
+            builder.add_table(table_rows)
+    return builder.to_dataframe()
+
+
+def measure(build, table_index: dict, team_ids: list, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for team_id in team_ids:
+            build(table_index, team_id)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    for team_id in team_ids:
+        build(table_index, team_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark building the player rows of a match report.")
+    parser.add_argument("--repeat", type=int, default=200, help="Number of timed runs (the best is reported)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    lxml_parser = LxmlParser()
+    table_index = build_table_index(lxml_parser.parse(MATCH_REPORT_FIXTURE.read_bytes()), lxml_parser)
+    team_ids = get_team_ids_from_table_index(table_index)
+    team_ids = [team_ids[0], team_ids[-1]]
+
+    for name, build in [("dict of dicts", build_rows_with_dict_of_dicts),
+                        ("column builder", build_rows_with_column_builder)]:
+        seconds, peak = measure(build, table_index, team_ids, args.repeat)
+        print(f"{name:<15} {seconds * 1000:.2f}ms per match report, peak allocated {peak / 1024:.0f}KB")
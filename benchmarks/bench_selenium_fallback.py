@@ -0,0 +1,85 @@
+"""
+Benchmark for the selenium fallback used by get_html_content when requests is blocked.
+Compares the latency per page of launching a new chrome driver for every url (the previous behaviour) against
+loading the urls with a ChromeDriverPool.
+
+Run from the repo root:
+    python -m benchmarks.bench_selenium_fallback --pages 10
+    python -m benchmarks.bench_selenium_fallback --pages 10 --fake-launch-seconds 2 (no chrome installed)
+
+By default the pages are the html fixtures in tests/test_files loaded with file:// urls, so no requests are sent
+to fbref.com.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+from utils.selenium_utils import ChromeDriverPool, create_chrome_driver
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "tests" / "test_files"
+
+
+class SimulatedDriver:
+    """
+    Fake driver that sleeps for launch_seconds when it is created, to stand in for chrome's start up cost
+    """
+
+    def __init__(self, launch_seconds: float):
+        time.sleep(launch_seconds)
+        self.page_source = None
+
+    def get(self, url):
+        self.page_source = Path(url.replace("file://", "")).read_text(encoding="utf-8")
+
+    def quit(self):
+        pass
+
+
+def time_new_driver_per_page(urls, driver_factory) -> list:
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        driver = driver_factory()
+        driver.get(url)
+        _ = driver.page_source
+        driver.quit()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def time_pooled_driver(urls, driver_factory, max_pages: int) -> list:
+    pool = ChromeDriverPool(size=1, max_pages=max_pages, driver_factory=driver_factory)
+    latencies = []
+    try:
+        for url in urls:
+            start = time.perf_counter()
+            pool.get_page_source(url)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        pool.close()
+    return latencies
+
+
+def print_latencies(name: str, latencies: list):
+    print(f"{name:<22} pages={len(latencies):<4} mean={statistics.mean(latencies):.3f}s "
+          f"p50={statistics.median(latencies):.3f}s max={max(latencies):.3f}s total={sum(latencies):.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the selenium fallback latency per page.")
+    parser.add_argument("--pages", type=int, default=10, help="Number of pages to load")
+    parser.add_argument("--max_pages", type=int, default=50, help="Pages loaded before a pooled driver is recycled")
+    parser.add_argument("--fake-launch-seconds", type=float, default=None,
+                        help="Use a simulated driver with this start up cost instead of chrome")
+    args = parser.parse_args()
+
+    fixtures = sorted(FIXTURE_DIR.glob("*.html"))
+    urls = [f"file://{fixtures[page % len(fixtures)]}" for page in range(args.pages)]
+
+    if args.fake_launch_seconds is not None:
+        factory = lambda: SimulatedDriver(args.fake_launch_seconds)
+    else:
+        factory = create_chrome_driver
+
+    print_latencies("new driver per page", time_new_driver_per_page(urls, factory))
+    print_latencies("pooled driver", time_pooled_driver(urls, factory, args.max_pages))
@@ -0,0 +1,62 @@
+"""
+Benchmark comparing the raw csv output against the typed FbRefSchema written as parquet, for a full synthetic season.
+Reports in-memory size, file size and write/read times. The synthetic season repeats the same match, so the parquet
+file sizes are smaller than a real season would be.
+
+Run from the repo root:
+    python -m benchmarks.bench_typed_output
+"""
+import argparse
+import io
+import time
+import pandas as pd
+from benchmarks.fixtures import build_synthetic_season, MATCHES_PER_SEASON
+from schemas.pandas_schemas import FbRefSchema
+
+
+def time_call(func, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def write_csv(df):
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def write_parquet(df, compression):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False, compression=compression)
+    return buffer.getvalue()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark csv against typed parquet output.")
+    parser.add_argument("--matches", type=int, default=MATCHES_PER_SEASON, help="Number of matches in the season")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs (the best is reported)")
+    args = parser.parse_args()
+
+    raw_df = build_synthetic_season(args.matches)
+    fbref_schema = FbRefSchema()
+    coerce_seconds, typed_df = time_call(lambda: fbref_schema.coerce(raw_df), args.repeat)
+
+    print(f"rows={len(raw_df)} columns={len(raw_df.columns)} coerce={coerce_seconds:.3f}s")
+    print(f"in memory: raw={raw_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f}MB "
+          f"typed={typed_df.memory_usage(deep=True).sum() / 1024 ** 2:.1f}MB")
+
+    results = [("csv (raw)", raw_df, write_csv, lambda data: pd.read_csv(io.BytesIO(data)))]
+    for compression in ("snappy", "zstd"):
+        results.append((f"parquet {compression}", typed_df,
+                        lambda df, compression=compression: write_parquet(df, compression),
+                        lambda data: pd.read_parquet(io.BytesIO(data))))
+
+    for name, df, write, read in results:
+        write_seconds, data = time_call(lambda: write(df), args.repeat)
+        read_seconds, _ = time_call(lambda: read(data), args.repeat)
+        print(f"{name:<16} size={len(data) / 1024 ** 2:.2f}MB write={write_seconds:.3f}s read={read_seconds:.3f}s")
@@ -0,0 +1,51 @@
+"""
+Synthetic inputs for the benchmarks, scaled up from the html fixtures in tests/test_files
+"""
+from pathlib import Path
+import pandas as pd
+from scrapers.fbref import build_table_index, scrape_team_player_data
+from scrapers.parsers import LxmlParser
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "tests" / "test_files"
+MATCH_REPORT_FIXTURE = FIXTURE_DIR / "new_vs_nott_for_22_23.html"
+SCHEDULE_FIXTURE = FIXTURE_DIR / "scores_and_fixtures_2025_05_06.html"
+
+# Matches in a 20 team league season
+MATCHES_PER_SEASON = 380
+
+
+def load_match_report_df() -> pd.DataFrame:
+    """
+    :return: The scraped player data for both teams in the match report fixture
+    """
+    parser = LxmlParser()
+    document = parser.parse(MATCH_REPORT_FIXTURE.read_bytes())
+    table_index = build_table_index(document, parser)
+    return pd.concat([scrape_team_player_data(document, "", home_or_away, table_index, parser)
+                      for home_or_away in ("home", "away")], ignore_index=True)
+
+
+def build_synthetic_season(matches: int = MATCHES_PER_SEASON) -> pd.DataFrame:
+    """
+    Repeats the match report fixture to build a season sized dataframe of scraped strings, with the watermark columns
+    set as if the matches were played across 38 gameweeks
+    :param matches: Number of matches in the season
+    :return: Dataframe of scraped values for the season
+    """
+    match_df = load_match_report_df()
+    match_dfs = []
+    for match in range(matches):
+        gameweek = match // 10 + 1
+        match_dfs.append(match_df.assign(
+            gameweek=str(gameweek),
+            date=(pd.Timestamp("2024-08-16") + pd.Timedelta(days=7 * (gameweek - 1))).strftime("%Y-%m-%d"),
+            time="15:00",
+            home_team=f"Home {match % 20}",
+            home_xg="1.7",
+            score="2–0",
+            away_xg="0.3",
+            away_team=f"Away {match % 19}",
+            attendance="52,245",
+            referee=f"Referee {match % 15}",
+        ))
+    return pd.concat(match_dfs, ignore_index=True)
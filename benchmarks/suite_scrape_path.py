@@ -0,0 +1,106 @@
+"""
+pytest-benchmark suite for the scrape -> parse -> serialize -> upload path, built on the html fixtures in
+tests/test_files. Network fetches are mocked and uploads go to a moto bucket, so only the code in this repo is timed.
+
+It is not collected by the test suite, run it explicitly from the repo root (requires pytest-benchmark):
+    python -m pytest benchmarks/suite_scrape_path.py --benchmark-json=benchmark_results.json
+
+--benchmark-autosave stores each run as json under .benchmarks/ (named after the commit), and a later run can be
+compared with a saved one, e.g. --benchmark-compare=0001 --benchmark-compare-fail=mean:10%
+"""
+import logging
+from unittest.mock import patch
+import pytest
+from benchmarks.fixtures import MATCH_REPORT_FIXTURE, SCHEDULE_FIXTURE, MATCHES_PER_SEASON, build_synthetic_season
+from scrapers.fbref import get_soup_object, get_parsed_document, scrape_team_player_data, build_table_index, \
+    get_team_name_from_match_report, scrape_data_in_date_range
+from scrapers.parsers import get_parser_backend
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.s3_utils import save_data_to_s3_bucket_as_csv
+# The moto bucket fixture shared with the test suite
+from tests.conftest import s3_client  # noqa: F401
+
+# A gameweek of the schedule fixture (the last 10 matches with a match report)
+GAMEWEEK_START_DATE = "2025-05-03"
+
+
+@pytest.fixture(autouse=True, scope="module")
+def quiet_logging():
+    # The scraper logs every table and row, which would dominate the timings
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="module")
+def match_report_html():
+    return MATCH_REPORT_FIXTURE.read_bytes()
+
+
+@pytest.fixture(scope="module")
+def schedule_html():
+    return SCHEDULE_FIXTURE.read_bytes()
+
+
+@pytest.fixture(scope="module")
+def season_df():
+    return build_synthetic_season(MATCHES_PER_SEASON)
+
+
+@pytest.fixture
+def mock_fetches(match_report_html, schedule_html):
+    """
+    Serves the schedule fixture for the season page and the match report fixture for every match report
+    """
+    def get_html_content(url):
+        return schedule_html if "/schedule/" in url else match_report_html
+
+    with patch("scrapers.fbref.get_html_content", side_effect=get_html_content):
+        yield
+
+
+def test_get_soup_object(benchmark, mock_fetches):
+    soup = benchmark(get_soup_object, "https://fbref.com/en/matches/dummy")
+    assert soup.find("h1") is not None
+
+
+@pytest.mark.parametrize("parser_name", ["html.parser", "lxml"])
+def test_get_parsed_document(benchmark, mock_fetches, parser_name):
+    parser = get_parser_backend(parser_name)
+    document = benchmark(get_parsed_document, "https://fbref.com/en/matches/dummy", parser)
+    assert document is not None
+
+
+@pytest.mark.parametrize("parser_name", ["html.parser", "lxml"])
+def test_scrape_team_player_data(benchmark, match_report_html, parser_name):
+    parser = get_parser_backend(parser_name)
+    document = parser.parse(match_report_html)
+
+    def scrape_both_teams():
+        table_index = build_table_index(document, parser)
+        return [scrape_team_player_data(document, "", home_or_away, table_index, parser)
+                for home_or_away in ("home", "away")]
+
+    home_df, away_df = benchmark(scrape_both_teams)
+    assert len(home_df) and len(away_df)
+
+
+@pytest.mark.parametrize("parser_name", ["html.parser", "lxml"])
+def test_get_team_name_from_match_report(benchmark, match_report_html, parser_name):
+    parser = get_parser_backend(parser_name)
+    document = parser.parse(match_report_html)
+    assert benchmark(get_team_name_from_match_report, document, parser) == ["Newcastle United", "Nottingham Forest"]
+
+
+def test_scrape_data_in_date_range(benchmark, mock_fetches):
+    season_df, last_date = benchmark.pedantic(scrape_data_in_date_range, args=(2024,),
+                                              kwargs={"start_date": GAMEWEEK_START_DATE}, rounds=3)
+    assert last_date == "2025-05-05"
+    assert season_df["date"].nunique() == 3
+
+
+def test_save_data_to_s3_bucket_as_csv(benchmark, s3_client, season_df):
+    key = "raw/fbref_data/benchmark.csv"
+    benchmark.pedantic(save_data_to_s3_bucket_as_csv, args=(s3_client, season_df),
+                       kwargs={"bucket": sc.S3_BUCKET_NAME, "key": key}, rounds=3)
+    assert s3_client.head_object(Bucket=sc.S3_BUCKET_NAME, Key=key)["ContentLength"] > 0
@@ -1,113 +1,337 @@
 """
 FBREF Schema
 """
+import numpy as np
+import pandas as pd
+
 
 class FbRefSchema:
+    """
+    Typed schema for the data scraped from fbref match reports.
+    1) Counts are nullable integers, so cells left empty by fbref are stored as <NA> instead of forcing a float column
+    2) xG, xA and percentages are float32
+    3) Nationality, position, teams and referee repeat on every row, so they are stored as categoricals
+    4) Age is stored as a float32 number of years (fbref shows it as years-days, e.g. "26-123")
+    The scraper itself returns every value as a string (see get_raw_schema), coerce converts a scraped dataframe to
+    the typed schema.
+    """
+
+    def __init__(self):
+
+        self.schema = {
+            "player": "string",
+            "shirtnumber": "Int16",
+            "nationality": "category",
+            "position": "category",
+            "age": "float32",
+            "minutes": "Int16",
+            "goals": "Int16",
+            "assists": "Int16",
+            "pens_made": "Int16",
+            "pens_att": "Int16",
+            "shots": "Int16",
+            "shots_on_target": "Int16",
+            "cards_yellow": "Int16",
+            "cards_red": "Int16",
+            "touches": "Int16",
+            "tackles": "Int16",
+            "interceptions": "Int16",
+            "blocks": "Int16",
+            "xg": "float32",
+            "npxg": "float32",
+            "xg_assist": "float32",
+            "sca": "Int16",
+            "gca": "Int16",
+            "passes_completed": "Int16",
+            "passes": "Int16",
+            "passes_pct": "float32",
+            "progressive_passes": "Int16",
+            "carries": "Int16",
+            "progressive_carries": "Int16",
+            "take_ons": "Int16",
+            "take_ons_won": "Int16",
+            "passes_total_distance": "Int16",
+            "passes_progressive_distance": "Int16",
+            "passes_completed_short": "Int16",
+            "passes_short": "Int16",
+            "passes_pct_short": "float32",
+            "passes_completed_medium": "Int16",
+            "passes_medium": "Int16",
+            "passes_pct_medium": "float32",
+            "passes_completed_long": "Int16",
+            "passes_long": "Int16",
+            "passes_pct_long": "float32",
+            "pass_xa": "float32",
+            "assisted_shots": "Int16",
+            "passes_into_final_third": "Int16",
+            "passes_into_penalty_area": "Int16",
+            "crosses_into_penalty_area": "Int16",
+            "passes_live": "Int16",
+            "passes_dead": "Int16",
+            "passes_free_kicks": "Int16",
+            "through_balls": "Int16",
+            "passes_switches": "Int16",
+            "crosses": "Int16",
+            "throw_ins": "Int16",
+            "corner_kicks": "Int16",
+            "corner_kicks_in": "Int16",
+            "corner_kicks_out": "Int16",
+            "corner_kicks_straight": "Int16",
+            "passes_offsides": "Int16",
+            "passes_blocked": "Int16",
+            "tackles_won": "Int16",
+            "tackles_def_3rd": "Int16",
+            "tackles_mid_3rd": "Int16",
+            "tackles_att_3rd": "Int16",
+            "challenge_tackles": "Int16",
+            "challenges": "Int16",
+            "challenge_tackles_pct": "float32",
+            "challenges_lost": "Int16",
+            "blocked_shots": "Int16",
+            "blocked_passes": "Int16",
+            "tackles_interceptions": "Int16",
+            "clearances": "Int16",
+            "errors": "Int16",
+            "touches_def_pen_area": "Int16",
+            "touches_def_3rd": "Int16",
+            "touches_mid_3rd": "Int16",
+            "touches_att_3rd": "Int16",
+            "touches_att_pen_area": "Int16",
+            "touches_live_ball": "Int16",
+            "take_ons_won_pct": "float32",
+            "take_ons_tackled": "Int16",
+            "take_ons_tackled_pct": "float32",
+            "carries_distance": "Int16",
+            "carries_progressive_distance": "Int16",
+            "carries_into_final_third": "Int16",
+            "carries_into_penalty_area": "Int16",
+            "miscontrols": "Int16",
+            "dispossessed": "Int16",
+            "passes_received": "Int16",
+            "progressive_passes_received": "Int16",
+            "cards_yellow_red": "Int16",
+            "fouls": "Int16",
+            "fouled": "Int16",
+            "offsides": "Int16",
+            "pens_won": "Int16",
+            "pens_conceded": "Int16",
+            "own_goals": "Int16",
+            "ball_recoveries": "Int16",
+            "aerials_won": "Int16",
+            "aerials_lost": "Int16",
+            "aerials_won_pct": "float32"
+        }
+
+        # Columns added to each match from the scores and fixtures table (see WATERMARK_COLUMNS in scrapers/fbref.py)
+        self.watermark_schema = {
+            "gameweek": "Int16",
+            "date": "datetime64[ns]",
+            "time": "string",
+            "home_team": "category",
+            "home_xg": "float32",
+            "score": "string",
+            "away_xg": "float32",
+            "away_team": "category",
+            "attendance": "Int32",
+            "referee": "category"
+        }
+
+    def get_schema(self):
+        return self.schema
+
+    def get_watermark_schema(self):
+        return self.watermark_schema
+
+    def get_raw_schema(self):
+        """
+        :return: The schema of the data as it is scraped, where every column is a string ("object")
+        """
+        return {col: "object" for col in self.schema}
+
+    def coerce(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts a scraped dataframe of strings to the typed schema using vectorized string operations
+        1) Empty cells are converted to nulls
+        2) "%" signs and thousands separators are removed from numeric columns
+        3) Ages in the form years-days are converted to a number of years
+        Columns that are not in the schema are left unchanged.
+        :param df: Dataframe of scraped values
+        :return: A new dataframe with the typed columns
+        """
+        dtypes = {**self.schema, **self.watermark_schema}
+        typed_columns = {}
+
+        for col in df.columns.intersection(list(dtypes)):
+            dtype = dtypes[col]
+
+            if col == "age":
+                age_parts = df[col].astype("string").str.split("-", n=1, expand=True).reindex(columns=[0, 1])
+                years = pd.to_numeric(age_parts[0], errors="coerce")
+                days = pd.to_numeric(age_parts[1], errors="coerce").fillna(0)
+                typed_columns[col] = (years + days / 365.25).astype(dtype)
+            elif dtype.startswith("Int") or dtype.startswith("float"):
+                # Empty cells can't be parsed, so they become NaN. Only the cells that still fail to parse after
+                # that need "%" signs and thousands separators removed
+                numbers = pd.to_numeric(df[col], errors="coerce")
+                needs_cleaning = numbers.isna() & df[col].notna() & (df[col] != "")
+                if needs_cleaning.any():
+                    cleaned = df.loc[needs_cleaning, col].astype("string").str.replace(r"[%,]", "", regex=True)
+                    numbers = numbers.astype("float64")
+                    numbers[needs_cleaning] = pd.to_numeric(cleaned, errors="coerce")
+                # Nullable integer columns can't hold fractions, round any stray decimals first
+                typed_columns[col] = (np.round(numbers) if dtype.startswith("Int") else numbers).astype(dtype)
+            elif dtype.startswith("datetime64"):
+                typed_columns[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce").astype(dtype)
+            else:
+                typed_columns[col] = df[col].replace("", None).astype(dtype)
+
+        return df.assign(**typed_columns)
+
+
+class FootballDataSchema:
+    """
+    Typed schema shared by every football-data.co.uk season file (see scrapers/football-data.py), so the seasons can
+    be read as one table.
+    1) The files name the same column differently over the years (e.g. HT/HomeTeam, BbMxH/MaxH, BbAHh/AHh), every
+    known source column is mapped to one column of the schema. Columns that are not in the schema are dropped
+    2) Results, shots, corners, fouls and cards are nullable integers. Most stats only exist from 2000-01 onwards, so
+    they are <NA> for the earlier seasons
+    3) Odds are float32, in columns named odds_<bookmaker>_<market> and closing_odds_<bookmaker>_<market>
+    4) Teams, division, referee and results are stored as categoricals
+    5) Dates are dd/mm/yy up to 2017-18 and dd/mm/yyyy after, both are parsed
+    """
+
+    # Bookmaker codes of the odds columns. BbMx/BbAv (BetBrain max/average) were replaced by Max/Avg in 2019-20,
+    # so they are stored in the same columns
+    BOOKMAKERS = {"B365": "b365", "BW": "bw", "IW": "iw", "LB": "lb", "PS": "ps", "WH": "wh", "SJ": "sj",
+                  "VC": "vc", "GB": "gb", "BS": "bs", "SB": "sb", "SO": "so", "SY": "sy", "Max": "max",
+                  "Avg": "avg", "BbMx": "max", "BbAv": "avg"}
+    # The over/under and asian handicap columns use P for Pinnacle rather than PS
+    MARKET_BOOKMAKERS = {"B365": "b365", "P": "ps", "GB": "gb", "LB": "lb", "Max": "max", "Avg": "avg",
+                         "BbMx": "max", "BbAv": "avg"}
+    CLOSING_BOOKMAKERS = ["B365", "BW", "IW", "PS", "WH", "VC", "Max", "Avg"]
+    CLOSING_MARKET_BOOKMAKERS = ["B365", "P", "Max", "Avg"]
+
     def __init__(self):
 
         self.schema = {
-            "player": "object",
-            "shirtnumber": "object",
-            "nationality": "object",
-            "position": "object",
-            "age": "object",
-            "minutes": "object",
-            "goals": "object",
-            "assists": "object",
-            "pens_made": "object",
-            "pens_att": "object",
-            "shots": "object",
-            "shots_on_target": "object",
-            "cards_yellow": "object",
-            "cards_red": "object",
-            "touches": "object",
-            "tackles": "object",
-            "interceptions": "object",
-            "blocks": "object",
-            "xg": "object",
-            "npxg": "object",
-            "xg_assist": "object",
-            "sca": "object",
-            "gca": "object",
-            "passes_completed": "object",
-            "passes": "object",
-            "passes_pct": "object",
-            "progressive_passes": "object",
-            "carries": "object",
-            "progressive_carries": "object",
-            "take_ons": "object",
-            "take_ons_won": "object",
-            "passes_total_distance": "object",
-            "passes_progressive_distance": "object",
-            "passes_completed_short": "object",
-            "passes_short": "object",
-            "passes_pct_short": "object",
-            "passes_completed_medium": "object",
-            "passes_medium": "object",
-            "passes_pct_medium": "object",
-            "passes_completed_long": "object",
-            "passes_long": "object",
-            "passes_pct_long": "object",
-            "pass_xa": "object",
-            "assisted_shots": "object",
-            "passes_into_final_third": "object",
-            "passes_into_penalty_area": "object",
-            "crosses_into_penalty_area": "object",
-            "passes_live": "object",
-            "passes_dead": "object",
-            "passes_free_kicks": "object",
-            "through_balls": "object",
-            "passes_switches": "object",
-            "crosses": "object",
-            "throw_ins": "object",
-            "corner_kicks": "object",
-            "corner_kicks_in": "object",
-            "corner_kicks_out": "object",
-            "corner_kicks_straight": "object",
-            "passes_offsides": "object",
-            "passes_blocked": "object",
-            "tackles_won": "object",
-            "tackles_def_3rd": "object",
-            "tackles_mid_3rd": "object",
-            "tackles_att_3rd": "object",
-            "challenge_tackles": "object",
-            "challenges": "object",
-            "challenge_tackles_pct": "object",
-            "challenges_lost": "object",
-            "blocked_shots": "object",
-            "blocked_passes": "object",
-            "tackles_interceptions": "object",
-            "clearances": "object",
-            "errors": "object",
-            "touches_def_pen_area": "object",
-            "touches_def_3rd": "object",
-            "touches_mid_3rd": "object",
-            "touches_att_3rd": "object",
-            "touches_att_pen_area": "object",
-            "touches_live_ball": "object",
-            "take_ons_won_pct": "object",
-            "take_ons_tackled": "object",
-            "take_ons_tackled_pct": "object",
-            "carries_distance": "object",
-            "carries_progressive_distance": "object",
-            "carries_into_final_third": "object",
-            "carries_into_penalty_area": "object",
-            "miscontrols": "object",
-            "dispossessed": "object",
-            "passes_received": "object",
-            "progressive_passes_received": "object",
-            "cards_yellow_red": "object",
-            "fouls": "object",
-            "fouled": "object",
-            "offsides": "object",
-            "pens_won": "object",
-            "pens_conceded": "object",
-            "own_goals": "object",
-            "ball_recoveries": "object",
-            "aerials_won": "object",
-            "aerials_lost": "object",
-            "aerials_won_pct": "object"
+            "division": "category",
+            "date": "datetime64[ns]",
+            "time": "string",
+            "home_team": "category",
+            "away_team": "category",
+            "full_time_home_goals": "Int16",
+            "full_time_away_goals": "Int16",
+            "full_time_result": "category",
+            "half_time_home_goals": "Int16",
+            "half_time_away_goals": "Int16",
+            "half_time_result": "category",
+            "attendance": "Int32",
+            "referee": "category",
+            "home_shots": "Int16",
+            "away_shots": "Int16",
+            "home_shots_on_target": "Int16",
+            "away_shots_on_target": "Int16",
+            "home_hit_woodwork": "Int16",
+            "away_hit_woodwork": "Int16",
+            "home_corners": "Int16",
+            "away_corners": "Int16",
+            "home_fouls": "Int16",
+            "away_fouls": "Int16",
+            "home_offsides": "Int16",
+            "away_offsides": "Int16",
+            "home_yellow_cards": "Int16",
+            "away_yellow_cards": "Int16",
+            "home_red_cards": "Int16",
+            "away_red_cards": "Int16",
+            "home_booking_points": "Int16",
+            "away_booking_points": "Int16",
+            "asian_handicap_line": "float32",
+            "closing_asian_handicap_line": "float32",
         }
 
+        # {source column: schema column}, the first source column in a file wins when several map to the same column
+        self.source_columns = {
+            "Div": "division", "Date": "date", "Time": "time", "HomeTeam": "home_team", "HT": "home_team",
+            "AwayTeam": "away_team", "AT": "away_team", "FTHG": "full_time_home_goals", "HG": "full_time_home_goals",
+            "FTAG": "full_time_away_goals", "AG": "full_time_away_goals", "FTR": "full_time_result",
+            "Res": "full_time_result", "HTHG": "half_time_home_goals", "HTAG": "half_time_away_goals",
+            "HTR": "half_time_result", "Attendance": "attendance", "Referee": "referee", "HS": "home_shots",
+            "AS": "away_shots", "HST": "home_shots_on_target", "AST": "away_shots_on_target",
+            "HHW": "home_hit_woodwork", "AHW": "away_hit_woodwork", "HC": "home_corners", "AC": "away_corners",
+            "HF": "home_fouls", "AF": "away_fouls", "HO": "home_offsides", "AO": "away_offsides",
+            "HY": "home_yellow_cards", "AY": "away_yellow_cards", "HR": "home_red_cards", "AR": "away_red_cards",
+            "HBP": "home_booking_points", "ABP": "away_booking_points", "AHh": "asian_handicap_line",
+            "BbAHh": "asian_handicap_line", "AHCh": "closing_asian_handicap_line",
+        }
+
+        # Odds column families, e.g. B365H -> odds_b365_home, PSCH -> closing_odds_ps_home,
+        # P>2.5 -> odds_ps_over_2_5 and BbAvAHA -> odds_avg_asian_handicap_away
+        outcomes = {"H": "home", "D": "draw", "A": "away"}
+        markets = {">2.5": "over_2_5", "<2.5": "under_2_5", "AHH": "asian_handicap_home",
+                   "AHA": "asian_handicap_away"}
+        for code, bookmaker in self.BOOKMAKERS.items():
+            for suffix, outcome in outcomes.items():
+                self.source_columns[f"{code}{suffix}"] = f"odds_{bookmaker}_{outcome}"
+                if code in self.CLOSING_BOOKMAKERS:
+                    self.source_columns[f"{code}C{suffix}"] = f"closing_odds_{bookmaker}_{outcome}"
+        for code, bookmaker in self.MARKET_BOOKMAKERS.items():
+            for suffix, market in markets.items():
+                self.source_columns[f"{code}{suffix}"] = f"odds_{bookmaker}_{market}"
+                if code in self.CLOSING_MARKET_BOOKMAKERS:
+                    self.source_columns[f"{code}C{suffix}"] = f"closing_odds_{bookmaker}_{market}"
+        for column in self.source_columns.values():
+            self.schema.setdefault(column, "float32")
+
     def get_schema(self):
         return self.schema
+
+    def rename(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Maps the columns of a season file onto the schema columns, still as strings
+        :param df: Dataframe of a season file read as strings
+        :return: A new dataframe with the schema columns found in the file, in schema order
+        """
+        columns = {}
+        for source_column in df.columns:
+            column = self.source_columns.get(str(source_column).strip())
+            if column is None:
+                continue
+            # Fill the gaps of the first source column from the others, e.g. a season with both BbMxH and MaxH
+            columns[column] = df[source_column] if column not in columns else \
+                columns[column].fillna(df[source_column])
+        return pd.DataFrame({column: columns[column] for column in self.schema if column in columns}, index=df.index)
+
+    @staticmethod
+    def parse_dates(dates: pd.Series) -> pd.Series:
+        """
+        Parses dd/mm/yy and dd/mm/yyyy dates, each format with one vectorized call
+        """
+        dates = dates.astype("string").str.strip()
+        parsed = pd.to_datetime(dates, format="%d/%m/%y", errors="coerce")
+        four_digit_years = dates.str.len() > 8
+        if four_digit_years.any():
+            parsed[four_digit_years] = pd.to_datetime(dates[four_digit_years], format="%d/%m/%Y", errors="coerce")
+        return parsed.astype("datetime64[ns]")
+
+    def coerce(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts a renamed dataframe of strings to the typed schema using vectorized operations. Schema columns missing
+        from the dataframe are added as nulls, so every season has the same columns.
+        Columns that are not in the schema (e.g. season) are left unchanged.
+        :param df: Dataframe of season files, see rename
+        :return: A new dataframe with the typed columns
+        """
+        typed_columns = {}
+        for col, dtype in self.schema.items():
+            values = df[col] if col in df else pd.Series(None, index=df.index, dtype="object")
+            if dtype.startswith("Int") or dtype.startswith("float"):
+                numbers = pd.to_numeric(values, errors="coerce")
+                typed_columns[col] = (np.round(numbers) if dtype.startswith("Int") else numbers).astype(dtype)
+            elif dtype.startswith("datetime64"):
+                typed_columns[col] = self.parse_dates(values)
+            else:
+                typed_columns[col] = values.astype("string").str.strip().replace("", None).astype(dtype)
+
+        other_columns = [col for col in df.columns if col not in self.schema]
+        return pd.DataFrame(typed_columns, index=df.index).join(df[other_columns])
@@ -0,0 +1,155 @@
+"""
+Command line entry point of the scrapers, run with python -m scrapers <command> [arguments]
+    fbref           Scrape fbref match reports, see scrapers/fbref.py
+    football-data   Download football-data.co.uk seasons, see scrapers/football-data.py
+    football-data-dataset
+                    Build the typed dataset of the football-data.co.uk seasons, see scrapers/football_data_dataset.py
+    orchestrator    Publish fbref work items to a queue or run a queue worker, see scrapers/orchestrator.py
+    status          Print the last updated metadata, and the manifest, ledger and schedule index of a season
+    compact         Merge the small part files of fbref seasons or partitions, see scrapers/compaction.py
+Each command imports its scraper only when it runs, so e.g. the status command never pays for importing pandas,
+bs4 or selenium
+"""
+import argparse
+import importlib.util
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ["fbref", "football-data", "football-data-dataset", "orchestrator", "status", "compact"]
+
+
+def run_fbref(argv: list):
+    from scrapers.fbref import main
+    main(argv)
+
+
+def run_football_data(argv: list):
+    # The module name has a hyphen, so it is loaded from its path rather than imported
+    path = Path(__file__).with_name("football-data.py")
+    spec = importlib.util.spec_from_file_location("scrapers.football_data", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.main(argv)
+
+
+def run_orchestrator(argv: list):
+    from scrapers.orchestrator import main
+    main(argv)
+
+
+def run_football_data_dataset(argv: list):
+    from scrapers.football_data_dataset import main
+    main(argv)
+
+
+def get_status(s3_client, seasons: list = None, competition: str = None) -> dict:
+    """
+    Reads the metadata of the scraped data without importing the scrapers
+    :param s3_client: Boto3 S3 client
+    :param seasons: YYYY - the starting years of the seasons to summarise
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: Dict of {"last_updated": the last updated metadata, "seasons": {season: {"parts", "rows", "ledger",
+    "schedule"}}}
+    """
+    from scrapers.scraper_constants import ScraperConstants as sc
+    from scrapers.season_keys import get_season_key_args
+    from utils.ledger_utils import S3ProgressLedger
+    from utils.s3_utils import read_json_from_s3
+    from utils.schedule_index_utils import S3ScheduleIndex
+
+    status = {"last_updated": read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                                key=sc.FBREF_RAW_METADATA_FILE_KEY),
+              "seasons": {}}
+    for season in seasons or []:
+        key_args = get_season_key_args(season, competition)
+        manifest = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                     key=sc.FBREF_SEASON_MANIFEST_S3_FILE_KEY.format(**key_args), default={})
+        parts = manifest.get("parts", [])
+        ledger = S3ProgressLedger(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                  key=sc.FBREF_LEDGER_S3_FILE_KEY.format(**key_args), season=season)
+        schedule_index = S3ScheduleIndex(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                         key=sc.FBREF_SCHEDULE_INDEX_S3_FILE_KEY.format(**key_args), season=season)
+        status["seasons"][season] = {
+            "parts": len(parts),
+            # Rows replaced by an upsert are counted by the part that replaced them
+            "rows": sum((part["rows"] or 0) - part.get("replaced_rows", 0) for part in parts),
+            "last_date": max((part["last_date"] for part in parts if part["last_date"]), default=None),
+            "ledger": ledger.get_summary(),
+            "schedule": schedule_index.get_summary(),
+        }
+    return status
+
+
+def run_status(argv: list):
+    from scrapers.scraper_constants import ScraperConstants as sc
+    from utils.s3_transfer_utils import get_s3_client
+    from utils.s3_utils import is_running_in_aws
+
+    parser = argparse.ArgumentParser(prog="python -m scrapers status",
+                                     description="Print the status of the scraped data in S3.")
+    parser.add_argument("--season", type=int, nargs="+", help="Season year(s) to summarise, e.g. 2024")
+    parser.add_argument("--competition", type=str, choices=list(sc.FBREF_COMPETITIONS),
+                        help="Competition of the seasons, defaults to the premier league")
+    args = parser.parse_args(argv)
+
+    env = is_running_in_aws()
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
+    print(json.dumps(get_status(s3, args.season, args.competition), indent=2, default=str))
+
+
+def run_compact(argv: list):
+    from scrapers.scraper_constants import ScraperConstants as sc
+    from scrapers.compaction import compact_partitioned_dataset, compact_season
+    from utils.s3_transfer_utils import get_s3_client
+    from utils.s3_utils import is_running_in_aws
+
+    parser = argparse.ArgumentParser(prog="python -m scrapers compact",
+                                     description="Merge the small part files of fbref seasons in S3.")
+    parser.add_argument("--season", type=int, nargs="+", required=True, help="Season year(s) to compact, e.g. 2024")
+    parser.add_argument("--competition", type=str, choices=list(sc.FBREF_COMPETITIONS),
+                        help="Competition of the seasons, defaults to the premier league")
+    parser.add_argument("--target_size_bytes", type=int,
+                        help="Parts smaller than this are merged into parts of about this size, defaults to "
+                             "ScraperConstants.FBREF_COMPACTION_TARGET_SIZE_BYTES")
+    parser.add_argument("--grace_seconds", type=float,
+                        help="Seconds superseded parts are kept for before they are deleted, defaults to "
+                             "ScraperConstants.FBREF_COMPACTION_GRACE_SECONDS")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="Merge the small files of each partition of the seasons in the partitioned dataset "
+                             "written by the 'partitioned' write mode instead")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    env = is_running_in_aws()
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
+    if args.partitioned:
+        result = compact_partitioned_dataset(s3, seasons=args.season, target_size_bytes=args.target_size_bytes,
+                                             grace_seconds=args.grace_seconds)
+        print(json.dumps({"seasons": args.season, **result}, indent=2))
+        return
+    for season in args.season:
+        result = compact_season(s3, season, competition=args.competition, target_size_bytes=args.target_size_bytes,
+                                grace_seconds=args.grace_seconds)
+        print(json.dumps({"season": season, **result}, indent=2))
+
+
+HANDLERS = {"fbref": run_fbref, "football-data": run_football_data, "football-data-dataset": run_football_data_dataset,
+            "orchestrator": run_orchestrator, "status": run_status, "compact": run_compact}
+
+
+def main(argv: list = None):
+    """
+    :param argv: The command followed by its arguments (defaults to sys.argv)
+    """
+    parser = argparse.ArgumentParser(prog="python -m scrapers", description="Run the football-etl scrapers.")
+    parser.add_argument("command", choices=COMMANDS, help="The scraper or command to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the command, see <command> --help")
+    args = parser.parse_args(argv)
+    HANDLERS[args.command](args.args)
+
+
+if __name__ == '__main__':
+    main()
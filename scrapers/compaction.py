@@ -0,0 +1,301 @@
+"""
+Compaction of the small part files of the fbref seasons in the raw zone, run with python -m scrapers compact
+Every scrape run adds a small part to its season (see add_scraped_data_to_season_parts), so Athena and local reads pay
+a request per part. The compaction merges the small parts of a season into typed parquet parts of about the target
+size and commits them with a single conditional update of the season manifest, the same way a part is added:
+1) Read the small parts listed in the manifest, dropping the rows an upsert replaced, and upload the merged parts.
+Nothing that readers use has changed yet
+2) Swap the manifest: the merged parts replace the small parts, and the key index shards that pointed at the small
+parts are rewritten to point at the merged parts. Readers see either the old parts or the merged parts, never a mix
+3) The small parts and the old shards are listed as superseded in the manifest, and deleted by a later compaction
+once they have been superseded for longer than the grace period, so a reader that read the manifest before the swap
+can still read them
+The 'partitioned' write mode adds a small part-*.parquet file to every season=/gameweek= partition a batch touches,
+so compact_partitioned_dataset merges the small files of each partition the same way, with the partition list
+(_partitions.json) as the manifest. The football-data objects are not compacted, each season file and each partition
+of the football-data dataset is a single object that is replaced as a whole.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from scrapers.scraper_constants import ScraperConstants as sc
+from scrapers.season_keys import get_season_key_args
+from scrapers.fbref import get_listed_key_index_objects, get_season_manifest, read_key_index, read_season_part, \
+    save_key_index
+from schemas.pandas_schemas import FbRefSchema
+from utils.key_index_utils import KeyIndex
+from utils.parquet_utils import PARTITION_LIST_FILE_NAME, merge_parquet_files
+from utils.s3_utils import delete_s3_objects, list_s3_object_sizes, read_json_from_s3, \
+    save_data_to_s3_bucket_as_parquet, update_json_in_s3
+from utils.metrics_utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CompactionConflict(Exception):
+    """
+    Raised when the parts being compacted were removed from the manifest by another compaction
+    """
+
+
+def plan_compaction(parts: list, sizes: dict, target_size_bytes: int) -> list:
+    """
+    Groups the small parts of a season into the parts they will be merged into
+    :param parts: The parts listed in the season manifest
+    :param sizes: {key: size in bytes} of the season's objects
+    :param target_size_bytes: Parts smaller than this are merged, into parts of up to about this size
+    :return: List of groups of manifest parts, in manifest order. Empty if there are fewer than 2 small parts
+    """
+    # Only the incremental parts, the season csv is still rewritten by the 'csv' write mode
+    small_parts = [part for part in parts
+                   if "/parts/" in part["key"] and sizes.get(part["key"], 0) < target_size_bytes]
+    return group_by_size(small_parts, [sizes[part["key"]] for part in small_parts], target_size_bytes)
+
+
+def group_by_size(items: list, item_sizes: list, target_size_bytes: int) -> list:
+    """
+    Groups the small objects in order into groups of up to about target_size_bytes
+    :return: List of groups of items. Empty if there are fewer than 2 items
+    """
+    if len(items) < 2:
+        return []
+
+    groups = [[]]
+    group_size = 0
+    for item, size in zip(items, item_sizes):
+        if groups[-1] and group_size + size > target_size_bytes:
+            groups.append([])
+            group_size = 0
+        groups[-1].append(item)
+        group_size += size
+    return groups
+
+
+def merge_parts(s3_client, group: list, key_index: KeyIndex = None, current_rows: dict = None) -> tuple:
+    """
+    Reads the parts of a group into one typed dataframe
+    :param s3_client: s3 client instance
+    :param group: The manifest parts to merge
+    :param key_index: Optional key index of the season, the rows it does not point at are dropped
+    :param current_rows: The key index's get_current_rows
+    :return: (merged dataframe, {part key: [row numbers kept]} in the order they are in the merged dataframe)
+    """
+    fbref_schema = FbRefSchema()
+    part_dfs = []
+    kept_rows = {}
+    for part in group:
+        part_df = read_season_part(s3_client, part["key"], typed=True)
+        rows = current_rows.get(part["key"], []) if key_index and part["key"] in key_index.parts \
+            else list(range(len(part_df)))
+        part_dfs.append(fbref_schema.coerce(part_df.iloc[rows]))
+        kept_rows[part["key"]] = rows
+    return pd.concat(part_dfs, ignore_index=True), kept_rows
+
+
+def compact_season(s3_client, season_year: int, competition: str = None, target_size_bytes: int = None,
+                   grace_seconds: float = None, compression: str = None) -> dict:
+    """
+    Merges the small parts of a season into parquet parts of about target_size_bytes, see the module docstring
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :param target_size_bytes: defaults to ScraperConstants.FBREF_COMPACTION_TARGET_SIZE_BYTES
+    :param grace_seconds: Seconds superseded objects are kept for before they are deleted, defaults to
+    ScraperConstants.FBREF_COMPACTION_GRACE_SECONDS
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: Dict of {"merged": number of parts merged, "written": keys of the merged parts, "deleted": keys of the
+    superseded objects deleted}
+    """
+    target_size_bytes = target_size_bytes or sc.FBREF_COMPACTION_TARGET_SIZE_BYTES
+    grace_seconds = sc.FBREF_COMPACTION_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    key_args = get_season_key_args(season_year, competition)
+    manifest_key = sc.FBREF_SEASON_MANIFEST_S3_FILE_KEY.format(**key_args)
+    result = {"merged": 0, "written": [], "deleted": []}
+
+    manifest = get_season_manifest(s3_client, season_year, competition)
+    shard_cache = {}
+    key_index = read_key_index(s3_client, manifest, cache=shard_cache) if manifest.get("key_index") else None
+    current_rows = key_index.get_current_rows() if key_index else None
+    # Parts written without upsert to a season with a key index are read as they are, so they are not merged into
+    # an indexed part
+    parts = [part for part in manifest["parts"] if key_index is None or part["key"] in key_index.parts]
+    season_prefix = manifest_key.rsplit("/", 1)[0] + "/"
+    groups = plan_compaction(parts, list_s3_object_sizes(s3_client, sc.S3_BUCKET_NAME, season_prefix),
+                             target_size_bytes)
+    if groups:
+        # 1) Upload the merged parts, they are not listed in the manifest yet
+        merged_parts = []
+        moves = {}
+        for group in groups:
+            merged_df, kept_rows = merge_parts(s3_client, group, key_index, current_rows)
+            created_at = datetime.now(timezone.utc)
+            part_id = f"{created_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}-compacted"
+            part_key = sc.FBREF_SEASON_PART_S3_FILE_KEY.format(part_id=part_id, extension="parquet", **key_args)
+            save_data_to_s3_bucket_as_parquet(s3_client, merged_df, bucket=sc.S3_BUCKET_NAME, key=part_key,
+                                              compression=compression or sc.FBREF_PARQUET_COMPRESSION)
+            new_row = 0
+            for old_key, rows in kept_rows.items():
+                moves[old_key] = {}
+                for row in rows:
+                    moves[old_key][row] = [part_key, new_row]
+                    new_row += 1
+            dates = [part[field] for part in group for field in ("first_date", "last_date") if part.get(field)]
+            # The replaced rows that were dropped are no longer counted, so the rows the manifest adds up to for the
+            # season (rows - replaced_rows of each part) stay the same
+            dropped_rows = sum(part["rows"] or 0 for part in group) - len(merged_df)
+            merged_parts.append({"key": part_key, "rows": len(merged_df), "first_date": min(dates, default=None),
+                                 "last_date": max(dates, default=None), "created_at": created_at.isoformat(),
+                                 "replaced_rows": sum(part.get("replaced_rows", 0) for part in group) - dropped_rows,
+                                 "compacted_from": len(group)})
+            result["written"].append(part_key)
+
+        # 2) Swap the manifest
+        index_keys = []
+
+        def swap_parts(current_manifest):
+            current_keys = [part["key"] for part in current_manifest["parts"]]
+            if any(old_key not in current_keys for old_key in moves):
+                raise CompactionConflict(f"The parts of season {season_year} were compacted by another run")
+            now = datetime.now(timezone.utc).isoformat()
+            superseded = [{"key": old_key, "superseded_at": now} for old_key in moves]
+
+            if current_manifest.get("key_index"):
+                # Rewritten from the latest index, so keys moved by concurrent writers since the compaction read it
+                # are kept. Those writers only move keys to their own new parts
+                current_index = read_key_index(s3_client, current_manifest, cache=shard_cache)
+                current_index.move_rows(moves)
+                index_keys.extend(save_key_index(s3_client, current_manifest, current_index, key_args,
+                                                 f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-compacted"))
+
+            # The merged parts take the place of the first part they replace
+            first = next(position for position, key in enumerate(current_keys) if key in moves)
+            kept_parts = [part for part in current_manifest["parts"] if part["key"] not in moves]
+            current_manifest["parts"] = kept_parts[:first] + merged_parts + kept_parts[first:]
+            current_manifest["superseded"] = current_manifest.get("superseded", []) + superseded
+            return current_manifest
+
+        try:
+            manifest = update_json_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=manifest_key, update=swap_parts)
+        except CompactionConflict:
+            delete_s3_objects(s3_client, sc.S3_BUCKET_NAME, result["written"] + index_keys)
+            raise
+        # The shards written by the attempts that lost to another writer were never listed in a manifest
+        listed = get_listed_key_index_objects(manifest)
+        delete_s3_objects(s3_client, sc.S3_BUCKET_NAME,
+                          [index_key for index_key in index_keys if index_key not in listed])
+        result["merged"] = len(moves)
+        metrics.increment("compaction.merged_parts", len(moves))
+        logger.info(f"✅ Compacted {len(moves)} parts of season {season_year} - {season_year + 1} into "
+                    f"{len(merged_parts)}")
+
+    # 3) Delete the objects superseded for longer than the grace period
+    result["deleted"] = delete_superseded_objects(s3_client, manifest_key, grace_seconds)
+    return result
+
+
+def compact_partitioned_dataset(s3_client, prefix: str = None, seasons: list = None, target_size_bytes: int = None,
+                                grace_seconds: float = None, compression: str = None) -> dict:
+    """
+    Merges the small files of each partition of a partitioned dataset into files of about target_size_bytes, see the
+    module docstring. The merged files are uploaded first, then swapped into the partition list with a single
+    conditional update, and the small files are listed as superseded in the partition list until they are deleted
+    after the grace period. Readers that read the files of the partition list (see read_partitioned_parquet_from_s3)
+    see either the small files or the merged files, never both
+    :param s3_client: s3 client instance
+    :param prefix: The root of the dataset, defaults to ScraperConstants.FBREF_PARTITIONED_S3_PREFIX
+    :param seasons: YYYY - the seasons to compact, defaults to every season
+    :param target_size_bytes: defaults to ScraperConstants.FBREF_COMPACTION_TARGET_SIZE_BYTES
+    :param grace_seconds: Seconds superseded files are kept for before they are deleted, defaults to
+    ScraperConstants.FBREF_COMPACTION_GRACE_SECONDS
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: Dict of {"merged": number of files merged, "written": keys of the merged files, "deleted": keys of the
+    superseded files deleted}
+    """
+    prefix = (prefix or sc.FBREF_PARTITIONED_S3_PREFIX).rstrip("/")
+    target_size_bytes = target_size_bytes or sc.FBREF_COMPACTION_TARGET_SIZE_BYTES
+    grace_seconds = sc.FBREF_COMPACTION_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    list_key = f"{prefix}/{PARTITION_LIST_FILE_NAME}"
+    result = {"merged": 0, "written": [], "deleted": []}
+
+    partition_list = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=list_key, default={"partitions": []})
+    partitions = [partition for partition in partition_list["partitions"]
+                  if not seasons or partition["values"].get("season") in {str(season) for season in seasons}]
+    sizes = {}
+    for season_prefix in sorted({f"{prefix}/season={partition['values']['season']}/" for partition in partitions}):
+        sizes.update(list_s3_object_sizes(s3_client, sc.S3_BUCKET_NAME, season_prefix))
+
+    # 1) Upload the merged files, they are not listed in the partition list yet
+    swaps = {}
+    for partition in partitions:
+        small_files = [file_name for file_name in partition["files"]
+                       if sizes.get(f"{prefix}/{partition['path']}/{file_name}", target_size_bytes) < target_size_bytes]
+        groups = group_by_size(small_files, [sizes[f"{prefix}/{partition['path']}/{file_name}"]
+                                             for file_name in small_files], target_size_bytes)
+        for group in groups:
+            files = [s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                          Key=f"{prefix}/{partition['path']}/{file_name}")["Body"].read()
+                     for file_name in group]
+            file_name = f"part-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}" \
+                        f"-compacted.parquet"
+            key = f"{prefix}/{partition['path']}/{file_name}"
+            s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key=key, ContentType="application/vnd.apache.parquet",
+                                 Body=merge_parquet_files(files, row_group_size=sc.FBREF_PARQUET_ROW_GROUP_SIZE,
+                                                          compression=compression or sc.FBREF_PARQUET_COMPRESSION))
+            swaps.setdefault(partition["path"], []).append((group, file_name))
+            result["written"].append(key)
+
+    if swaps:
+        # 2) Swap the partition list
+        def swap_files(current_list):
+            now = datetime.now(timezone.utc).isoformat()
+            current_partitions = {partition["path"]: partition for partition in current_list["partitions"]}
+            for path, groups in swaps.items():
+                files = current_partitions[path]["files"] if path in current_partitions else []
+                old_files = [file_name for group, _ in groups for file_name in group]
+                if any(file_name not in files for file_name in old_files):
+                    raise CompactionConflict(f"The files of partition {path} were compacted by another run")
+                current_partitions[path]["files"] = sorted(
+                    [file_name for file_name in files if file_name not in old_files] +
+                    [file_name for _, file_name in groups])
+                current_list["superseded"] = current_list.get("superseded", []) + [
+                    {"key": f"{prefix}/{path}/{file_name}", "superseded_at": now} for file_name in old_files]
+            return current_list
+
+        try:
+            update_json_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=list_key, update=swap_files)
+        except CompactionConflict:
+            delete_s3_objects(s3_client, sc.S3_BUCKET_NAME, result["written"])
+            raise
+        result["merged"] = sum(len(group) for groups in swaps.values() for group, _ in groups)
+        metrics.increment("compaction.merged_files", result["merged"])
+        logger.info(f"✅ Compacted {result['merged']} files of {len(swaps)} partitions into "
+                    f"{len(result['written'])}")
+
+    # 3) Delete the files superseded for longer than the grace period
+    result["deleted"] = delete_superseded_objects(s3_client, list_key, grace_seconds)
+    return result
+
+
+def delete_superseded_objects(s3_client, manifest_key: str, grace_seconds: float) -> list:
+    """
+    Deletes the objects listed as superseded in the manifest (or partition list) for longer than grace_seconds. They
+    are removed from the manifest first, so a failed delete leaves an unlisted object rather than a listed object that
+    does not exist
+    :return: The keys deleted
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)).isoformat()
+    expired = []
+
+    def remove_expired(manifest):
+        expired[:] = [entry["key"] for entry in manifest.get("superseded", []) if entry["superseded_at"] <= cutoff]
+        manifest["superseded"] = [entry for entry in manifest.get("superseded", []) if entry["key"] not in expired]
+        return manifest
+
+    manifest = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=manifest_key, default={})
+    if not any(entry["superseded_at"] <= cutoff for entry in manifest.get("superseded", [])):
+        return []
+    update_json_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=manifest_key, update=remove_expired)
+    delete_s3_objects(s3_client, sc.S3_BUCKET_NAME, expired)
+    logger.info(f"🗑️ Deleted {len(expired)} superseded objects")
+    return list(expired)
@@ -1,21 +1,151 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime, timedelta, timezone
 import io
 import json
-import boto3
-import requests
-from bs4 import BeautifulSoup
+import os
+import uuid
+from collections import deque
+from pathlib import Path
 import pandas as pd
-import time
 import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pandas import DataFrame
 from scrapers.scraper_constants import ScraperConstants as sc
-from utils.s3_utils import save_data_to_s3_bucket_as_csv, is_running_in_aws
+from scrapers.parsers import ParserBackend, get_parser_backend
+from scrapers.season_keys import get_season_key_args
+from utils.s3_utils import save_data_to_s3_bucket_as_csv, is_running_in_aws, does_file_exist_in_s3, \
+    read_json_from_s3, save_data_to_s3_bucket_as_parquet, update_json_in_s3, save_json_to_s3, delete_s3_objects
+from schemas.pandas_schemas import FbRefSchema
+from utils.parquet_utils import add_files_to_partition_list_in_s3, save_partitioned_parquet_to_s3
 from botocore.exceptions import ClientError
 from utils.arguments_utils import get_fbref_arguments
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from utils.rate_limit_utils import AdaptiveHostRateLimiter, THROTTLE_STATUS_CODES
+from utils.selenium_utils import ChromeDriverPool
+from utils.cache_utils import HtmlCache
+from utils.http_utils import HttpClient, AsyncHttpClient, HTTP_ERRORS
+from utils.ledger_utils import ProgressLedger, LocalProgressLedger, S3ProgressLedger
+from utils.schedule_index_utils import ScheduleIndex, LocalScheduleIndex, S3ScheduleIndex
+from utils.key_index_utils import KeyIndex, get_shard_ids, hash_keys, upsert_dataframe
+from utils.s3_transfer_utils import get_s3_client
+from utils.metrics_utils import metrics, timed, profile_run
+
+
+class MatchReportError(Exception):
+    """
+    Raised when a match report could not be downloaded or has no player data, so the match is marked as failed (and
+    retried by a later run) instead of being written as a match with no rows
+    """
+
+
+def get_html_content(url):
+    """
+    Tries to download the html for the url using the pooled http client - if a non 200 response code is generated it
+    will attempt to use headless selenium. The selenium drivers are pooled and reused between urls
+    429 and 503 responses slow the rate limiter down and the request is retried after its backoff, selenium is only
+    used once the retries are used up
+    If the html cache is enabled, fresh pages are returned from the cache and expired pages are revalidated with a
+    conditional request before they are downloaded again
+    :param url: The url to download
+    :return: The raw html of the page (bytes from requests or the cache, str from selenium)
+    """
+
+    try:
+        cached = html_cache.get(url) if html_cache else None
+        if cached and cached["is_fresh"]:
+            metrics.increment("fetch.cache_hits")
+            return cached["content"]
+
+        # Back off and retry when the site asks to slow down (429/503) instead of switching to selenium
+        for attempt in range(sc.FBREF_MAX_THROTTLED_RETRIES + 1):
+            metrics.observe("fetch.rate_limit_wait", rate_limiter.wait(url))
+            with metrics.timer("fetch.requests"):
+                response = http_client.get(url, headers=HtmlCache.get_conditional_headers(cached))
+            if not record_fetch_response(url, response):
+                break
+
+        html = read_html_response(url, response, cached)
+        return html if html is not None else get_html_with_selenium(url)
+    except HTTP_ERRORS as e:
+        metrics.increment("fetch.errors")
+        logger.error(f"❌ Unable to load {url}: {e}")
+
+
+def record_fetch_response(url, response) -> bool:
+    """
+    Feeds the response status to the rate limiter
+    :return: True if the site asked to slow down (429/503) and the request should be retried after the backoff
+    """
+    rate_limiter.record_response(url, response.status_code, response.headers)
+    if response.status_code in THROTTLE_STATUS_CODES:
+        metrics.increment("fetch.throttled")
+        return True
+    return False
 
 
+def read_html_response(url, response, cached: dict = None):
+    """
+    Returns the html of a 200 response, or the cached html for a 304 response, and updates the html cache
+    :param url: The url that was requested
+    :param response: The response of the http client
+    :param cached: The cache entry the request was made for, see HtmlCache.get
+    :return: The raw html or None if the page has to be loaded with selenium
+    """
+    if response.status_code == 304 and cached:
+        metrics.increment("fetch.not_modified")
+        html_cache.refresh(url, cached["content"])
+        return cached["content"]
+    elif response.status_code == 200:
+        metrics.add_bytes("fetch.requests", len(response.content))
+        if html_cache:
+            html_cache.put(url, response.content, etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"))
+        return response.content
+    metrics.increment(f"fetch.requests.status_{response.status_code}")
+    return None
+
+
+def get_html_with_selenium(url):
+    """
+    Loads the page with a pooled headless chrome driver, used when requests is blocked
+    :return: The page source (str)
+    """
+    metrics.observe("fetch.rate_limit_wait", rate_limiter.wait(url))
+    with metrics.timer("fetch.selenium"):
+        html = driver_pool.get_page_source(url)
+    metrics.add_bytes("fetch.selenium", len(html) if html else 0)
+    if html_cache:
+        html_cache.put(url, html)
+    return html
+
+
+async def get_html_content_async(url, client: AsyncHttpClient):
+    """
+    Asyncio version of get_html_content. Waiting on the rate limiter and the network does not block the event loop,
+    the html cache and the selenium fallback run in worker threads
+    :param url: The url to download
+    :param client: The AsyncHttpClient of the run
+    :return: The raw html of the page (bytes from the http client or the cache, str from selenium)
+    """
+    try:
+        cached = await asyncio.to_thread(html_cache.get, url) if html_cache else None
+        if cached and cached["is_fresh"]:
+            metrics.increment("fetch.cache_hits")
+            return cached["content"]
+
+        for attempt in range(sc.FBREF_MAX_THROTTLED_RETRIES + 1):
+            metrics.observe("fetch.rate_limit_wait", await rate_limiter.wait_async(url))
+            with metrics.timer("fetch.requests"):
+                response = await client.get(url, headers=HtmlCache.get_conditional_headers(cached))
+            if not record_fetch_response(url, response):
+                break
+
+        html = await asyncio.to_thread(read_html_response, url, response, cached)
+        return html if html is not None else await asyncio.to_thread(get_html_with_selenium, url)
+    except HTTP_ERRORS as e:
+        metrics.increment("fetch.errors")
+        logger.error(f"❌ Unable to load {url}: {e}")
+
 
 def get_soup_object(url):
     """
@@ -24,113 +154,243 @@ def get_soup_object(url):
     :param url: The url to create the soup object
     :return: Beautiful Soup object
     """
+    from bs4 import BeautifulSoup
+
+    html = get_html_content(url)
+    if html is None:
+        return None
+    with metrics.timer("parse.soup"):
+        return BeautifulSoup(html, "html.parser")
+
+
+def get_parsed_document(url, parser: ParserBackend = None):
+    """
+    Downloads the page and parses it with the parser backend
+    :param url: The url of the page
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: The backend specific document or None if the page could not be downloaded
+    """
+    parser = parser or get_parser_backend()
+    html = get_html_content(url)
+    if html is None:
+        return None
+    with metrics.timer("parse.document"):
+        return parser.parse(html)
 
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            return BeautifulSoup(response.content, 'html.parser')
-        else:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")  # keep it headless if you want
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("start-maximized")
-            chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                                        "Chrome/116.0.5845.96 Safari/537.36")
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.get(url)
-
-            html = driver.page_source
-            driver.quit()
-
-            return BeautifulSoup(html, "html.parser")
-    except requests.exceptions.RequestException:
-        logger.error("Unable to load data")
-
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def scrape_team_player_data(soup: BeautifulSoup, team: str, home_or_away: str) -> pd.DataFrame:
+# Shared by every fetch so concurrent workers stay within the per-host request budget
+rate_limiter = AdaptiveHostRateLimiter(requests_per_minute=sc.FBREF_REQUESTS_PER_MINUTE, burst=sc.FBREF_REQUEST_BURST,
+                                       min_requests_per_minute=sc.FBREF_MIN_REQUESTS_PER_MINUTE,
+                                       max_requests_per_minute=sc.FBREF_MAX_REQUESTS_PER_MINUTE)
+# Chrome drivers for the selenium fallback, launched the first time requests is blocked
+driver_pool = ChromeDriverPool(size=sc.FBREF_MAX_WORKERS, max_pages=sc.SELENIUM_MAX_PAGES_PER_DRIVER)
+# Optional on-disk cache of downloaded pages, enabled with --cache_dir
+html_cache = None
+
+
+def create_http_client(pool_size: int = None, http2: bool = None) -> HttpClient:
+    """
+    Creates the pooled http client used for every fbref fetch
+    :param pool_size: Number of connections kept open, the number of concurrent fetches
+    :param http2: Use HTTP/2, defaults to ScraperConstants.FBREF_HTTP2
+    """
+    return HttpClient(pool_size=pool_size or sc.FBREF_MAX_WORKERS, connect_timeout=sc.HTTP_CONNECT_TIMEOUT_SECONDS,
+                      read_timeout=sc.FBREF_READ_TIMEOUT_SECONDS, max_retries=sc.HTTP_MAX_RETRIES,
+                      backoff_factor=sc.HTTP_RETRY_BACKOFF_FACTOR, http2=sc.FBREF_HTTP2 if http2 is None else http2)
+
+
+# Keep-alive connections shared by every fetch, sized to the number of concurrent fetches with --max_workers
+http_client = create_http_client()
+
+
+def configure_fetching(requests_per_minute: int = None, pool_size: int = None, http2: bool = None):
+    """
+    Replaces the rate limiter and http client every fbref fetch uses, for runs that do not use the defaults (e.g. an
+    orchestrator worker that gets a share of the request budget). Call it before scraping starts
+    :param requests_per_minute: Requests per minute to fbref.com, the adaptive rate is never raised above it
+    :param pool_size: Number of connections kept open, the number of concurrent fetches
+    :param http2: Use HTTP/2, defaults to ScraperConstants.FBREF_HTTP2
+    """
+    global rate_limiter, http_client
+    if requests_per_minute:
+        rate_limiter = AdaptiveHostRateLimiter(requests_per_minute=requests_per_minute, burst=sc.FBREF_REQUEST_BURST,
+                                               min_requests_per_minute=min(sc.FBREF_MIN_REQUESTS_PER_MINUTE,
+                                                                           requests_per_minute),
+                                               max_requests_per_minute=requests_per_minute)
+    if pool_size or http2:
+        http_client = create_http_client(pool_size, http2=http2)
+
+
+def create_async_http_client(pool_size: int = None, http2: bool = None) -> AsyncHttpClient:
+    """
+    Creates the pooled http client used by the asyncio run mode, see create_http_client
+    """
+    return AsyncHttpClient(pool_size=pool_size or sc.FBREF_MAX_WORKERS,
+                           connect_timeout=sc.HTTP_CONNECT_TIMEOUT_SECONDS, read_timeout=sc.FBREF_READ_TIMEOUT_SECONDS,
+                           max_retries=sc.HTTP_MAX_RETRIES, backoff_factor=sc.HTTP_RETRY_BACKOFF_FACTOR,
+                           http2=sc.FBREF_HTTP2 if http2 is None else http2)
+
+def build_table_index(document, parser: ParserBackend = None) -> dict:
+    """
+    Builds an index of every stats table in the match report in a single pass over the document.
+    The index maps the table id (e.g. stats_b2b47a98_summary) to the table's rows so each tab can be looked up
+    directly instead of walking the document again with find_next for every tab.
+    :param document: The parsed match report document
+    :param parser: The parser backend used to parse the document, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: Dict of {table_id: [[(data_stat, text), ...], ...]} in document order
+    """
+    parser = parser or get_parser_backend()
+    return parser.get_stats_tables(document)
+
+
+def get_team_ids_from_table_index(table_index: dict) -> [str]:
+    """
+    Extracts the fbref team ids from the player stats tables in the index. The summary tab is present on every match
+    report (including older reports without additional tabs), so it is used to identify the teams.
+    The home team's tables appear first in the document and the away team's tables appear last.
+    :param table_index: Dict of {table_id: rows} created by build_table_index
+    :return: List of team ids in document order
+    """
+    return [table_id[len("stats_"):-len("_summary")] for table_id in table_index
+            if table_id.startswith("stats_") and table_id.endswith("_summary")]
+
+
+# Fixed position of each scraped column, columns missing from the schema are added after these
+PLAYER_COLUMNS = list(FbRefSchema().get_schema())
+
+
+class PlayerColumnBuilder:
+    """
+    Column oriented builder for the player rows of a team's stats tables.
+    1) Each column has a fixed position, taken from the columns it is created with. Columns that are not in that list
+    are added at the end when they are first seen
+    2) Each column is a list with one slot per player, allocated up front for the number of players
+    3) Every tab lists the same players in the same order, so a row is added to the player slot at the same position.
+    The player name is only used to find the slot if the slot at that position belongs to another player, so two
+    players with the same name stay as separate rows
+    4) The first non-empty value of each column is kept for a player
+    """
+
+    def __init__(self, columns: list, size: int = 0):
+        """
+        :param columns: The column names in order
+        :param size: Number of player slots to allocate
+        """
+        self.column_index = {col: position for position, col in enumerate(columns)}
+        self.values = [[None] * size for _ in columns]
+        self.size = size
+        self.players = self.values[self._get_column_position("player")]
+
+    def _get_column_position(self, col: str) -> int:
+        position = self.column_index.get(col)
+        if position is None:
+            position = self.column_index[col] = len(self.values)
+            self.values.append([None] * self.size)
+        return position
+
+    def _add_slot(self) -> int:
+        for column in self.values:
+            column.append(None)
+        self.size += 1
+        return self.size - 1
+
+    def _get_slot(self, position: int, player_name: str, filled: set) -> int:
+        if position < self.size and position not in filled and self.players[position] in (None, player_name):
+            return position
+        for slot, name in enumerate(self.players):
+            if name == player_name and slot not in filled:
+                return slot
+        return self._add_slot()
+
+    def add_table(self, table_rows: list):
+        """
+        Adds the rows of one tab of a team's stats table
+        :param table_rows: The rows of the table, each row is a list of (data_stat, value) pairs
+        """
+        filled = set()
+        for position, table_cells in enumerate(table_cells for table_cells in table_rows if table_cells):
+            # Extract player name from the player column
+            player_name = next(value for col, value in table_cells if col == "player")
+            if not player_name:
+                logger.info(f"No player name found in row {position}")
+
+            slot = self._get_slot(position, player_name, filled)
+            filled.add(slot)
+            for col, value in table_cells:
+                column = self.values[self._get_column_position(col)]
+                if not column[slot]:
+                    column[slot] = value
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        :return: Dataframe with a row per player and the columns that have at least one value
+        """
+        return pd.DataFrame({col: self.values[position] for col, position in self.column_index.items()
+                             if any(value is not None for value in self.values[position])})
+
+
+@timed("parse.team_player_data")
+def scrape_team_player_data(document, team: str, home_or_away: str, table_index: dict = None,
+                            parser: ParserBackend = None) -> pd.DataFrame:
     """
     Scrape the player data for a specified team. Iterates through all tabs on the tables and extracts all their data
-    1) Locates the header for the teams table.
-    2) Locates the identifier for each tab (summary, passing, passing_types, etc)
-    3) Locates the table body and iterates though the row elements
-    4) A data dict is added for each row where the key is the player_name and the value is a dict of the remaining
-    column: value pairs
+    1) Locates the team id for the teams tables from the table index (home is first, away is last)
+    2) Looks up the table for each tab (summary, passing, passing_types, etc) in the table index
+    3) Iterates though the rows of the table body
+    4) The cells of each row are added to the player's slot in a PlayerColumnBuilder
     5) Some older match reports won't have additional tabs, so if this returns none, it will just scrape the summary tab
     :param home_or_away: Takes the value 'home' for a home team and 'away' for an away team. It is used to locate the
-    table for the correct team. Home will have index 1, away will have index 0
-    :param soup: The soup object to be scraped
+    table for the correct team. Home will be the first team in the table index, away will be the last
+    :param document: The parsed match report document to be scraped
     :param team: The name of the team to identify which table to scrape
+    :param table_index: Optional table index created by build_table_index. Pass this in when scraping both teams
+    from the same document so it is only walked once
+    :param parser: The parser backend used to parse the document, defaults to ScraperConstants.FBREF_PARSER_BACKEND
     :return: Pandas dataframe with the data from the teams table
     """
     # List of the table tabs
     table_tabs = ["summary", "passing", "passing_types", "defense", "possession", "misc"]
-    table_headers = [h2 for h2 in soup.find_all("h2") if h2.get_text(strip=True).endswith("Player Stats")]
+    if table_index is None:
+        table_index = build_table_index(document, parser)
+
+    team_ids = get_team_ids_from_table_index(table_index)
     if home_or_away == "home":
-        table_header = table_headers[0]
+        team_id = team_ids[0]
     else:
-        table_header = table_headers[-1]
+        team_id = team_ids[-1]
+
+    # The summary tab lists every player, so it sets the number of player slots
+    summary_rows = table_index.get(f"stats_{team_id}_summary") or []
+    builder = PlayerColumnBuilder(PLAYER_COLUMNS, size=sum(1 for table_cells in summary_rows if table_cells))
 
-    # Dict to store player data in
-    data_dict = {}
-    # Add the data from each tab in the table to the data-dict - older match reports won't have multiple tabs
+    # Add the data from each tab in the table to the builder - older match reports won't have multiple tabs
     for tab in table_tabs:
         try:
 
-            table = table_header.find_next("table", class_="stats_table", id=lambda x: x and x.endswith(tab))
+            table_rows = table_index.get(f"stats_{team_id}_{tab}")
 
-            if not table:
+            if table_rows is None:
                 logger.info(f"No table found for {tab}. Skipping...")
                 continue
 
-            table_body = table.find("tbody")
-            table_rows = table_body.find_all("tr") if table_body else []
-
-            for row in table_rows:
-                # Get a list of all the cells in the row
-                table_cells = row.find_all(["th", "td"])
-                if not table_cells:
-                    continue
-
-                # Extract player name from the first column
-                player_name = row.find(["th", "td"], {"data-stat": "player"}).get_text(strip=True)
-
-                if not player_name:
-                    logger.info(f"No player name found for {tab}. Skipping...")
-
-                # Initialize player dict if not in data_dict
-                if player_name not in data_dict:
-                    data_dict[player_name] = {}
-
-
-                for cell in table_cells:
-                    col = cell["data-stat"]
-                    value = cell.get_text(strip=True)
-
-                    # Ignore player column since it is added as a key
-                    if col == "player":
-                        continue
-                    # Store the col value pair in the player data dict if it does not exist already
-                    elif col not in data_dict[player_name] or not data_dict[player_name][col]:
-                        data_dict[player_name][col] = value
+            builder.add_table(table_rows)
 
         except Exception as e:
             print(f"Couldn't find element for {tab}, error: {e}")
 
-    # Convert dictionary to DataFrame
-    df = pd.DataFrame.from_dict(data_dict, orient="index").reset_index()
-    df.rename(columns={"index": "player"}, inplace=True)
-
-    return df
+    return builder.to_dataframe()
 
 
-def get_team_name_from_match_report(soup: BeautifulSoup) -> [str]:
-    header = soup.find('h1').get_text()
+def get_team_name_from_match_report(document, parser: ParserBackend = None) -> [str]:
+    """
+    Extracts the home and away team names from the match report header
+    :param document: The parsed match report document
+    :param parser: The parser backend used to parse the document, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: [home_team, away_team]
+    """
+    parser = parser or get_parser_backend()
+    header = parser.get_match_header(document)
     team_split = header.split('vs.')
 
     home_team = team_split[0].strip()
@@ -139,68 +399,127 @@ def get_team_name_from_match_report(soup: BeautifulSoup) -> [str]:
     return [home_team, away_team]
 
 
-def scrape_match_report_data(match_url: str) -> DataFrame:
+@timed("parse.match_report")
+def parse_match_report(html, parser: ParserBackend = None) -> DataFrame:
     """
-    Scrapes the match data from the match report for each player
+    Parses the match data from the html of a match report for each player
     1) Extract the team names and date from the header
     2) Extract data for home team players
     3) Extract data for home team goalkeeper
     4) Extract data for the away team players
     5) Extract data for away team goalkeeper
     6) Concatenate the dataframes
-    :param match_url: the url for the match report on fbref.com
+    :param html: The html of the match report (bytes or str)
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
     :return: A dataframe containing all the data for players on both teams
+    Raises MatchReportError if there is no html, the page could not be parsed or it has no player data (e.g. a page
+    served instead of the match report when the scraper is blocked)
     """
-    df = pd.DataFrame()
+    if html is None:
+        raise MatchReportError("No html to parse")
+    parser = parser or get_parser_backend()
     try:
-
-        soup = get_soup_object(match_url)
-        # response = requests.get(match_url)
-        # if response.status_code != 200:
-        #     time.sleep(300)
-        #     response = requests.get(match_url)
-
-        # Raise error if not 200 status code
-        # response.raise_for_status()
-        #
-        # soup = BeautifulSoup(response.content, 'html.parser')
+        document = parser.parse(html)
 
         # First extract home team, away team, game week and date
-        home_team, away_team = get_team_name_from_match_report(soup)
+        home_team, away_team = get_team_name_from_match_report(document, parser)
+
+        # Index the stats tables once and share it between both teams
+        table_index = build_table_index(document, parser)
         logger.info(f"Scraping home team data: {home_team}")
-        home_team_data = scrape_team_player_data(soup, home_team, home_or_away="home")
+        home_team_data = scrape_team_player_data(document, home_team, home_or_away="home", table_index=table_index)
         logger.info(f"Scraping away team data: {away_team}")
-        away_team_data = scrape_team_player_data(soup, away_team, home_or_away="away")
-
-        return pd.concat([home_team_data, away_team_data])
+        away_team_data = scrape_team_player_data(document, away_team, home_or_away="away", table_index=table_index)
+        match_df = pd.concat([home_team_data, away_team_data])
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Failed to access match report: {e}")
-        return df
     except Exception as e:
-        logging.error(f"❌ Unexpected error: {e}")
-        return df
+        raise MatchReportError(f"Failed to parse match report: {e}") from e
+
+    if match_df.empty:
+        raise MatchReportError("The match report has no player data")
+    return match_df
+
+
+def scrape_match_report_data(match_url: str, parser: ParserBackend = None) -> DataFrame:
+    """
+    Downloads the match report and scrapes the match data for each player, see parse_match_report
+    :param match_url: the url for the match report on fbref.com
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: A dataframe containing all the data for players on both teams
+    Raises MatchReportError if the match report could not be downloaded or parsed
+    """
+    html = get_html_content(match_url)
+    if html is None:
+        raise MatchReportError(f"Failed to download match report: {match_url}")
+    return parse_match_report(html, parser)
+
+
+def parse_match_report_records(html, parser_name: str = None) -> dict:
+    """
+    Entry point for the parser worker processes. Only the html goes to the worker and only the compact records come
+    back, so nothing else needs to be pickled between the processes
+    :param html: The html of the match report (bytes or str)
+    :param parser_name: Name of the parser backend ('lxml' or 'html.parser')
+    :return: Dict of {"columns": column names, "rows": list of row tuples}
+    """
+    df = parse_match_report(html, get_parser_backend(parser_name))
+    return {"columns": list(df.columns), "rows": list(df.itertuples(index=False, name=None))}
+
+
+def records_to_dataframe(records: dict) -> DataFrame:
+    return pd.DataFrame(records["rows"], columns=records["columns"])
+
+
+def fetch_and_parse_match_report(match_url: str, parser: ParserBackend, parse_pool: ProcessPoolExecutor) -> DataFrame:
+    """
+    Downloads the match report in the calling thread and parses it in the process pool, so parsing is not held back
+    by the GIL while other threads wait on the network
+    :param match_url: the url for the match report on fbref.com
+    :param parser: The parser backend
+    :param parse_pool: The process pool of parser workers
+    :return: A dataframe containing all the data for players on both teams
+    """
+    html = get_html_content(match_url)
+    if html is None:
+        raise MatchReportError(f"Failed to download match report: {match_url}")
+    # Timed here as the metrics of the worker processes are not sent back
+    with metrics.timer("parse.match_report_process"):
+        return records_to_dataframe(parse_pool.submit(parse_match_report_records, html, parser.name).result())
 
 
 def extract_table_value_from_row_cell(row, data_stat, is_header=False):
     """
     Extracts text from a table row cell safely.
 
-    :param row: The BeautifulSoup row element.
+    :param row: The schedule row dict created by the parser backend's get_schedule_rows.
     :param data_stat: The 'data-stat' attribute to find.
     :param is_header: Boolean indicating if it is a <th> instead of <td>.
     :return: The extracted text or None if not found.
     """
     tag = "th" if is_header else "td"
-    cell = row.find(tag, {"data-stat": data_stat})
-    return cell.get_text(strip=True) if cell else None
+    return row[tag].get(data_stat)
+
+
+# The watermark columns scraped from the scores and fixtures table: (column_name, data_stat, is_header)
+WATERMARK_COLUMNS = [
+    ("gameweek", "gameweek", True),  # Found in <th>
+    ("date", "date", False),
+    ("time", "start_time", False),
+    ("home_team", "home_team", False),
+    ("home_xg", "home_xg", False),
+    ("score", "score", False),
+    ("away_xg", "away_xg", False),
+    ("away_team", "away_team", False),
+    ("attendance", "attendance", False),
+    ("referee", "referee", False),
+]
 
 
 def update_dataframe_with_watermark_columns(row, match_df, columns):
     """
     Updates a dataframe with watermark values from a match row.
 
-    :param row: The BeautifulSoup row element.
+    :param row: The schedule row dict created by the parser backend's get_schedule_rows.
     :param match_df: The DataFrame to update.
     :param columns: A list of tuples (column_name, data_stat, is_header).
     :return: Updated DataFrame.
@@ -210,110 +529,524 @@ def update_dataframe_with_watermark_columns(row, match_df, columns):
 
     return match_df
 
-def scrape_data_in_date_range(season: int, start_date=None, end_date=None):
+def normalize_date(date_str):
+    """
+    Validates a date argument and zero pads it (2024-8-20 -> 2024-08-20), so it can be compared as a string with the
+    ISO dates of the schedule
+    :param date_str: Date in the format YYYY-MM-DD, or None
+    """
+    if not date_str:
+        return date_str
+    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def get_match_tasks_in_date_range(match_rows: list, start_date=None, end_date=None) -> list:
+    """
+    Filters the rows of the scores and fixtures table for match reports that fall in the range start_date to end_date
+    (inclusive). It stops when it reaches upcoming fixtures (e.g 'Head-to-Head' is shown instead of 'Match Report')
+    :param match_rows: The schedule rows created by the parser backend's get_schedule_rows
+    :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param end_date: end date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :return: List of (row, match_url, date_str) tuples in fixture order
+    """
+    # Normalise the dates once, the ISO dates of the rows are then compared as strings
+    start_date, end_date = normalize_date(start_date), normalize_date(end_date)
+
+    match_tasks = []
+    for row in match_rows:
+        try:
+            # Extract date and match url
+            date_str = row["td"]["date"]
+
+            # Update start_date if not specified to be used in the file name
+            if not start_date:
+                start_date = date_str
+
+            match_report_href = row["match_report_href"]
+            match_report_text = row["td"]["match_report"] if match_report_href else None
+
+            # Skip if no match report available
+            if not match_report_href:
+                continue
+
+            match_url = "https://fbref.com" + match_report_href
+
+            # Apply date filtering if needed
+            if start_date and date_str < start_date:
+                continue
+            if end_date and date_str > end_date:
+                logger.info(f"Match report date: {date_str} exceeds specified end date: {end_date}")
+                logger.info("Terminating scraper")
+                break
+            if match_report_text == "Head-to-Head":
+                logger.info("Match report is not available for the current match")
+                logger.info("Terminating scraper")
+                break
+
+            match_tasks.append((row, match_url, date_str))
+
+        except Exception as e:
+            logging.error(f"⚠️ Error processing row: {e}")
+            continue
+
+    return match_tasks
+
+
+def get_season_url(season: int, competition: str = None) -> str:
+    """
+    :param season: Season to scrape data from (YYYY)
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: The url of the scores and fixtures page of the season
+    """
+    comp = sc.FBREF_COMPETITIONS[competition or sc.FBREF_DEFAULT_COMPETITION]
+    return sc.FBREF_URL.format(comp_id=comp["id"], comp_name=comp["name"], year=season, next_year=season+1)
+
+
+def iter_match_tasks(season: int, start_date=None, end_date=None, parser: ParserBackend = None,
+                     competition: str = None, schedule_index: ScheduleIndex = None):
+    """
+    Reads the scores and fixtures page for a season and yields the match reports that fall in the range start_date
+    to end_date (inclusive), see get_match_tasks_in_date_range
+    With a schedule index, the schedule is diffed against the index instead and the pending matches of the index are
+    yielded: the completed matches that were not scraped yet and the scraped matches whose details changed
+    :param season: Season to scrape data from (YYYY)
+    :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD), only used to seed a new
+    schedule index
+    :param end_date: end date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :param schedule_index: Optional ScheduleIndex for the season
+    :return: Generator of (row, match_url, date_str) tuples in fixture order
+    """
+    match_rows = get_schedule_rows(season, parser, competition)
+    yield from get_schedule_match_tasks(match_rows, start_date=start_date, end_date=end_date,
+                                        schedule_index=schedule_index)
+
+
+def parse_schedule_rows(html, parser: ParserBackend) -> list:
+    """
+    :param html: The html of the scores and fixtures page
+    :param parser: The parser backend
+    :return: The rows of the match table, see the parser backend's get_schedule_rows
+    """
+    with metrics.timer("parse.document"):
+        document = parser.parse(html)
+    return parser.get_schedule_rows(document)
+
+
+def get_schedule_rows(season: int, parser: ParserBackend = None, competition: str = None) -> list:
+    """
+    Downloads the scores and fixtures page of the season and returns the rows of the match table
+    :param season: Season to scrape data from (YYYY)
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: The schedule rows, empty if the page could not be downloaded
+    """
+    html = get_html_content(get_season_url(season, competition))
+    return parse_schedule_rows(html, parser or get_parser_backend()) if html is not None else []
+
+
+def get_schedule_match_tasks(match_rows: list, start_date=None, end_date=None,
+                             schedule_index: ScheduleIndex = None) -> list:
+    """
+    Picks the match reports to scrape from the rows of the schedule, see iter_match_tasks
+    :param match_rows: The schedule rows created by the parser backend's get_schedule_rows
+    :return: List of (row, match_url, date_str) tuples in fixture order
+    """
+    if not match_rows:
+        logging.error("❌ Could not find match table on page.")
+        return []
+
+    if schedule_index is not None:
+        schedule_index.update(match_rows, start_date=start_date)
+        schedule_index.save()
+        rows = {"https://fbref.com" + row["match_report_href"]: row for row in match_rows if row["match_report_href"]}
+        return [(rows[entry["match_url"]], entry["match_url"], entry["date"])
+                for entry in schedule_index.get_pending(end_date=end_date)]
+
+    return get_match_tasks_in_date_range(match_rows, start_date=start_date, end_date=end_date)
+
+
+def select_match_tasks(match_rows: list, start_date=None, end_date=None, ledger: ProgressLedger = None,
+                       schedule_index: ScheduleIndex = None) -> list:
+    """
+    Picks the match reports a run has to scrape from the rows of the schedule, see scrape_data_to_sink
+    :param match_rows: The schedule rows created by the parser backend's get_schedule_rows
+    :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param end_date: end date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param ledger: Optional ProgressLedger for the season
+    :param schedule_index: Optional ScheduleIndex for the season
+    :return: List of (row, match_url, date_str) tuples in fixture order
+    """
+    start_date, end_date = normalize_date(start_date), normalize_date(end_date)
+    retry_urls = set(ledger.get_retry_urls()) if ledger and schedule_index is None else set()
+    if retry_urls:
+        # Read the schedule from the start of the season to find the failed matches before start_date
+        logger.info(f"Retrying {len(retry_urls)} failed matches")
+        match_tasks = [task for task in get_schedule_match_tasks(match_rows, end_date=end_date)
+                       if task[1] in retry_urls or not start_date or task[2] >= start_date]
+    else:
+        match_tasks = get_schedule_match_tasks(match_rows, start_date=start_date, end_date=end_date,
+                                               schedule_index=schedule_index)
+
+    if ledger and schedule_index is None:
+        # The schedule index already knows what was scraped, and corrected matches have to be scraped again
+        match_tasks = [task for task in match_tasks if not ledger.is_completed(task[1])]
+    if ledger:
+        exhausted_urls = set(ledger.get_exhausted_urls())
+        skipped_urls = [task[1] for task in match_tasks if task[1] in exhausted_urls]
+        if skipped_urls:
+            logger.warning(f"⚠️ Skipping {len(skipped_urls)} matches that failed {ledger.max_attempts} times: "
+                           f"{skipped_urls}")
+            match_tasks = [task for task in match_tasks if task[1] not in exhausted_urls]
+    return match_tasks
+
+
+def iter_match_batches(match_tasks, parser: ParserBackend = None, max_workers: int = None, batch_size: int = None,
+                       on_error=None, parse_workers: int = None):
+    """
+    Scrapes the match reports of the match tasks and yields the data in batches, in fixture order.
+    Match reports are scraped concurrently by a pool of max_workers threads, but only 2 * max_workers reports are
+    scheduled ahead of the one being collected, so the memory used does not grow with the number of matches.
+    Requests are spaced out by the per-host rate limiter in get_html_content.
+    With parse_workers, the threads only download the html and hand it to a pool of parse_workers processes, so
+    parsing uses more than one CPU core.
+    :param match_tasks: Iterable of (row, match_url, date_str) tuples, e.g. from iter_match_tasks
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param max_workers: Number of match reports to scrape concurrently, defaults to ScraperConstants.FBREF_MAX_WORKERS
+    :param batch_size: Number of matches in each batch, defaults to ScraperConstants.FBREF_PIPELINE_BATCH_SIZE
+    :param on_error: Optional function called with (match_url, error) when a match report fails
+    :param parse_workers: Number of parser processes, defaults to ScraperConstants.FBREF_PARSE_WORKERS (0 parses
+    in the download threads)
+    :return: Generator of (batch_df, last_date, match_urls) where last_date is the date of the last match in the batch
+    """
+    parser = parser or get_parser_backend()
+    max_workers = max_workers or sc.FBREF_MAX_WORKERS
+    batch_size = batch_size or sc.FBREF_PIPELINE_BATCH_SIZE
+    parse_workers = sc.FBREF_PARSE_WORKERS if parse_workers is None else parse_workers
+    match_tasks = enumerate(match_tasks, start=1)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    # Spawn the parser processes rather than forking, the download threads may be holding locks
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")) \
+        if parse_workers else None
+
+    def submit_next_task():
+        count, task = next(match_tasks, (None, None))
+        if task is not None:
+            # Start counting rows from the first match report with a valid date
+            logger.info(f"Starting scraper for row: {count}")
+            if parse_pool:
+                future = executor.submit(fetch_and_parse_match_report, task[1], parser, parse_pool)
+            else:
+                future = executor.submit(scrape_match_report_data, task[1], parser)
+            pending.append((count, task, future))
+
+    try:
+        for _ in range(2 * max_workers):
+            submit_next_task()
+
+        batch = []
+        match_urls = []
+        last_date = None
+        while pending:
+            count, (row, match_url, date_str), future = pending.popleft()
+            submit_next_task()
+            try:
+                match_df = future.result()
+
+                # Scrape the watermark columns and add them to the match_df
+                batch.append(update_dataframe_with_watermark_columns(row, match_df, WATERMARK_COLUMNS))
+                match_urls.append(match_url)
+                logger.info(f"Updated match dataframe {count}")
+                last_date = date_str
+
+            except Exception as e:
+                logging.error(f"⚠️ Error processing row: {e}")
+                if on_error:
+                    on_error(match_url, e)
+                continue
+
+            if len(batch) >= batch_size:
+                yield pd.concat(batch, ignore_index=True), last_date, match_urls
+                batch = []
+                match_urls = []
+
+        if batch:
+            yield pd.concat(batch, ignore_index=True), last_date, match_urls
+    finally:
+        # Don't start any more match reports if the consumer stops early or fails
+        executor.shutdown(wait=True, cancel_futures=True)
+        if parse_pool:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def write_batch_to_sink(sink, batch_df: pd.DataFrame, last_date, match_urls: list, ledger: ProgressLedger = None,
+                        schedule_index: ScheduleIndex = None, failed: list = None):
+    """
+    Writes a batch of matches to the sink, then records them as scraped in the progress ledger and schedule index
+    :param sink: Object with a write(batch_df, last_date) method
+    :param batch_df: The data of the matches in the batch
+    :param last_date: The date of the last match in the batch
+    :param match_urls: The match urls of the batch
+    :param ledger: Optional ProgressLedger for the season
+    :param schedule_index: Optional ScheduleIndex for the season
+    :param failed: Optional list of (match_url, error) of the matches that failed since the last batch, marked as
+    failed in the ledger in the same save
+    """
+    sink.write(batch_df, last_date)
+    logger.info(f"✅ Wrote {len(batch_df)} rows up to {last_date}")
+    if ledger:
+        for match_url, error in failed or []:
+            ledger.mark_failed(match_url, error)
+        if getattr(sink, "defer_completed", False):
+            # The sink only holds the batch, the caller marks its matches as completed once it has written them
+            sink.match_urls.extend(match_urls)
+        else:
+            ledger.mark_completed(match_urls)
+        ledger.save()
+    if schedule_index is not None:
+        schedule_index.mark_scraped(match_urls)
+        schedule_index.save()
+
+
+def scrape_data_to_sink(season: int, sink, start_date=None, end_date=None, parser: ParserBackend = None,
+                        max_workers: int = None, batch_size: int = None, ledger: ProgressLedger = None,
+                        competition: str = None, parse_workers: int = None, schedule_index: ScheduleIndex = None):
+    """
+    Streams the matches in the date range from the scraper to the sink one batch at a time. Each batch is written as
+    soon as it is scraped, so a crash part way through a season only loses the batch in progress.
+    With a progress ledger, matches are marked as completed once their batch is written and as failed if their match
+    report could not be scraped. Completed matches are skipped, and failed matches are retried even if they are
+    before start_date, so a restarted run never scrapes a match twice. Matches that failed the ledger's max_attempts
+    times are skipped and reported instead of being retried by every run.
+    With a schedule index, the matches to scrape come from diffing the schedule against the index (see
+    iter_match_tasks). Matches are marked as scraped in the index once their batch is written, and matches that
+    failed stay pending, so they are retried by the next run.
+    :param season: Season to scrape data from (YYYY)
+    :param sink: Object with a write(batch_df, last_date) method, e.g. S3PartsSink, LocalParquetSink or MemorySink
+    :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param end_date: end date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param max_workers: Number of match reports to scrape concurrently, defaults to ScraperConstants.FBREF_MAX_WORKERS
+    :param batch_size: Number of matches in each batch, defaults to ScraperConstants.FBREF_PIPELINE_BATCH_SIZE
+    :param ledger: Optional ProgressLedger for the season
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :param parse_workers: Number of parser processes, defaults to ScraperConstants.FBREF_PARSE_WORKERS
+    :param schedule_index: Optional ScheduleIndex for the season
+    :return: The date of the last match written to the sink, or start_date if nothing was written
+    """
+    logger.info(f"Starting scraper for season: {season} - {season + 1}")
+    parser = parser or get_parser_backend()
+    match_tasks = select_match_tasks(get_schedule_rows(season, parser, competition), start_date=start_date,
+                                     end_date=end_date, ledger=ledger, schedule_index=schedule_index)
+
+    last_date = start_date
+    try:
+        for batch_df, last_date, match_urls in iter_match_batches(
+                match_tasks, parser=parser, max_workers=max_workers, batch_size=batch_size,
+                on_error=ledger.mark_failed if ledger else None, parse_workers=parse_workers):
+            write_batch_to_sink(sink, batch_df, last_date, match_urls, ledger=ledger, schedule_index=schedule_index)
+    finally:
+        if ledger:
+            ledger.save()
+            logger.info(f"Progress ledger for season {season}: {ledger.get_summary()}")
+
+    return last_date
+
+
+def scrape_data_in_date_range(season: int, start_date=None, end_date=None, parser: ParserBackend = None,
+                              max_workers: int = None, ledger: ProgressLedger = None):
     """
     This will scrape all data on the fbref scores and fixtures section for a premier league season.
     It will filter for match reports that fall in the range start_date to end_date (inclusive) and it will break the
     loop when it reaches upcoming fixtures (e.g 'Head-to-Head' is shown instead of 'Match Report'
-    It will scrape all data within each match report and save it as a csv file to an S3 bucket
+    The scraped matches are collected in memory with a MemorySink, use scrape_data_to_sink to write each batch as it
+    is scraped instead.
+    With a progress ledger, the matches are selected and failures are recorded as in scrape_data_to_sink, but the
+    matches collected are only marked as completed in memory. Call ledger.save() once their data has been written, so
+    a run that fails before writing the data scrapes them again.
     :param season: Season to scrape data from (YYYY)
     :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD)
     :param end_date: end date t0 scrape data from (inclusive) (In the format YYYY-MM-DD)
-    :return:
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param max_workers: Number of match reports to scrape concurrently, defaults to ScraperConstants.FBREF_MAX_WORKERS
+    :param ledger: Optional ProgressLedger for the season
+    :return: [all_matches_df, last_date] where last_date is the date of the last match scraped (or start_date)
     """
-    logger.info(f"Starting scraper for season: {season} - {season + 1}")
-    season_url = sc.FBREF_URL.format(year=season, next_year=season+1)
-    df = pd.DataFrame()
-
-    # Default previous date to the start date
+    sink = MemorySink(defer_completed=ledger is not None)
     prev_date = start_date
     try:
-        time.sleep(5)
+        prev_date = scrape_data_to_sink(season, sink, start_date=start_date, end_date=end_date, parser=parser,
+                                        max_workers=max_workers, ledger=ledger)
+    except HTTP_ERRORS as e:
+        logging.error(f"❌ Failed to access season page: {e}")
+    if ledger:
+        ledger.mark_completed(sink.match_urls)
 
-        soup = get_soup_object(season_url)
-        # response = requests.get(season_url)
-        # soup = BeautifulSoup(response.content, 'html.parser')
+    return [sink.to_dataframe(), prev_date]
 
-        # Find the match table
-        table_header = soup.find("h2")
-        match_table = table_header.find_next("tbody")
 
-        if not match_table:
-            logging.error("❌ Could not find match table on page.")
-            return df
+async def scrape_match_report_async(match_url: str, client: AsyncHttpClient, parser: ParserBackend,
+                                    parse_pool: ProcessPoolExecutor = None) -> DataFrame:
+    """
+    Downloads the match report on the event loop and parses it in an executor (the parser processes if there are
+    any, otherwise a worker thread), so parsing never blocks the other downloads
+    :param match_url: the url for the match report on fbref.com
+    :param client: The AsyncHttpClient of the run
+    :param parser: The parser backend
+    :param parse_pool: Optional process pool of parser workers
+    :return: A dataframe containing all the data for players on both teams
+    """
+    html = await get_html_content_async(match_url, client)
+    if html is None:
+        raise MatchReportError(f"Failed to download match report: {match_url}")
+    if parse_pool:
+        with metrics.timer("parse.match_report_process"):
+            records = await asyncio.get_running_loop().run_in_executor(parse_pool, parse_match_report_records, html,
+                                                                       parser.name)
+        return records_to_dataframe(records)
+    return await asyncio.to_thread(parse_match_report, html, parser)
+
+
+async def scrape_data_to_sink_async(season: int, sink, start_date=None, end_date=None, parser: ParserBackend = None,
+                                    max_workers: int = None, batch_size: int = None, ledger: ProgressLedger = None,
+                                    competition: str = None, parse_workers: int = None,
+                                    schedule_index: ScheduleIndex = None, client: AsyncHttpClient = None):
+    """
+    Asyncio version of scrape_data_to_sink, where the schedule fetch, the match report fetches and the writes to the
+    sink overlap in one event loop
+    1) Up to max_workers match reports are downloaded at a time and 2 * max_workers are scheduled ahead of the one
+    being collected, the rest of the run works the same as scrape_data_to_sink (fixture order, batches, ledger and
+    schedule index)
+    2) Each batch is written in a worker thread while the next batch is scraped, one write at a time so the sink sees
+    the batches in order
+    3) A match that fails is marked as failed and the run carries on. If the run itself fails or is cancelled, the
+    match reports in flight are cancelled and the write in progress is finished before the error is raised, so the
+    ledger never records a batch that was not written
+    See scrape_data_to_sink for the parameters
+    :param client: Optional AsyncHttpClient shared between seasons, one is created for the run if not given
+    :return: The date of the last match written to the sink, or start_date if nothing was written
+    """
+    logger.info(f"Starting asyncio scraper for season: {season} - {season + 1}")
+    parser = parser or get_parser_backend()
+    max_workers = max_workers or sc.FBREF_MAX_WORKERS
+    batch_size = batch_size or sc.FBREF_PIPELINE_BATCH_SIZE
+    parse_workers = sc.FBREF_PARSE_WORKERS if parse_workers is None else parse_workers
+    own_client = client is None
+    client = client or create_async_http_client(max_workers)
+    semaphore = asyncio.Semaphore(max_workers)
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")) \
+        if parse_workers else None
+    pending = deque()
+    write = None
+    failed = []
+    last_date = start_date
+    written_date = start_date
+
+    async def scrape_match(match_url: str) -> DataFrame:
+        async with semaphore:
+            return await scrape_match_report_async(match_url, client, parser, parse_pool)
 
-        match_rows = match_table.find_all("tr")
-        all_matches = []
-        count = 1
-        for row in match_rows:
-            try:
-                # Extract date and match url
-                date_str = row.find("td", {"data-stat": "date"}).get_text(strip=True)
-
-                # Update start_date if not specified to be used in the file name
-                if not start_date:
-                    start_date = date_str
-
-                match_report_link = row.find("td", {"data-stat": "match_report"}).find("a")
-                match_report_text = match_report_link.get_text() if match_report_link else None
-
-                # Skip if no match report available
-                if not match_report_link:
-                    continue
-
-                match_url = "https://fbref.com" + match_report_link["href"]
-
-                # Convert date to datetime format for filtering
-                match_date = datetime.strptime(date_str, "%Y-%m-%d")
-
-                # Apply date filtering if needed
-                if start_date and match_date < datetime.strptime(start_date, "%Y-%m-%d"):
-                    continue
-                if end_date and match_date > datetime.strptime(end_date, "%Y-%m-%d"):
-                    logger.info(f"Match report date: {match_date} exceeds specified end date: {end_date}")
-                    logger.info("Terminating scraper")
-                    break
-                if match_report_text == "Head-to-Head":
-                    logger.info("Match report is not available for the current match")
-                    logger.info("Terminating scraper")
-                    break
-
-                # Start counting rows from the first match report with a valid date
+    try:
+        html = await get_html_content_async(get_season_url(season, competition), client)
+        match_rows = await asyncio.to_thread(parse_schedule_rows, html, parser) if html is not None else []
+        match_tasks = await asyncio.to_thread(select_match_tasks, match_rows, start_date=start_date,
+                                              end_date=end_date, ledger=ledger, schedule_index=schedule_index)
+        match_tasks = enumerate(match_tasks, start=1)
+
+        def submit_next_task():
+            count, task = next(match_tasks, (None, None))
+            if task is not None:
                 logger.info(f"Starting scraper for row: {count}")
-
-                time.sleep(5)
-                match_df = scrape_match_report_data(match_url)
-
-                # Scrape the watermark columns and add them to the match_df
-                watermark_cols = [
-                    ("gameweek", "gameweek", True),  # Found in <th>
-                    ("date", "date", False),
-                    ("time", "start_time", False),
-                    ("home_team", "home_team", False),
-                    ("home_xg", "home_xg", False),
-                    ("score", "score", False),
-                    ("away_xg", "away_xg", False),
-                    ("away_team", "away_team", False),
-                    ("attendance", "attendance", False),
-                    ("referee", "referee", False),
-                ]
-
-                match_df = update_dataframe_with_watermark_columns(row, match_df, watermark_cols)
-                all_matches.append(match_df)
+                pending.append((count, task, asyncio.ensure_future(scrape_match(task[1]))))
+
+        async def write_batch(batch: list, batch_last_date, match_urls: list):
+            nonlocal write, written_date, failed
+            # Wait for the previous batch, so the batches are written in order
+            if write:
+                await write
+            batch_failed, failed = failed, []
+            write = asyncio.ensure_future(asyncio.to_thread(
+                write_batch_to_sink, sink, pd.concat(batch, ignore_index=True), batch_last_date, match_urls,
+                ledger=ledger, schedule_index=schedule_index, failed=batch_failed))
+            written_date = batch_last_date
+
+        for _ in range(2 * max_workers):
+            submit_next_task()
+
+        batch = []
+        match_urls = []
+        while pending:
+            count, (row, match_url, date_str), future = pending.popleft()
+            submit_next_task()
+            # A failed write stops the run without waiting for the match report
+            if write and not write.done():
+                await asyncio.wait({future, write}, return_when=asyncio.FIRST_COMPLETED)
+            if write and write.done() and write.exception():
+                raise write.exception()
+            try:
+                match_df = await future
+                batch.append(update_dataframe_with_watermark_columns(row, match_df, WATERMARK_COLUMNS))
+                match_urls.append(match_url)
                 logger.info(f"Updated match dataframe {count}")
-                count += 1
-                prev_date = date_str
-
+                last_date = date_str
             except Exception as e:
                 logging.error(f"⚠️ Error processing row: {e}")
+                failed.append((match_url, e))
                 continue
-        all_matches_df = pd.concat(all_matches, ignore_index=True) if all_matches else df
 
-        return [all_matches_df, prev_date]
+            if len(batch) >= batch_size:
+                await write_batch(batch, last_date, match_urls)
+                batch = []
+                match_urls = []
+
+        if batch:
+            await write_batch(batch, last_date, match_urls)
+        if write:
+            await write
+            write = None
+    finally:
+        # Cancel the match reports in flight and let the write in progress finish
+        for _, _, future in pending:
+            future.cancel()
+        await asyncio.gather(*(future for _, _, future in pending), return_exceptions=True)
+        if write:
+            await asyncio.gather(write, return_exceptions=True)
+        if ledger:
+            for match_url, error in failed:
+                ledger.mark_failed(match_url, error)
+            await asyncio.to_thread(ledger.save)
+            logger.info(f"Progress ledger for season {season}: {ledger.get_summary()}")
+        if parse_pool:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+        if own_client:
+            await client.aclose()
+
+    return written_date
+
+
+def scrape_data_to_sink_asyncio(season: int, sink, **kwargs):
+    """
+    Runs scrape_data_to_sink_async in a new event loop, for callers that are not async
+    :return: The date of the last match written to the sink, or start_date if nothing was written
+    """
+    return asyncio.run(scrape_data_to_sink_async(season, sink, **kwargs))
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Failed to access season page: {e}")
-        return df
+
+async def scrape_seasons_async(season_jobs: list, max_workers: int = None, http2: bool = None) -> list:
+    """
+    Scrapes several seasons at the same time in one event loop, sharing the http client and the rate limiter, so the
+    schedule of one season is fetched while the match reports of another are downloaded. A season that fails does
+    not stop the others
+    :param season_jobs: List of kwargs dicts for scrape_data_to_sink_async, each with a season and a sink
+    :param max_workers: Number of match reports to download concurrently in each season
+    :param http2: Use HTTP/2, defaults to ScraperConstants.FBREF_HTTP2
+    :return: The last date written (or the exception raised) for each season job, in order
+    """
+    async with create_async_http_client(max_workers, http2=http2) as client:
+        return await asyncio.gather(*(scrape_data_to_sink_async(**job, max_workers=max_workers, client=client)
+                                      for job in season_jobs), return_exceptions=True)
 
 
 def get_last_updated_data(s3_client):
@@ -361,17 +1094,26 @@ def set_last_updated_data(s3_client, season_year: int, end_date):
     logger.info(f"✅ Updated seasons: {season_year}, last updated value = {end_date} in the FBREF meta data file")
 
 
-def add_scraped_data_to_season_csv(s3_client, season_year:int, scraped_df: pd.DataFrame, update_metadata=True):
+@timed("s3.add_scraped_data_to_season_csv")
+def add_scraped_data_to_season_csv(s3_client, season_year:int, scraped_df: pd.DataFrame, update_metadata=True,
+                                   last_match_date=None, upsert: bool = None):
     """
     This will take the scraped data in a pandas dataframe and upload it to the corresponding season file in S3
     If the file exists it will read the file into a pandas dataframe and concat it with scraped_df.
     If the file doesn't exist then it will
+    With upsert, the scraped rows replace the rows with the same key instead (see ScraperConstants
+    .FBREF_UPSERT_KEY_COLUMNS). The rows to replace are found from the key index stored next to the season file, so
+    only the scraped rows are hashed. The season file and its index are still read and rewritten as a whole, use the
+    'parts' write mode to only write the new rows. The index records the ETag of the season file it was built for, and
+    is rebuilt from the season file if a run stopped after writing the file but before saving its index
 
     :param s3_client: s3 client instance
     :param season_year: YYYY - the starting year of the season
     :param scraped_df: The scraped data due to be added to the dataframe
     :param update_metadata: A boolean flag indicating whether to update the metadata file.
     It should be True for automated scheduling and False for manual runs
+    :param last_match_date: The date of the last match scraped, saved as the last updated value of the metadata
+    :param upsert: Replace the rows with the same key, defaults to ScraperConstants.FBREF_UPSERT
     :return: Write the newly scraped data to the season file in S3 bucket
     """
     file_key = sc.FBREF_DATA_S3_FILE_KEY.format(season_start=str(season_year), season_end=str(season_year + 1))
@@ -383,58 +1125,559 @@ def add_scraped_data_to_season_csv(s3_client, season_year:int, scraped_df: pd.Da
 
         # Load the data into pandas dataframe
         df = pd.read_csv(io.BytesIO(data['Body'].read()))
+        season_file_etag = data["ETag"]
         logger.info(f"Season: {season_year} - {season_year + 1} located successfully")
     except ClientError as e:
         logger.info(f"File does not exist, creating new file: {file_key}")
         df = pd.DataFrame()
+        season_file_etag = None
+
+    upsert = sc.FBREF_UPSERT if upsert is None else upsert
+    if upsert:
+        index_key = sc.FBREF_CSV_KEY_INDEX_S3_FILE_KEY.format(season_start=str(season_year),
+                                                              season_end=str(season_year + 1))
+        stored_index = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=index_key)
+        if stored_index is not None and stored_index.get("season_file_etag") != season_file_etag:
+            logger.warning(f"⚠️ The key index of season {season_year} - {season_year + 1} was not saved with the "
+                           f"season file, rebuilding it")
+            stored_index = None
+        key_index = KeyIndex(stored_index)
+        if stored_index is None and not df.empty:
+            # The season file was written before the index (or without it), hash its rows once
+            key_index.upsert(hash_keys(df, sc.FBREF_UPSERT_KEY_COLUMNS), file_key)
+        updated_df, upsert_stats = upsert_dataframe(df, scraped_df, key_index, file_key, sc.FBREF_UPSERT_KEY_COLUMNS)
+        record_upsert_stats(season_year, upsert_stats)
+    else:
+        updated_df = pd.concat([df, scraped_df], ignore_index=True)
 
-    updated_df = pd.concat([df, scraped_df], ignore_index=True)
-
-    save_data_to_s3_bucket_as_csv(s3, updated_df, bucket=sc.S3_BUCKET_NAME, key=sc.FBREF_DATA_S3_FILE_KEY,
+    save_data_to_s3_bucket_as_csv(s3_client, updated_df, bucket=sc.S3_BUCKET_NAME, key=sc.FBREF_DATA_S3_FILE_KEY,
                                   season_start=str(season_year), season_end=str(season_year + 1))
+    if upsert:
+        # Written after the season file, the row numbers of the index are only valid for the new file
+        season_file_etag = s3_client.head_object(Bucket=sc.S3_BUCKET_NAME, Key=file_key)["ETag"]
+        save_json_to_s3(s3_client, {**key_index.to_dict(), "season_file_etag": season_file_etag},
+                        bucket=sc.S3_BUCKET_NAME, key=index_key)
 
     if update_metadata:
         set_last_updated_data(s3_client, season_year, last_match_date)
 
 
+def create_season_manifest(s3_client, season_year: int, competition: str = None) -> dict:
+    """
+    Creates the manifest of a season that has not been written in parts yet. If the season has a season csv written
+    by add_scraped_data_to_season_csv, the manifest starts with that file as its first part
+    """
+    manifest = {"season": season_year, "parts": []}
+    key_args = get_season_key_args(season_year, competition)
+    if key_args["competition_dir"]:
+        return manifest
+
+    season_file_key = sc.FBREF_DATA_S3_FILE_KEY.format(**key_args)
+    if does_file_exist_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=season_file_key):
+        manifest["parts"].append({"key": season_file_key, "rows": None, "first_date": None, "last_date": None,
+                                  "created_at": None})
+    return manifest
+
+
+def get_season_manifest(s3_client, season_year: int, competition: str = None) -> dict:
+    """
+    Reads the manifest listing the part files for a season, see create_season_manifest for seasons without one
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: Dict of {"season": season_year, "parts": [{"key", "rows", "first_date", "last_date", "created_at"}]}
+    """
+    manifest_key = sc.FBREF_SEASON_MANIFEST_S3_FILE_KEY.format(**get_season_key_args(season_year, competition))
+    manifest = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=manifest_key)
+    if manifest is not None:
+        return manifest
+    return create_season_manifest(s3_client, season_year, competition)
+
+
+def record_upsert_stats(season_year: int, upsert_stats: dict):
+    """
+    Adds the rows inserted and replaced by an upsert to the metrics summary of the run
+    """
+    metrics.increment("upsert.inserted_rows", upsert_stats["inserted"])
+    metrics.increment("upsert.replaced_rows", upsert_stats["replaced"])
+    if upsert_stats["replaced"]:
+        logger.info(f"🔁 Replaced {upsert_stats['replaced']} rows of season {season_year} - {season_year + 1}")
+
+
+def read_key_index(s3_client, manifest: dict, shard_ids: list = None, cache: dict = None) -> KeyIndex:
+    """
+    Reads the shards of the key index the manifest points to, see KeyIndex. A season written in parts before the index
+    gets its index built from its parts, which reads the whole season once
+    :param s3_client: s3 client instance
+    :param manifest: The season manifest, see get_season_manifest
+    :param shard_ids: The shards to read, defaults to every shard
+    :param cache: Optional dict of {shard object key: keys} to reuse between reads. Shard objects are never changed
+    once written, so an update retried after a conflict only reads the shards another writer replaced
+    """
+    if manifest.get("key_index"):
+        shard_keys = manifest["key_index"]["shards"]
+        if shard_ids is not None:
+            shard_keys = {shard_id: shard_keys[shard_id] for shard_id in set(shard_ids) if shard_id in shard_keys}
+        shards = {}
+        for shard_id, shard_key in shard_keys.items():
+            if cache is None or shard_key not in cache:
+                keys = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key=shard_key)["keys"]
+                if cache is not None:
+                    cache[shard_key] = keys
+            else:
+                keys = cache[shard_key]
+            # Copied, the locations are updated in place
+            shards[shard_id] = {key_hash: list(location) for key_hash, location in keys.items()}
+        return KeyIndex({"parts": list(manifest["key_index"]["parts"]), "shards": shards})
+
+    key_index = KeyIndex()
+    for part in manifest["parts"]:
+        logger.info(f"Building the key index from part: {part['key']}")
+        part_df = read_season_part(s3_client, part["key"])
+        key_index.upsert(hash_keys(part_df, sc.FBREF_UPSERT_KEY_COLUMNS), part["key"],
+                         shard_ids=get_shard_ids(part_df))
+    return key_index
+
+
+def save_key_index(s3_client, manifest: dict, key_index: KeyIndex, key_args: dict, index_id: str) -> list:
+    """
+    Writes the shards of the key index that were changed as new objects and points the manifest at them. The shard
+    objects they replace are listed as superseded, to be deleted by a later compaction like the superseded parts
+    (see scrapers/compaction.py), so the readers of the previous manifest can still read them
+    :param s3_client: s3 client instance
+    :param manifest: The season manifest the index will be swapped into, updated in place
+    :param key_index: The KeyIndex read with read_key_index and updated
+    :param key_args: The season's key arguments, see get_season_key_args
+    :param index_id: Prefix of the ids of the new shard objects
+    :return: The keys of the shard objects written
+    """
+    shards = dict(manifest["key_index"]["shards"]) if manifest.get("key_index") else {}
+    superseded_at = datetime.now(timezone.utc).isoformat()
+    written = []
+    for shard_id in sorted(key_index.changed_shards):
+        shard_key = sc.FBREF_KEY_INDEX_S3_FILE_KEY.format(shard_id=shard_id,
+                                                          index_id=f"{index_id}-{uuid.uuid4().hex[:8]}", **key_args)
+        save_json_to_s3(s3_client, {"keys": key_index.shards[shard_id]}, bucket=sc.S3_BUCKET_NAME, key=shard_key)
+        written.append(shard_key)
+        if shard_id in shards:
+            manifest["superseded"] = manifest.get("superseded", []) + [
+                {"key": shards[shard_id], "superseded_at": superseded_at}]
+        shards[shard_id] = shard_key
+    manifest["key_index"] = {"parts": key_index.parts, "shards": shards}
+    return written
+
+
+def get_listed_key_index_objects(manifest: dict) -> set:
+    """
+    :return: The keys of the shard objects the manifest points to or lists as superseded
+    """
+    listed = set(manifest["key_index"]["shards"].values()) if manifest.get("key_index") else set()
+    return listed | {entry["key"] for entry in manifest.get("superseded", [])}
+
+
+def add_scraped_data_to_season_parts(s3_client, season_year: int, scraped_df: pd.DataFrame, last_match_date=None,
+                                     update_metadata=True, output_format: str = None, compression: str = None,
+                                     competition: str = None, upsert: bool = None):
+    """
+    Incremental alternative to add_scraped_data_to_season_csv. Only the newly scraped data is uploaded, so the I/O is
+    proportional to the new matches rather than the season so far.
+    1) Upload the scraped data as a new immutable part file under the season prefix. Parquet parts are converted to
+    the typed FbRefSchema first
+    2) Add the part to the season manifest. The manifest is only updated after the part is uploaded, so readers
+    never see a part that doesn't exist. The manifest is replaced with a conditional put, so parts added by
+    concurrent writers (e.g. orchestrator workers) are not lost
+    With upsert, the rows of the part replace the earlier rows with the same key (see ScraperConstants
+    .FBREF_UPSERT_KEY_COLUMNS). Only the key index shards of the part's match dates are read, and they are written as
+    new objects swapped in by the same manifest update as the part (see save_key_index), so readers always see an
+    index that matches the parts, and read_season_data skips the replaced rows
+    3) Update the last updated metadata if required
+
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param scraped_df: The scraped data due to be added to the season
+    :param last_match_date: the date of the most recent game scraped
+    :param update_metadata: A boolean flag indicating whether to update the metadata file.
+    It should be True for automated scheduling and False for manual runs
+    :param output_format: 'csv' or 'parquet', defaults to ScraperConstants.FBREF_OUTPUT_FORMAT
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :param upsert: Replace the rows with the same key, defaults to ScraperConstants.FBREF_UPSERT
+    :return: The manifest entry for the new part, or None if there was no data to upload
+    """
+    key_args = get_season_key_args(season_year, competition)
+    output_format = output_format or sc.FBREF_OUTPUT_FORMAT
+    upsert = sc.FBREF_UPSERT if upsert is None else upsert
+    part = None
+
+    if scraped_df.empty:
+        logger.info(f"No new data scraped for season: {season_year} - {season_year + 1}")
+    else:
+        created_at = datetime.now(timezone.utc)
+        part_id = f"{created_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        part_key = sc.FBREF_SEASON_PART_S3_FILE_KEY.format(part_id=part_id, extension=output_format, **key_args)
+        if output_format == "parquet":
+            save_data_to_s3_bucket_as_parquet(s3_client, FbRefSchema().coerce(scraped_df), bucket=sc.S3_BUCKET_NAME,
+                                              key=part_key, compression=compression or sc.FBREF_PARQUET_COMPRESSION)
+        else:
+            save_data_to_s3_bucket_as_csv(s3_client, scraped_df, bucket=sc.S3_BUCKET_NAME, key=part_key)
+
+        dates = scraped_df["date"].dropna() if "date" in scraped_df else pd.Series(dtype=object)
+        part = {
+            "key": part_key,
+            "rows": len(scraped_df),
+            "first_date": dates.min() if not dates.empty else None,
+            "last_date": dates.max() if not dates.empty else None,
+            "created_at": created_at.isoformat(),
+        }
+
+        hashes = hash_keys(scraped_df, sc.FBREF_UPSERT_KEY_COLUMNS) if upsert else None
+        shard_ids = get_shard_ids(scraped_df) if upsert else None
+        upsert_stats = None
+        index_keys = []
+        shard_cache = {}
+
+        def add_part(manifest):
+            nonlocal upsert_stats
+            manifest = manifest or create_season_manifest(s3_client, season_year, competition)
+            if upsert:
+                # Called again if another writer changed the manifest, so the shards are read from the latest one
+                key_index = read_key_index(s3_client, manifest, shard_ids, cache=shard_cache)
+                upsert_stats = key_index.upsert(hashes, part_key, shard_ids=shard_ids)
+                part["replaced_rows"] = upsert_stats["replaced"]
+                index_keys.extend(save_key_index(s3_client, manifest, key_index, key_args, part_id))
+            manifest["parts"].append(part)
+            return manifest
+
+        try:
+            manifest = update_json_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                         key=sc.FBREF_SEASON_MANIFEST_S3_FILE_KEY.format(**key_args), update=add_part)
+        except Exception:
+            # The last put may have been applied before it failed, so only the indexes the manifest does not list are
+            # deleted
+            listed = get_listed_key_index_objects(get_season_manifest(s3_client, season_year, competition))
+            delete_s3_objects(s3_client, sc.S3_BUCKET_NAME,
+                              [index_key for index_key in index_keys if index_key not in listed])
+            raise
+        # The shards written by the attempts that lost to another writer were never listed in a manifest
+        listed = get_listed_key_index_objects(manifest)
+        delete_s3_objects(s3_client, sc.S3_BUCKET_NAME,
+                          [index_key for index_key in index_keys if index_key not in listed])
+        if upsert_stats:
+            record_upsert_stats(season_year, upsert_stats)
+
+    if update_metadata:
+        set_last_updated_data(s3_client, season_year, last_match_date)
+
+    return part
+
+
+def read_season_data(s3_client, season_year: int, typed=False, competition: str = None) -> pd.DataFrame:
+    """
+    Assembles the data for a season from the part files listed in its manifest (or the season csv if the season has
+    not been written in parts yet)
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param typed: Convert every part to the typed FbRefSchema. Use this when the season has both csv and parquet parts
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: Dataframe with all the data scraped for the season
+    """
+    manifest = get_season_manifest(s3_client, season_year, competition)
+    fbref_schema = FbRefSchema()
+    # Rows replaced by an upsert are skipped
+    key_index = read_key_index(s3_client, manifest) if manifest.get("key_index") else None
+    current_rows = key_index.get_current_rows() if key_index else None
+
+    part_dfs = []
+    for part in manifest["parts"]:
+        part_df = read_season_part(s3_client, part["key"], typed=typed)
+        if key_index:
+            part_df = key_index.filter_part(part["key"], part_df, current_rows)
+        part_dfs.append(fbref_schema.coerce(part_df) if typed else part_df)
+
+    return pd.concat(part_dfs, ignore_index=True) if part_dfs else pd.DataFrame()
 
-if __name__ == '__main__':
 
+def read_season_part(s3_client, part_key: str, typed=False) -> pd.DataFrame:
+    """
+    :param s3_client: s3 client instance
+    :param part_key: The key of a part listed in the season manifest
+    :param typed: Read csv parts as strings, ready to be converted to the typed FbRefSchema
+    :return: The rows of the part in the order they were written
+    """
+    data = s3_client.get_object(Bucket=sc.S3_BUCKET_NAME, Key=part_key)
+    if part_key.endswith(".parquet"):
+        return pd.read_parquet(io.BytesIO(data['Body'].read()))
+    return pd.read_csv(io.BytesIO(data['Body'].read()), dtype=str if typed else None)
+
+def add_scraped_data_to_partitioned_dataset(s3_client, season_year: int, scraped_df: pd.DataFrame,
+                                            last_match_date=None, update_metadata=True, row_group_size: int = None,
+                                            compression: str = None):
+    """
+    Writes the scraped data to the hive partitioned parquet dataset so queries filtering on season and gameweek only
+    read the matching partitions
+    1) Convert the data to the typed FbRefSchema and add the season column
+    2) Write a parquet file for each gameweek to season=YYYY/gameweek=NN/, using the gameweek watermark column
+    3) Add the files to the partition list at the root of the dataset
+    4) Update the last updated metadata if required
+
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param scraped_df: The scraped data, including the watermark columns
+    :param last_match_date: the date of the most recent game scraped
+    :param update_metadata: A boolean flag indicating whether to update the metadata file.
+    It should be True for automated scheduling and False for manual runs
+    :param row_group_size: Maximum rows per row group, defaults to ScraperConstants.FBREF_PARQUET_ROW_GROUP_SIZE
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: The keys of the files written
+    """
+    keys = []
+    if scraped_df.empty:
+        logger.info(f"No new data scraped for season: {season_year} - {season_year + 1}")
+    else:
+        typed_df = FbRefSchema().coerce(scraped_df).assign(season=season_year)
+        part_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        keys = save_partitioned_parquet_to_s3(s3_client, typed_df, bucket=sc.S3_BUCKET_NAME,
+                                              prefix=sc.FBREF_PARTITIONED_S3_PREFIX,
+                                              partition_cols=sc.FBREF_PARTITION_COLUMNS,
+                                              file_name=f"part-{part_id}.parquet",
+                                              row_group_size=row_group_size or sc.FBREF_PARQUET_ROW_GROUP_SIZE,
+                                              compression=compression or sc.FBREF_PARQUET_COMPRESSION)
+        add_files_to_partition_list_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME, prefix=sc.FBREF_PARTITIONED_S3_PREFIX,
+                                          keys=keys)
+
+    if update_metadata:
+        set_last_updated_data(s3_client, season_year, last_match_date)
+
+    return keys
+
+
+def get_progress_ledger(s3_client, season_year: int, ledger_dir: str = None, competition: str = None) -> ProgressLedger:
+    """
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param ledger_dir: Local directory to keep the ledger in, the ledger is stored next to the season data in S3 if
+    not given
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: The progress ledger for the season
+    """
+    key_args = get_season_key_args(season_year, competition)
+    if ledger_dir:
+        return LocalProgressLedger(os.path.join(ledger_dir, key_args["competition_dir"]), season_year,
+                                   max_attempts=sc.FBREF_LEDGER_MAX_ATTEMPTS)
+    key = sc.FBREF_LEDGER_S3_FILE_KEY.format(**key_args)
+    return S3ProgressLedger(s3_client, bucket=sc.S3_BUCKET_NAME, key=key, season=season_year,
+                            max_attempts=sc.FBREF_LEDGER_MAX_ATTEMPTS)
+
+
+def get_schedule_index(s3_client, season_year: int, index_dir: str = None, competition: str = None) -> ScheduleIndex:
+    """
+    :param s3_client: s3 client instance
+    :param season_year: YYYY - the starting year of the season
+    :param index_dir: Local directory to keep the index in, the index is stored next to the season data in S3 if
+    not given
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: The schedule index for the season
+    """
+    key_args = get_season_key_args(season_year, competition)
+    if index_dir:
+        return LocalScheduleIndex(os.path.join(index_dir, key_args["competition_dir"]), season_year)
+    key = sc.FBREF_SCHEDULE_INDEX_S3_FILE_KEY.format(**key_args)
+    return S3ScheduleIndex(s3_client, bucket=sc.S3_BUCKET_NAME, key=key, season=season_year)
+
+
+class MemorySink:
+    """
+    Sink that keeps the scraped batches in memory, used by scrape_data_in_date_range and the tests
+    """
+
+    def __init__(self, defer_completed=False):
+        """
+        :param defer_completed: Leave the matches of the batches to be marked as completed in the progress ledger by
+        the caller once it has written the data, their urls are collected in match_urls
+        """
+        self.batches = []
+        self.last_date = None
+        self.defer_completed = defer_completed
+        self.match_urls = []
+
+    def write(self, batch_df: pd.DataFrame, last_date):
+        self.batches.append(batch_df)
+        self.last_date = last_date
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.concat(self.batches, ignore_index=True) if self.batches else pd.DataFrame()
+
+
+class LocalParquetSink:
+    """
+    Sink that writes each batch to a local directory as a parquet part file with the typed FbRefSchema
+    """
+
+    def __init__(self, directory: str, compression: str = None):
+        """
+        :param directory: Local directory the part files are written to
+        :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = compression or sc.FBREF_PARQUET_COMPRESSION
+        self.paths = []
+
+    def write(self, batch_df: pd.DataFrame, last_date):
+        part_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = self.directory / f"part-{part_id}.parquet"
+
+        # Write to a temporary file first so a crash never leaves a partial part file
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        FbRefSchema().coerce(batch_df).to_parquet(tmp_path, index=False, compression=self.compression)
+        os.replace(tmp_path, path)
+        self.paths.append(str(path))
+
+
+class S3PartsSink:
+    """
+    Sink that adds each batch to the season in S3 as a new part file, see add_scraped_data_to_season_parts.
+    The last updated metadata is updated after every batch, so a restarted run carries on from the last batch written
+    """
+
+    def __init__(self, s3_client, season_year: int, update_metadata=True, output_format: str = None,
+                 compression: str = None, competition: str = None, upsert: bool = None):
+        self.s3_client = s3_client
+        self.season_year = season_year
+        self.update_metadata = update_metadata
+        self.output_format = output_format
+        self.compression = compression
+        self.competition = competition
+        self.upsert = upsert
+        self.parts = []
+
+    def write(self, batch_df: pd.DataFrame, last_date):
+        self.parts.append(add_scraped_data_to_season_parts(self.s3_client, self.season_year, batch_df, last_date,
+                                                           update_metadata=self.update_metadata,
+                                                           output_format=self.output_format,
+                                                           compression=self.compression,
+                                                           competition=self.competition, upsert=self.upsert))
+
+
+class S3PartitionedSink:
+    """
+    Sink that adds each batch to the partitioned parquet dataset, see add_scraped_data_to_partitioned_dataset.
+    The last updated metadata is updated after every batch, so a restarted run carries on from the last batch written
+    """
+
+    def __init__(self, s3_client, season_year: int, update_metadata=True, row_group_size: int = None,
+                 compression: str = None):
+        self.s3_client = s3_client
+        self.season_year = season_year
+        self.update_metadata = update_metadata
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.keys = []
+
+    def write(self, batch_df: pd.DataFrame, last_date):
+        self.keys += add_scraped_data_to_partitioned_dataset(self.s3_client, self.season_year, batch_df, last_date,
+                                                             update_metadata=self.update_metadata,
+                                                             row_group_size=self.row_group_size,
+                                                             compression=self.compression)
+
+
+def main(argv: list = None):
     """
     Scrape the data in the match report within date range specified
     1) Check if the code is being run locally or via AWS console
     2) Extracts the last updated value from the config file in s3 and starts from the next day
     3) Scrapes all match data from start date for all available fixtures (or until specified end date)
     4) Updates CSV in S3 with the latest data
+    :param argv: The command line arguments, see get_fbref_arguments (defaults to sys.argv)
     """
+    global html_cache
+    logging.basicConfig(level=logging.INFO)
     print("Hello fbref!")
     # Get env variable:
     env = is_running_in_aws()
 
-    # Create boto3 session
-    if env == "local":
-        session = boto3.Session(profile_name=sc.PROFILE_NAME)
-    else:
-        session = boto3.Session()
-
-    # Initialize S3 client
-    s3 = session.client('s3')
+    # Initialize the shared S3 client (with a connection pool sized for concurrent transfers)
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
 
     season, start_date = get_last_updated_data(s3)
     end_date = None
 
     # Check if any arguments are passed via command line
-    args = get_fbref_arguments()
+    args = get_fbref_arguments(argv)
+    seasons = [season]
     if args.season:
-        season = args.season
+        # Backfill whole seasons unless a start date is given
+        seasons = args.season
+        start_date = None
     if args.start_date:
         start_date = args.start_date
     if args.end_date:
         end_date = args.end_date
+    configure_fetching(pool_size=args.max_workers, http2=args.http2 or None)
+    if args.cache_dir:
+        html_cache = HtmlCache(args.cache_dir, max_size_bytes=sc.FBREF_CACHE_MAX_SIZE_BYTES,
+                               schedule_ttl=sc.FBREF_SCHEDULE_CACHE_TTL_SECONDS,
+                               pending_match_ttl=sc.FBREF_PENDING_MATCH_CACHE_TTL_SECONDS)
+
+    metadata_flag = not(args.season or args.start_date or args.end_date or args.competition)
+    write_mode = args.write_mode or sc.FBREF_WRITE_MODE
+    if args.competition and write_mode != "parts":
+        raise ValueError("Only the 'parts' write mode stores competitions other than the premier league separately")
+    run_mode = args.run_mode or sc.FBREF_RUN_MODE
+    upsert = True if args.upsert else None
+    season_jobs = []
+    with profile_run(args.profile, args.profile_path):
+        for season in seasons:
+            if write_mode == "csv":
+                # The season csv is rewritten as a whole, so scrape the date range before writing it
+                ledger = get_progress_ledger(s3, season, args.ledger_dir)
+                season_df, last_match_date = scrape_data_in_date_range(season, start_date=start_date,
+                                                                       end_date=end_date, max_workers=args.max_workers,
+                                                                       ledger=ledger)
+                add_scraped_data_to_season_csv(s3, season, season_df, update_metadata=metadata_flag,
+                                               last_match_date=last_match_date, upsert=upsert)
+                ledger.save()
+                continue
 
-    metadata_flag = not(args.season or args.start_date or args.end_date)
-    # Scrape the data withing the specified range
-    season_df, last_match_date = scrape_data_in_date_range(season, start_date=start_date, end_date=end_date)
+            # Stream each batch of matches to S3 as it is scraped
+            if write_mode == "partitioned":
+                sink = S3PartitionedSink(s3, season, update_metadata=metadata_flag,
+                                         row_group_size=args.row_group_size, compression=args.compression)
+            else:
+                sink = S3PartsSink(s3, season, update_metadata=metadata_flag, output_format=args.output_format,
+                                   compression=args.compression, competition=args.competition, upsert=upsert)
+            # Scheduled runs diff the schedule against its index, runs for a date range scrape the range
+            schedule_index = None if args.start_date or args.end_date else \
+                get_schedule_index(s3, season, args.ledger_dir, competition=args.competition)
+            season_job = {"season": season, "sink": sink, "start_date": start_date, "end_date": end_date,
+                          "batch_size": args.batch_size, "competition": args.competition,
+                          "parse_workers": args.parse_workers, "schedule_index": schedule_index,
+                          "ledger": get_progress_ledger(s3, season, args.ledger_dir, competition=args.competition)}
+            if run_mode == "asyncio":
+                season_jobs.append(season_job)
+            else:
+                scrape_data_to_sink(**season_job, max_workers=args.max_workers)
+
+        if season_jobs:
+            # The seasons are scraped together in one event loop
+            results = asyncio.run(scrape_seasons_async(season_jobs, max_workers=args.max_workers,
+                                                       http2=args.http2 or None))
+            errors = [result for result in results if isinstance(result, BaseException)]
+            for season_job, result in zip(season_jobs, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"❌ Failed to scrape season {season_job['season']}: {result}")
+            if errors:
+                raise errors[0]
+
+    if html_cache:
+        html_cache.log_summary()
+
+    # Where the time of the run went, per stage
+    metrics.log_summary()
+    if args.metrics_format:
+        metrics.write(args.metrics_path, output_format=args.metrics_format,
+                      dimensions={"Competition": args.competition or sc.FBREF_DEFAULT_COMPETITION})
 
-    # Write the data to csv
-    add_scraped_data_to_season_csv(s3, season, season_df, update_metadata=metadata_flag)
\ No newline at end of file
+
+if __name__ == '__main__':
+    main()
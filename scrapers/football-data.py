@@ -5,58 +5,82 @@ Scripts to download football data hosted on the website football-data.co.uk
  where <Season> = is the concatenation of last 2 years of season start and season end (2223, 2324 etc)
 """
 
-import requests
-import boto3
-from scraper_constants import ScraperConstants as sc
+from concurrent.futures import ThreadPoolExecutor
+from scrapers.scraper_constants import ScraperConstants as sc
 from boto3.exceptions import Boto3Error
-from utils.s3_utils import does_file_exist_in_s3, is_running_in_aws
+from utils.s3_utils import does_file_exist_in_s3, is_running_in_aws, list_s3_keys
+from utils.s3_transfer_utils import get_s3_client
+from utils.arguments_utils import get_football_data_arguments
+from utils.http_utils import HttpClient, HTTP_ERRORS
 import logging
 
+logger = logging.getLogger(__name__)
 
-def download_epl_data_from_football_data_by_season(season: str, s3_client, overwrite=False):
-    """
-    1) The season will be formatted into the concatenation of last 2 years of season start and season
-    end (2223, 2324 etc). A request will be made to download the resource.
-    2) A check will be performed to see if the file already exists, if it does not the script will continue. Since the
-    data in these files are static, it wont be necessary to download them multiple times
-    3) Send http request for the file
-    4) Save the file to the S3 bucket specified
 
-    :param season: The string representation of the season
+def upload_football_data_season(season: str, s3_client, session=None) -> dict:
+    """
+    Downloads the csv file for a season and saves it to the S3 bucket
+    :param season: The string representation of the season (2223, 2324 etc)
     :param s3_client: The instance of the S3 bucket the file will be downloaded to
-    :param overwrite: Boolean flag to indicate whether to overwrite the existing file on S3 (default is False).
+    :param session: Optional http client to reuse connections between downloads, see create_http_client
+    :return: Result dict of {"season", "status": "uploaded" or "failed", "bytes", "error"}
     """
+    if session is None:
+        # A client just for this download, closed with its connection once the season is uploaded
+        with create_http_client(pool_size=1) as session:
+            return upload_football_data_season(season, s3_client, session)
 
     url = sc.FOOTBALL_DATA_URL.format(season=season)
+    key = sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season)
 
     try:
         # Download the season data and raise error for non-200 response
-        response = requests.get(url)
+        response = session.get(url)
         response.raise_for_status()
 
-        bucket = sc.S3_BUCKET_NAME
-        key = sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season)
-
-        # Check if the file already exists in S3
-        if not overwrite and does_file_exist_in_s3(s3_client=s3_client, bucket=bucket, key=key):
-            return
-        else:
-            # Upload to S3 as a csv File
-            s3_client.put_object(
-                Bucket=sc.S3_BUCKET_NAME,
-                Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season),
-                Body=response.text,
-                ContentType = "text/csv"
-            )
-            print(f"✅ File successfully uploaded to s3://{sc.S3_BUCKET_NAME}/{sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season)}")
-
-
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to download file: {e}")
+        # Upload to S3 as a csv File
+        s3_client.put_object(
+            Bucket=sc.S3_BUCKET_NAME,
+            Key=key,
+            Body=response.content,
+            ContentType="text/csv"
+        )
+        logger.info(f"✅ File successfully uploaded to s3://{sc.S3_BUCKET_NAME}/{key}")
+        return {"season": season, "status": "uploaded", "bytes": len(response.content), "error": None}
+
+    except HTTP_ERRORS as e:
+        logger.error(f"❌ Failed to download file: {e}")
+        return {"season": season, "status": "failed", "bytes": 0, "error": f"Failed to download file: {e}"}
     except Boto3Error as e:
-        print(f"❌ S3 upload failed: {e}")
+        logger.error(f"❌ S3 upload failed: {e}")
+        return {"season": season, "status": "failed", "bytes": 0, "error": f"S3 upload failed: {e}"}
     except Exception as e:
-        print(f"❌ Unexpected error: {e}")
+        logger.error(f"❌ Unexpected error: {e}")
+        return {"season": season, "status": "failed", "bytes": 0, "error": f"Unexpected error: {e}"}
+
+
+def download_epl_data_from_football_data_by_season(season: str, s3_client, overwrite=False, session=None) -> dict:
+    """
+    1) The season will be formatted into the concatenation of last 2 years of season start and season
+    end (2223, 2324 etc).
+    2) A check will be performed to see if the file already exists, if it does the download is skipped. Since the
+    data in these files are static, it wont be necessary to download them multiple times
+    3) Send http request for the file
+    4) Save the file to the S3 bucket specified
+
+    :param season: The string representation of the season
+    :param s3_client: The instance of the S3 bucket the file will be downloaded to
+    :param overwrite: Boolean flag to indicate whether to overwrite the existing file on S3 (default is False).
+    :param session: Optional http client to reuse connections between downloads, see create_http_client
+    :return: Result dict of {"season", "status": "skipped", "uploaded" or "failed", "bytes", "error"}
+    """
+    key = sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season)
+
+    # Check if the file already exists in S3 before downloading it
+    if not overwrite and does_file_exist_in_s3(s3_client=s3_client, bucket=sc.S3_BUCKET_NAME, key=key):
+        return {"season": season, "status": "skipped", "bytes": 0, "error": None}
+
+    return upload_football_data_season(season, s3_client, session=session)
 
 
 def increment_current_season(season: str) -> str:
@@ -78,48 +102,101 @@ def increment_current_season(season: str) -> str:
         end_season = str(int(end_season) + 1)
     return start_season + end_season
 
-def download_football_data_in_range(s3_client, start_season="9394", end_season="2425"):
+def get_seasons_in_range(start_season="9394", end_season="2425") -> list:
+    """
+    Lists the seasons from the start season up to (but not including) the end season
+    :param start_season: the first season in the range
+    :param end_season: the season to stop at (exclusive)
+    :return: List of seasons (9394, 9495 etc)
+    """
+    seasons = []
+    current_season = start_season
+
+    # Limit the number of iterations in case the end season is never reached
+    while current_season != end_season and len(seasons) <= 40:
+        seasons.append(current_season)
+        current_season = increment_current_season(current_season)
+
+    if current_season != end_season:
+        logger.warning("Iterations have exceeded number of seasons, exiting loop")
+    return seasons
+
+
+def create_http_client(pool_size: int) -> HttpClient:
+    """
+    Creates a http client that keeps up to pool_size connections open to reuse between downloads. Throttled and
+    failed downloads are retried with a backoff
+    """
+    return HttpClient(pool_size=pool_size, connect_timeout=sc.HTTP_CONNECT_TIMEOUT_SECONDS,
+                      read_timeout=sc.FOOTBALL_DATA_TIMEOUT_SECONDS, max_retries=sc.HTTP_MAX_RETRIES,
+                      backoff_factor=sc.HTTP_RETRY_BACKOFF_FACTOR,
+                      retry_status_codes=sc.FOOTBALL_DATA_RETRY_STATUS_CODES)
+
+
+def download_football_data_in_range(s3_client, start_season="9394", end_season="2425", overwrite=False,
+                                    max_workers: int = None, session=None) -> list:
     """
     Downloads all football-data files to S3 from the start season to the end season
+    1) List the files already in S3 with a single listing of the football-data prefix
+    2) Work out which seasons are missing
+    3) Download only the missing seasons concurrently through a pooled session
     :param s3_client: The instance of the S3 bucket the file will be downloaded to
     :param start_season: the season to start downloads from
-    :param end_season:  the last season to download data from
+    :param end_season: the season to stop downloads at (exclusive)
+    :param overwrite: Boolean flag to download every season even if the file already exists
+    :param max_workers: Number of concurrent downloads, defaults to ScraperConstants.FOOTBALL_DATA_MAX_WORKERS
+    :param session: Optional http client, a pooled client is created if not given
+    :return: List of result dicts for each season in order, see download_epl_data_from_football_data_by_season
     """
-    current_season = start_season
-    end_season_reached = False
-    count = 0
+    max_workers = max_workers or sc.FOOTBALL_DATA_MAX_WORKERS
+    seasons = get_seasons_in_range(start_season, end_season)
+
+    existing_keys = set() if overwrite else set(list_s3_keys(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                                             prefix=sc.FOOTBALL_DATA_S3_PREFIX))
+    results = {}
+    missing_seasons = []
+    for season in seasons:
+        if sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season) in existing_keys:
+            results[season] = {"season": season, "status": "skipped", "bytes": 0, "error": None}
+        else:
+            missing_seasons.append(season)
 
-    # Iterate through each season until the end_season_reached flag is updated to True
-    while not end_season_reached:
-        print(f"Downloading data for season: {current_season}")
-        download_epl_data_from_football_data_by_season(current_season, s3_client=s3_client)
-        current_season = increment_current_season(current_season)
+    logger.info(f"Downloading {len(missing_seasons)} missing seasons out of {len(seasons)}")
+    if missing_seasons:
+        session = session or create_http_client(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            downloads = executor.map(lambda season: upload_football_data_season(season, s3_client, session=session),
+                                     missing_seasons)
+            for season, result in zip(missing_seasons, downloads):
+                results[season] = result
 
-        if current_season == end_season:
-            end_season_reached = True
-            print(f"End season reached, exiting loop")
-        count += 1
-        if count > 40:
-            print("Iterations have exceeded number of seasons, exiting loop")
-            break
+    return [results[season] for season in seasons]
 
 
+def main(argv: list = None):
+    """
+    Downloads the football-data seasons missing from S3
+    :param argv: The command line arguments, see get_football_data_arguments (defaults to sys.argv)
+    """
+    logging.basicConfig(level=logging.INFO)
+    print("Hello football data!")
+    args = get_football_data_arguments(argv)
 
-if __name__ == '__main__':
     # Get env variable:
     env = is_running_in_aws()
 
-    # Create boto3 session
-    if env == "local":
-        session = boto3.Session(profile_name=sc.PROFILE_NAME)
-    else:
-        session = boto3.Session()
+    # Initialize the shared S3 client (with a connection pool sized for concurrent transfers)
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
 
-    # Initialize S3 client
-    s3 = session.client('s3')
+    results = download_football_data_in_range(s3, start_season=args.start_season, end_season=args.end_season,
+                                              overwrite=args.overwrite, max_workers=args.max_workers)
+    for result in results:
+        if result["status"] == "failed":
+            logger.error(f"❌ Failed to download season {result['season']}: {result['error']}")
+    logger.info(f"✅ Football-data download finished: "
+                f"{sum(result['status'] == 'uploaded' for result in results)} uploaded, "
+                f"{sum(result['status'] == 'skipped' for result in results)} skipped")
 
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
 
-    # download_football_data_in_range(s3, "2324")
-    print("Hello football data!")
+if __name__ == '__main__':
+    main()
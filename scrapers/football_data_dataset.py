@@ -0,0 +1,210 @@
+"""
+Builds one typed dataset from the football-data.co.uk season files downloaded by scrapers/football-data.py, run with
+python -m scrapers football-data-dataset
+The raw season files change their columns, encoding and date format over the years, so they are mapped onto the
+FootballDataSchema and written as a single hive partitioned parquet dataset (season=YYYY/data.parquet):
+1) Read and rename the columns of every season file concurrently
+2) Combine the seasons into one table and convert it to the typed schema with one vectorized pass
+3) Write one parquet file per season partition, rebuilt seasons overwrite their file in place
+A full history load is then a read of one small typed file per season, see read_football_data_dataset
+"""
+import io
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from scrapers.scraper_constants import ScraperConstants as sc
+from schemas.pandas_schemas import FootballDataSchema
+from utils.arguments_utils import get_football_data_dataset_arguments
+from utils.metrics_utils import metrics, timed
+from utils.parquet_utils import PARTITION_LIST_FILE_NAME, save_partitioned_parquet_locally, \
+    save_partitioned_parquet_to_s3, update_partition_list_in_s3, update_partition_list_locally
+from utils.s3_transfer_utils import get_s3_client
+from utils.s3_utils import is_running_in_aws, list_s3_keys, read_json_from_s3
+
+logger = logging.getLogger(__name__)
+
+SEASON_FILE_NAME = re.compile(r"^(\d{4})\.csv$")
+
+
+def get_season_start_year(season: str) -> int:
+    """
+    :param season: The football-data season (9394, 0001, 2324 etc)
+    :return: YYYY - the starting year of the season
+    """
+    start = int(season[:2])
+    return 1900 + start if start >= 50 else 2000 + start
+
+
+def list_football_data_seasons(s3_client) -> list:
+    """
+    :return: The seasons (9394, 9495 etc) of the raw season files in S3, in season order
+    """
+    seasons = []
+    for key in list_s3_keys(s3_client, bucket=sc.S3_BUCKET_NAME, prefix=sc.FOOTBALL_DATA_S3_PREFIX):
+        match = SEASON_FILE_NAME.match(key[len(sc.FOOTBALL_DATA_S3_PREFIX):])
+        if match:
+            seasons.append(match.group(1))
+    return sorted(seasons, key=get_season_start_year)
+
+
+def decode_season_file(data: bytes) -> str:
+    """
+    The recent files are utf-8 (some with a byte order mark), the older files are latin-1
+    """
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def parse_season_file(data: bytes, season: str, schema: FootballDataSchema = None) -> pd.DataFrame:
+    """
+    Reads a raw season file as strings and renames its columns to the schema columns
+    :param data: The contents of the season csv
+    :param season: The football-data season (9394, 0001 etc)
+    :param schema: Optional FootballDataSchema, to share between the seasons
+    :return: Dataframe of strings with the schema columns found in the file and the season column
+    """
+    text = decode_season_file(data)
+    header = pd.read_csv(io.StringIO(text), nrows=0).columns
+    # Some rows have more trailing commas than the header has columns, so only the named columns are read. The files
+    # also end with empty rows, which have no teams
+    season_df = pd.read_csv(io.StringIO(text), dtype=str, usecols=range(len(header)), skip_blank_lines=True)
+    season_df = (schema or FootballDataSchema()).rename(season_df)
+    if "home_team" in season_df:
+        season_df = season_df[season_df["home_team"].notna()]
+    return season_df.assign(season=get_season_start_year(season))
+
+
+@timed("football_data.read_season_file")
+def read_season_file(s3_client, season: str, schema: FootballDataSchema = None) -> pd.DataFrame:
+    """
+    Downloads and parses a raw season file, see parse_season_file
+    """
+    data = s3_client.get_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season))
+    return parse_season_file(data["Body"].read(), season, schema)
+
+
+def build_football_data_dataset(s3_client, seasons: list = None, max_workers: int = None, output_dir: str = None,
+                                compression: str = None) -> dict:
+    """
+    Builds the typed dataset of the football-data seasons, see the module docstring
+    :param s3_client: s3 client instance
+    :param seasons: The seasons to build (9394, 9495 etc), defaults to every season file in S3
+    :param max_workers: Number of season files read concurrently, defaults to ScraperConstants
+    .FOOTBALL_DATA_MAX_WORKERS
+    :param output_dir: Local directory to write the dataset to, it is written to
+    ScraperConstants.FOOTBALL_DATA_PARTITIONED_S3_PREFIX if not set
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: Dict of {"seasons": number of seasons written, "rows": number of rows written, "files": keys or paths
+    written, "failed": {season: error}}
+    """
+    seasons = seasons or list_football_data_seasons(s3_client)
+    schema = FootballDataSchema()
+    failed = {}
+
+    def read_season(season):
+        try:
+            return read_season_file(s3_client, season, schema)
+        except Exception as e:
+            logger.error(f"❌ Failed to read football-data season {season}: {e}")
+            failed[season] = str(e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers or sc.FOOTBALL_DATA_MAX_WORKERS) as executor:
+        season_dfs = [season_df for season_df in executor.map(read_season, seasons) if season_df is not None]
+
+    result = {"seasons": len(season_dfs), "rows": 0, "files": [], "failed": failed}
+    if not season_dfs:
+        logger.info("No football-data seasons to build")
+        return result
+
+    # The seasons are typed together, so the categoricals share one set of categories across the dataset
+    with metrics.timer("football_data.coerce"):
+        dataset_df = schema.coerce(pd.concat(season_dfs, ignore_index=True))
+    write_args = {"partition_cols": sc.FOOTBALL_DATA_PARTITION_COLUMNS,
+                  "file_name": sc.FOOTBALL_DATA_DATASET_FILE_NAME,
+                  "compression": compression or sc.FBREF_PARQUET_COMPRESSION}
+    with metrics.timer("football_data.write_dataset"):
+        if output_dir:
+            result["files"] = save_partitioned_parquet_locally(dataset_df, output_dir, **write_args)
+            update_partition_list_locally(output_dir)
+        else:
+            result["files"] = save_partitioned_parquet_to_s3(s3_client, dataset_df, bucket=sc.S3_BUCKET_NAME,
+                                                             prefix=sc.FOOTBALL_DATA_PARTITIONED_S3_PREFIX,
+                                                             **write_args)
+            update_partition_list_in_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                        prefix=sc.FOOTBALL_DATA_PARTITIONED_S3_PREFIX)
+
+    result["rows"] = len(dataset_df)
+    logger.info(f"✅ Built the football-data dataset: {result['seasons']} seasons, {result['rows']} rows")
+    return result
+
+
+def read_football_data_dataset(s3_client=None, seasons: list = None, directory: str = None,
+                               max_workers: int = None) -> pd.DataFrame:
+    """
+    Loads the typed football-data dataset. The partitions are found from the partition list written with the dataset,
+    so the bucket is not listed, and their files are downloaded concurrently and converted to pandas in one go
+    :param s3_client: s3 client instance, not needed when reading a local directory
+    :param seasons: YYYY - the starting years of the seasons to load, defaults to every season
+    :param directory: Local directory the dataset was built in, see build_football_data_dataset
+    :param max_workers: Number of files downloaded concurrently, defaults to ScraperConstants.FOOTBALL_DATA_MAX_WORKERS
+    :return: Dataframe of the FootballDataSchema with the season column, in season order
+    """
+    # pyarrow is only imported by the runs that read parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if directory:
+        partition_list = json.loads((Path(directory) / PARTITION_LIST_FILE_NAME).read_text(encoding="utf-8"))
+    else:
+        partition_list = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                           key=f"{sc.FOOTBALL_DATA_PARTITIONED_S3_PREFIX}/{PARTITION_LIST_FILE_NAME}",
+                                           default={"partitions": []})
+    partitions = [partition for partition in partition_list["partitions"]
+                  if not seasons or int(partition["values"]["season"]) in seasons]
+
+    def read_partition(partition):
+        path = f"{partition['path']}/{sc.FOOTBALL_DATA_DATASET_FILE_NAME}"
+        if directory:
+            table = pq.read_table(Path(directory) / path)
+        else:
+            data = s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                        Key=f"{sc.FOOTBALL_DATA_PARTITIONED_S3_PREFIX}/{path}")
+            table = pq.read_table(io.BytesIO(data["Body"].read()))
+        # The partition column is encoded in the path, not the file
+        return table.append_column("season", pa.array([int(partition["values"]["season"])] * table.num_rows,
+                                                      pa.int16()))
+
+    with ThreadPoolExecutor(max_workers=max_workers or sc.FOOTBALL_DATA_MAX_WORKERS) as executor:
+        tables = list(executor.map(read_partition, partitions))
+    if not tables:
+        return pd.DataFrame()
+    # The dictionaries of the categorical columns are unified when the tables are converted together
+    return pa.concat_tables(tables).to_pandas()
+
+
+def main(argv: list = None):
+    """
+    Builds the typed football-data dataset from the raw season files in S3
+    :param argv: The command line arguments, see get_football_data_dataset_arguments (defaults to sys.argv)
+    """
+    logging.basicConfig(level=logging.INFO)
+    args = get_football_data_dataset_arguments(argv)
+
+    env = is_running_in_aws()
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
+
+    result = build_football_data_dataset(s3, seasons=args.season, max_workers=args.max_workers,
+                                         output_dir=args.output_dir, compression=args.compression)
+    for season, error in result["failed"].items():
+        logger.error(f"❌ Failed to build season {season}: {error}")
+    metrics.log_summary()
+
+
+if __name__ == '__main__':
+    main()
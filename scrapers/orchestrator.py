@@ -0,0 +1,192 @@
+"""
+Orchestrates backfills across several competitions and seasons with a work queue, so the scraping can be shared by
+several worker tasks in the ECS cluster
+1) publish - expands every (competition, season, date range) into one work item per match report and sends the
+items to the queue. Matches already completed in the season's progress ledger are not published
+2) work - claims a batch of work items from the queue, scrapes the match reports and writes them to the season parts.
+Items are only deleted from the queue once their data is written, so items claimed by a worker that crashes are
+delivered to another worker when their visibility timeout expires
+The queue is an SQS queue, or a SQLite file when running locally (--queue_path)
+"""
+import logging
+import time
+import boto3
+from scrapers.scraper_constants import ScraperConstants as sc
+from scrapers.fbref import configure_fetching, iter_match_tasks, iter_match_batches, get_progress_ledger, S3PartsSink
+from scrapers.parsers import ParserBackend, get_parser_backend
+from utils.arguments_utils import get_orchestrator_arguments
+from utils.queue_utils import SqsWorkQueue, SqliteWorkQueue
+from utils.s3_transfer_utils import get_s3_client
+from utils.s3_utils import is_running_in_aws
+
+logger = logging.getLogger(__name__)
+
+
+def expand_work_items(competitions: list, seasons: list, start_date=None, end_date=None, s3_client=None,
+                      parser: ParserBackend = None) -> list:
+    """
+    Expands each competition and season into a work item for every match report in the date range
+    :param competitions: Keys of ScraperConstants.FBREF_COMPETITIONS
+    :param seasons: Seasons to scrape (YYYY)
+    :param start_date: start date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param end_date: end date to scrape data from (inclusive) (In the format YYYY-MM-DD)
+    :param s3_client: s3 client instance, used to skip the matches completed in the progress ledger if given
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: List of {"competition", "season", "match_url", "date", "row"} dicts, "row" is the schedule row used for
+    the watermark columns
+    """
+    parser = parser or get_parser_backend()
+    work_items = []
+    for competition in competitions:
+        for season in seasons:
+            ledger = get_progress_ledger(s3_client, season, competition=competition) if s3_client else None
+            for row, match_url, date_str in iter_match_tasks(season, start_date=start_date, end_date=end_date,
+                                                             parser=parser, competition=competition):
+                if ledger and ledger.is_completed(match_url):
+                    continue
+                work_items.append({"competition": competition, "season": season, "match_url": match_url,
+                                   "date": date_str, "row": row})
+            logger.info(f"Expanded {competition} {season} - {season + 1}, {len(work_items)} work items so far")
+    return work_items
+
+
+def publish_work_items(queue, competitions: list, seasons: list, start_date=None, end_date=None,
+                       s3_client=None) -> int:
+    """
+    Expands the competitions and seasons into work items and sends them to the queue
+    :return: The number of work items published
+    """
+    work_items = expand_work_items(competitions, seasons, start_date=start_date, end_date=end_date,
+                                   s3_client=s3_client)
+    queue.send_messages(work_items)
+    logger.info(f"✅ Published {len(work_items)} work items")
+    return len(work_items)
+
+
+def process_messages(queue, messages: list, s3_client, parser: ParserBackend = None, max_workers: int = None,
+                     output_format: str = None, compression: str = None) -> dict:
+    """
+    Scrapes the match reports of a batch of claimed work items and writes them as one part per season.
+    1) Items already completed in the progress ledger (e.g. delivered twice) are deleted without being scraped
+    2) The matches of each season are scraped concurrently and written to the season parts
+    3) The written matches are marked as completed in the ledger and deleted from the queue. Failed matches are left
+    on the queue, so they are retried when their visibility timeout expires
+    :param queue: SqsWorkQueue or SqliteWorkQueue
+    :param messages: The messages returned by queue.receive_messages
+    :param s3_client: s3 client instance
+    :param parser: The parser backend, defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :param max_workers: Number of match reports to scrape concurrently, defaults to ScraperConstants.FBREF_MAX_WORKERS
+    :param output_format: 'csv' or 'parquet', defaults to ScraperConstants.FBREF_OUTPUT_FORMAT
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: Dict with the number of completed, skipped and failed matches
+    """
+    parser = parser or get_parser_backend()
+    summary = {"completed": 0, "skipped": 0, "failed": 0}
+
+    seasons = {}
+    for message in messages:
+        body = message["body"]
+        seasons.setdefault((body["competition"], body["season"]), []).append(message)
+
+    for (competition, season), season_messages in seasons.items():
+        ledger = get_progress_ledger(s3_client, season, competition=competition)
+        receipt_handles = {}
+        match_tasks = []
+        for message in season_messages:
+            body = message["body"]
+            if ledger.is_completed(body["match_url"]):
+                queue.delete_message(message["receipt_handle"])
+                summary["skipped"] += 1
+                continue
+            receipt_handles[body["match_url"]] = message["receipt_handle"]
+            match_tasks.append((body["row"], body["match_url"], body["date"]))
+
+        sink = S3PartsSink(s3_client, season, update_metadata=False, output_format=output_format,
+                           compression=compression, competition=competition)
+        for batch_df, last_date, match_urls in iter_match_batches(match_tasks, parser=parser,
+                                                                  max_workers=max_workers,
+                                                                  batch_size=len(match_tasks) or None,
+                                                                  on_error=ledger.mark_failed):
+            sink.write(batch_df, last_date)
+            ledger.mark_completed(match_urls)
+            ledger.save()
+            for match_url in match_urls:
+                queue.delete_message(receipt_handles.pop(match_url))
+            summary["completed"] += len(match_urls)
+
+        summary["failed"] += len(receipt_handles)
+        if receipt_handles:
+            ledger.save()
+
+    return summary
+
+
+def run_worker(queue, s3_client, max_messages: int = None, max_workers: int = None, idle_polls: int = 3,
+               output_format: str = None, compression: str = None) -> dict:
+    """
+    Claims batches of work items from the queue until it has been empty for idle_polls polls in a row
+    :param queue: SqsWorkQueue or SqliteWorkQueue
+    :param s3_client: s3 client instance
+    :param max_messages: Number of work items claimed at a time, defaults to ScraperConstants.FBREF_PIPELINE_BATCH_SIZE
+    :param max_workers: Number of match reports to scrape concurrently, defaults to ScraperConstants.FBREF_MAX_WORKERS
+    :param idle_polls: Number of empty polls before the worker stops
+    :param output_format: 'csv' or 'parquet', defaults to ScraperConstants.FBREF_OUTPUT_FORMAT
+    :param compression: Parquet compression codec, defaults to ScraperConstants.FBREF_PARQUET_COMPRESSION
+    :return: Dict with the total number of completed, skipped and failed matches
+    """
+    parser = get_parser_backend()
+    totals = {"completed": 0, "skipped": 0, "failed": 0}
+    empty_polls = 0
+    while empty_polls < idle_polls:
+        messages = queue.receive_messages(max_messages or sc.FBREF_PIPELINE_BATCH_SIZE)
+        if not messages:
+            empty_polls += 1
+            time.sleep(sc.FBREF_QUEUE_IDLE_SLEEP_SECONDS)
+            continue
+
+        empty_polls = 0
+        summary = process_messages(queue, messages, s3_client, parser=parser, max_workers=max_workers,
+                                   output_format=output_format, compression=compression)
+        logger.info(f"Processed {len(messages)} work items: {summary}")
+        for status, count in summary.items():
+            totals[status] += count
+
+    logger.info(f"✅ Queue is empty, stopping worker: {totals}")
+    return totals
+
+
+def get_work_queue(args, env: str):
+    """
+    Creates the queue from the command line arguments, a SQLite file if --queue_path is given otherwise SQS
+    """
+    if args.queue_path:
+        return SqliteWorkQueue(args.queue_path, visibility_timeout=args.visibility_timeout
+                               or sc.FBREF_QUEUE_VISIBILITY_TIMEOUT_SECONDS)
+    session = boto3.Session(profile_name=sc.PROFILE_NAME if env == "local" else None)
+    return SqsWorkQueue(session.client("sqs", region_name=sc.AWS_REGION), args.queue_url,
+                        visibility_timeout=args.visibility_timeout)
+
+
+def main(argv: list = None):
+    """
+    Publishes work items to the queue or runs a queue worker
+    :param argv: The command line arguments, see get_orchestrator_arguments (defaults to sys.argv)
+    """
+    logging.basicConfig(level=logging.INFO)
+    args = get_orchestrator_arguments(argv)
+
+    env = is_running_in_aws()
+    s3 = get_s3_client(profile_name=sc.PROFILE_NAME if env == "local" else None)
+    queue = get_work_queue(args, env)
+    if args.command == "publish":
+        publish_work_items(queue, args.competitions, args.seasons, start_date=args.start_date,
+                           end_date=args.end_date, s3_client=s3)
+    else:
+        # fbref.com limits the requests per client, so each worker gets its share of the budget
+        configure_fetching(requests_per_minute=args.requests_per_minute, pool_size=args.max_workers)
+        run_worker(queue, s3, max_workers=args.max_workers, idle_polls=args.idle_polls,
+                   output_format=args.output_format, compression=args.compression)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Parser backends used to extract data from fbref.com pages
+1) BeautifulSoupParser - The reference backend. Builds a BeautifulSoup tree using the built-in html.parser
+2) LxmlParser - The fast backend. Builds an lxml tree and pulls the rows and data-stat cells straight out with xpath
+
+Each backend parses the raw html into a backend specific document and extracts the same plain python structures from it,
+so the scraper functions in scrapers/fbref.py do not need to know which backend is being used:
+    - get_match_header: The text of the match report h1 header (e.g. "Newcastle United vs. Nottingham Forest Match Report")
+    - get_stats_tables: {table_id: [row, ...]} for every stats table, where each row is a list of (data_stat, text) cells
+    - get_schedule_rows: A list of {"th": {data_stat: text}, "td": {data_stat: text}, "match_report_href": href} dicts
+    for each row in the scores and fixtures table
+"""
+import logging
+from scrapers.scraper_constants import ScraperConstants as sc
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+
+class ParserBackend:
+    """
+    Interface for the parser backends. Cell text is always extracted with leading/trailing whitespace removed from
+    each text node (equivalent to BeautifulSoup's get_text(strip=True)) and cells without a data-stat are ignored.
+    """
+    name = None
+
+    def parse(self, content):
+        """
+        :param content: Raw html of the page (bytes or str)
+        :return: The backend specific document
+        """
+        raise NotImplementedError
+
+    def get_match_header(self, document) -> str:
+        raise NotImplementedError
+
+    def get_stats_tables(self, document) -> dict:
+        raise NotImplementedError
+
+    def get_schedule_rows(self, document) -> list:
+        raise NotImplementedError
+
+
+class BeautifulSoupParser(ParserBackend):
+    name = "html.parser"
+
+    def parse(self, content):
+        # Imported here as the lxml backend is the default
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(content, "html.parser")
+
+    def get_match_header(self, document) -> str:
+        return document.find("h1").get_text()
+
+    def get_stats_tables(self, document) -> dict:
+        stats_tables = {}
+        for table in document.find_all("table", class_="stats_table", id=True):
+            table_body = table.find("tbody")
+            table_rows = table_body.find_all("tr") if table_body else []
+            stats_tables[table["id"]] = [
+                [(cell["data-stat"], cell.get_text(strip=True))
+                 for cell in row.find_all(["th", "td"]) if cell.has_attr("data-stat")]
+                for row in table_rows
+            ]
+        return stats_tables
+
+    def get_schedule_rows(self, document) -> list:
+        table_header = document.find("h2")
+        match_table = table_header.find_next("tbody") if table_header else None
+        if not match_table:
+            return []
+
+        schedule_rows = []
+        for row in match_table.find_all("tr"):
+            schedule_row = {"th": {}, "td": {}, "match_report_href": None}
+            for cell in row.find_all(["th", "td"]):
+                if cell.has_attr("data-stat"):
+                    schedule_row[cell.name].setdefault(cell["data-stat"], cell.get_text(strip=True))
+
+            match_report_cell = row.find("td", {"data-stat": "match_report"})
+            match_report_link = match_report_cell.find("a") if match_report_cell else None
+            if match_report_link:
+                schedule_row["match_report_href"] = match_report_link["href"]
+            schedule_rows.append(schedule_row)
+
+        return schedule_rows
+
+
+class LxmlParser(ParserBackend):
+    name = "lxml"
+
+    STATS_TABLE_XPATH = "//table[@id and contains(concat(' ', normalize-space(@class), ' '), ' stats_table ')]"
+
+    @staticmethod
+    def _get_text(element) -> str:
+        return "".join(text.strip() for text in element.itertext())
+
+    def parse(self, content):
+        return lxml_html.fromstring(content)
+
+    def get_match_header(self, document) -> str:
+        return "".join(document.xpath("(//h1)[1]")[0].itertext())
+
+    def get_stats_tables(self, document) -> dict:
+        stats_tables = {}
+        for table in document.xpath(self.STATS_TABLE_XPATH):
+            stats_tables[table.get("id")] = [
+                [(cell.get("data-stat"), self._get_text(cell)) for cell in row.xpath(".//*[self::th or self::td]")
+                 if cell.get("data-stat") is not None]
+                for row in table.xpath("(.//tbody)[1]//tr")
+            ]
+        return stats_tables
+
+    def get_schedule_rows(self, document) -> list:
+        match_tables = document.xpath("(//h2)[1]/following::tbody[1]")
+        if not match_tables:
+            return []
+
+        schedule_rows = []
+        for row in match_tables[0].xpath(".//tr"):
+            schedule_row = {"th": {}, "td": {}, "match_report_href": None}
+            for cell in row.xpath(".//*[self::th or self::td][@data-stat]"):
+                schedule_row[cell.tag].setdefault(cell.get("data-stat"), self._get_text(cell))
+
+            match_report_links = row.xpath("(.//td[@data-stat='match_report'])[1]//a[1]")
+            if match_report_links:
+                schedule_row["match_report_href"] = match_report_links[0].get("href")
+            schedule_rows.append(schedule_row)
+
+        return schedule_rows
+
+
+PARSER_BACKENDS = {
+    BeautifulSoupParser.name: BeautifulSoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+
+def get_parser_backend(name: str = None) -> ParserBackend:
+    """
+    Returns an instance of the parser backend. Falls back to the BeautifulSoup backend if lxml is not installed
+    :param name: Name of the backend ('lxml' or 'html.parser'). Defaults to ScraperConstants.FBREF_PARSER_BACKEND
+    :return: ParserBackend instance
+    """
+    name = name or sc.FBREF_PARSER_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}. Choose from {list(PARSER_BACKENDS)}")
+
+    if name == LxmlParser.name and lxml_html is None:
+        logger.warning("lxml is not installed, falling back to the html.parser backend")
+        name = BeautifulSoupParser.name
+
+    return PARSER_BACKENDS[name]()
@@ -7,8 +7,99 @@ class ScraperConstants(object):
     # football-data.o.uk
     FOOTBALL_DATA_URL = "https://www.football-data.co.uk/mmz4281/{season}/E0.csv"
     FOOTBALL_DATA_S3_FILE_KEY = "raw/football_data/{season}.csv"
+    FOOTBALL_DATA_S3_PREFIX = "raw/football_data/"
+    FOOTBALL_DATA_MAX_WORKERS = 8
+    FOOTBALL_DATA_TIMEOUT_SECONDS = 30
+    # The static csv files are retried on throttling too, as nothing else shares the rate limit of the host
+    FOOTBALL_DATA_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    # Typed dataset of every season, one hive partition (season=YYYY/) per season, see FootballDataSchema
+    FOOTBALL_DATA_PARTITIONED_S3_PREFIX = "raw/football_data/partitioned"
+    FOOTBALL_DATA_PARTITION_COLUMNS = ["season"]
+    FOOTBALL_DATA_DATASET_FILE_NAME = "data.parquet"
+
+    # HTTP client shared by the scrapers
+    HTTP_CONNECT_TIMEOUT_SECONDS = 10
+    HTTP_MAX_RETRIES = 3
+    HTTP_RETRY_BACKOFF_FACTOR = 1
 
     # fbref.com
-    FBREF_URL = "https://fbref.com/en/comps/9/{year}-{next_year}/schedule/{year}-{next_year}-Premier-League-Scores-and-Fixtures"
+    FBREF_URL = "https://fbref.com/en/comps/{comp_id}/{year}-{next_year}/schedule/{year}-{next_year}-{comp_name}-Scores-and-Fixtures"
+    # Competitions that can be scraped: {competition: {"id": fbref competition id, "name": name used in the url}}
+    FBREF_COMPETITIONS = {
+        "premier-league": {"id": 9, "name": "Premier-League"},
+        "la-liga": {"id": 12, "name": "La-Liga"},
+        "serie-a": {"id": 11, "name": "Serie-A"},
+        "bundesliga": {"id": 20, "name": "Bundesliga"},
+        "ligue-1": {"id": 13, "name": "Ligue-1"},
+    }
+    # The premier league keeps the original keys, other competitions are stored under raw/fbref_data/<competition>/
+    FBREF_DEFAULT_COMPETITION = "premier-league"
     FBREF_DATA_S3_FILE_KEY = "raw/fbref_data/{season_start}-{season_end}.csv"
-    FBREF_RAW_METADATA_FILE_KEY = "raw/fbref_data/last_updated.json"
\ No newline at end of file
+    FBREF_RAW_METADATA_FILE_KEY = "raw/fbref_data/last_updated.json"
+    # Incremental season data: each scrape run is written as an immutable part listed in the season's manifest
+    FBREF_SEASON_PART_S3_FILE_KEY = "raw/fbref_data/{competition_dir}{season_start}-{season_end}/parts/part-{part_id}.{extension}"
+    FBREF_SEASON_MANIFEST_S3_FILE_KEY = "raw/fbref_data/{competition_dir}{season_start}-{season_end}/manifest.json"
+    # Hashed key index of the season's rows, a new object is written with every part and swapped in with the manifest.
+    # The season csv keeps its index next to it
+    FBREF_KEY_INDEX_S3_FILE_KEY = "raw/fbref_data/{competition_dir}{season_start}-{season_end}/key_index/{shard_id}/key_index-{index_id}.json"
+    FBREF_CSV_KEY_INDEX_S3_FILE_KEY = "raw/fbref_data/{season_start}-{season_end}.key_index.json"
+    FBREF_LEDGER_S3_FILE_KEY = "raw/fbref_data/{competition_dir}{season_start}-{season_end}/ledger.json"
+    # Compact copy of the season's schedule, diffed against each new fetch of the schedule
+    # Failed matches are retried by the following runs until they have been attempted this many times
+    FBREF_LEDGER_MAX_ATTEMPTS = 5
+    FBREF_SCHEDULE_INDEX_S3_FILE_KEY = "raw/fbref_data/{competition_dir}{season_start}-{season_end}/schedule_index.json"
+    # How scraped data is written to S3: 'csv' (append to the season file read by Athena and the downstream jobs),
+    # 'parts' (incremental parts listed in a season manifest) or 'partitioned'. The other modes are opted into with
+    # --write_mode
+    FBREF_WRITE_MODE = "csv"
+    # File format of the season parts ('csv' or 'parquet') and the parquet compression codec ('snappy' or 'zstd')
+    FBREF_OUTPUT_FORMAT = "csv"
+    # With --upsert, scraped rows replace the rows with the same key in the season instead of being appended, so
+    # re-running a date range does not duplicate rows. The key columns can be swapped for fbref match/player ids once
+    # they are scraped
+    FBREF_UPSERT = False
+    FBREF_UPSERT_KEY_COLUMNS = ["date", "home_team", "away_team", "player"]
+    # Compaction merges the season parts smaller than the target size into parquet parts of about the target size.
+    # Superseded parts are kept for the grace period, so readers that read the manifest before the swap can finish
+    FBREF_COMPACTION_TARGET_SIZE_BYTES = 128 * 1024 ** 2
+    FBREF_COMPACTION_GRACE_SECONDS = 60 * 60
+    FBREF_PARQUET_COMPRESSION = "snappy"
+    # Hive partitioned parquet dataset (season=YYYY/gameweek=NN/) for Athena
+    FBREF_PARTITIONED_S3_PREFIX = "raw/fbref_data/partitioned"
+    FBREF_PARTITION_COLUMNS = ["season", "gameweek"]
+    FBREF_PARQUET_ROW_GROUP_SIZE = 10000
+    # Parser backend used to parse fbref pages ('lxml' or 'html.parser')
+    FBREF_PARSER_BACKEND = "lxml"
+    # Number of match reports fetched and parsed concurrently
+    FBREF_MAX_WORKERS = 4
+    # Number of processes parsing match reports, 0 parses in the download threads
+    FBREF_PARSE_WORKERS = 0
+    # Matches written to the sink at a time by the streaming pipeline (a gameweek)
+    FBREF_PIPELINE_BATCH_SIZE = 10
+    # How the match reports are scraped: 'threads' (a thread pool) or 'asyncio' (one event loop, see
+    # scrape_data_to_sink_async)
+    FBREF_RUN_MODE = "threads"
+    # Orchestrator work queue: seconds a claimed batch of matches is leased to a worker, and seconds a worker waits
+    # before polling an empty queue again
+    FBREF_QUEUE_VISIBILITY_TIMEOUT_SECONDS = 15 * 60
+    FBREF_QUEUE_IDLE_SLEEP_SECONDS = 5
+    # fbref.com blocks clients making more than 10 requests per minute. A run starts below the limit and is raised by
+    # half a request per minute for every healthy response, up to the limit itself
+    FBREF_REQUESTS_PER_MINUTE = 8
+    FBREF_REQUEST_BURST = 1
+    # The rate is cut after 429/503 responses down to the minimum and raised back up to the maximum while the responses
+    # are healthy. Throttled requests are retried after the backoff before falling back to selenium
+    FBREF_MIN_REQUESTS_PER_MINUTE = 2
+    FBREF_MAX_REQUESTS_PER_MINUTE = 10
+    FBREF_MAX_THROTTLED_RETRIES = 3
+    FBREF_READ_TIMEOUT_SECONDS = 30
+    # Fetch fbref pages over HTTP/2 with httpx (requires pip install httpx[http2])
+    FBREF_HTTP2 = False
+    # Local html cache (enabled with --cache_dir)
+    FBREF_CACHE_MAX_SIZE_BYTES = 2 * 1024 ** 3
+    FBREF_SCHEDULE_CACHE_TTL_SECONDS = 6 * 60 * 60
+    FBREF_PENDING_MATCH_CACHE_TTL_SECONDS = 60 * 60
+
+    # selenium
+    # Number of pages a pooled chrome driver loads before it is replaced
+    SELENIUM_MAX_PAGES_PER_DRIVER = 50
\ No newline at end of file
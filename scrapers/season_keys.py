@@ -0,0 +1,20 @@
+"""
+Arguments of the S3 keys of a season. Kept apart from scrapers/fbref.py so commands that only read the season's
+metadata (e.g. the status command) do not import the scraper and its dependencies
+"""
+from scrapers.scraper_constants import ScraperConstants as sc
+
+
+def get_season_key_args(season_year: int, competition: str = None) -> dict:
+    """
+    :param season_year: YYYY - the starting year of the season
+    :param competition: A key of ScraperConstants.FBREF_COMPETITIONS, defaults to the premier league
+    :return: The arguments used to format the season S3 keys. The premier league is stored at the root of
+    raw/fbref_data/ and other competitions in a folder named after the competition
+    """
+    competition = competition or sc.FBREF_DEFAULT_COMPETITION
+    return {
+        "season_start": str(season_year),
+        "season_end": str(season_year + 1),
+        "competition_dir": "" if competition == sc.FBREF_DEFAULT_COMPETITION else f"{competition}/",
+    }
@@ -89,7 +89,7 @@ resource "aws_ecs_task_definition" "fbref_scraper_task" {
     {
       name      = "fb-scraper-container"
       image     = "466436411559.dkr.ecr.eu-west-2.amazonaws.com/football-etl-repo:latest"
-      command   = ["/app/scrapers/fbref.py"]
+      command   = ["-m", "scrapers", "fbref"]
       essential = true
       memory    = 1024
       memoryReservation = 1024
@@ -130,6 +130,114 @@ resource "aws_ecs_task_definition" "fbref_scraper_task" {
   }
 }
 
+# Work queue for multi-season / multi-competition backfills (scrapers/orchestrator.py)
+resource "aws_sqs_queue" "fbref_work_queue_dlq" {
+  name                      = "fbref-work-queue-dlq"
+  message_retention_seconds = 1209600
+}
+
+resource "aws_sqs_queue" "fbref_work_queue" {
+  name                       = "fbref-work-queue"
+  visibility_timeout_seconds = 900
+  message_retention_seconds  = 1209600
+  receive_wait_time_seconds  = 20
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.fbref_work_queue_dlq.arn
+    maxReceiveCount     = 5
+  })
+}
+
+# The tasks only use the work queue and its dead letter queue
+resource "aws_iam_role_policy" "ecs_task_sqs_policy" {
+  name = "fbref-work-queue-access"
+  role = aws_iam_role.ecs_task_execution_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:ChangeMessageVisibility",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = [
+          aws_sqs_queue.fbref_work_queue.arn,
+          aws_sqs_queue.fbref_work_queue_dlq.arn
+        ]
+      }
+    ]
+  })
+}
+
+variable "fbref_requests_per_minute_budget" {
+  description = "Requests per minute to fbref.com shared by every worker (ScraperConstants.FBREF_MAX_REQUESTS_PER_MINUTE)"
+  type        = number
+  default     = 10
+}
+
+variable "fbref_worker_count" {
+  description = "Number of worker tasks run at once for a backfill (the --count of aws ecs run-task)"
+  type        = number
+  default     = 2
+}
+
+locals {
+  # Each worker gets its share of the budget, so the workers together never go over it
+  fbref_worker_requests_per_minute = max(1, floor(var.fbref_requests_per_minute_budget / var.fbref_worker_count))
+}
+
+# Run var.fbref_worker_count copies of this task to scale a backfill out, each one claims work items until the queue is
+# empty. fbref.com limits requests per client, so --requests_per_minute is the share of the budget of each worker
+resource "aws_ecs_task_definition" "fbref_worker_task" {
+  family                   = "fbref-worker-task"
+  cpu                      = "256"
+  memory                   = "1024"
+  network_mode             = "awsvpc"
+  requires_compatibilities = ["FARGATE"]
+  execution_role_arn       = aws_iam_role.ecs_task_execution_role.arn
+  task_role_arn            = aws_iam_role.ecs_task_execution_role.arn
+
+  container_definitions = jsonencode([
+    {
+      name      = "fb-worker-container"
+      image     = "466436411559.dkr.ecr.eu-west-2.amazonaws.com/football-etl-repo:latest"
+      command   = ["-m", "scrapers", "orchestrator", "--queue_url", aws_sqs_queue.fbref_work_queue.url, "work",
+                   "--requests_per_minute", tostring(local.fbref_worker_requests_per_minute)]
+      essential = true
+      memory    = 1024
+      memoryReservation = 1024
+
+      environment = [
+        {
+          name  = "APP_ENV"
+          value = "AWS"
+        }
+      ]
+
+      logConfiguration = {
+        logDriver = "awslogs"
+        options = {
+          awslogs-group         = aws_cloudwatch_log_group.fbref_scraper.name
+          awslogs-region        = "eu-west-2"
+          awslogs-stream-prefix = "worker"
+          max-buffer-size       = "25m"
+          mode                  = "non-blocking"
+        }
+      }
+    }
+  ])
+
+  runtime_platform {
+    cpu_architecture        = "X86_64"
+    operating_system_family = "LINUX"
+  }
+}
+
 # Backend setup
 resource "aws_s3_bucket" "tf_backend" {
   bucket = "terraform-backend-football-etl"
@@ -0,0 +1,16 @@
+import boto3
+import pytest
+from moto import mock_aws
+from scrapers.scraper_constants import ScraperConstants as sc
+
+
+@pytest.fixture
+def s3_client():
+    """
+    S3 client for a mocked bucket named ScraperConstants.S3_BUCKET_NAME
+    """
+    with mock_aws():
+        client = boto3.client("s3", region_name=sc.AWS_REGION)
+        client.create_bucket(Bucket=sc.S3_BUCKET_NAME,
+                             CreateBucketConfiguration={"LocationConstraint": sc.AWS_REGION})
+        yield client
@@ -0,0 +1,152 @@
+import os
+import pytest
+from unittest.mock import Mock, patch
+from utils.cache_utils import HtmlCache
+import scrapers.fbref as fbref
+
+SCHEDULE_URL = "https://fbref.com/en/comps/9/2024-2025/schedule/2024-2025-Premier-League-Scores-and-Fixtures"
+MATCH_URL = "https://fbref.com/en/matches/a1d0d529/Newcastle-United-Nottingham-Forest-August-6-2022-Premier-League"
+
+FINISHED_MATCH_HTML = b'<div class="scores"><div class="score">2</div></div><div class="score">0</div>'
+PENDING_MATCH_HTML = b'<div class="scores"><div class="score"></div></div>'
+
+
+@pytest.fixture
+def clock():
+    now = [1_000_000.0]
+    with patch("utils.cache_utils.time.time", side_effect=lambda: now[0]):
+        yield now
+
+
+@pytest.fixture
+def html_cache(tmp_path):
+    return HtmlCache(str(tmp_path), max_size_bytes=10 * 1024 ** 2, schedule_ttl=60, pending_match_ttl=30)
+
+
+def test_finished_match_report_never_expires(html_cache, clock):
+    html_cache.put(MATCH_URL, FINISHED_MATCH_HTML)
+    clock[0] += 10 * 365 * 24 * 60 * 60
+
+    entry = html_cache.get(MATCH_URL)
+
+    assert entry["content"] == FINISHED_MATCH_HTML
+    assert entry["is_fresh"]
+    assert html_cache.stats["hits"] == 1
+
+
+def test_pending_match_report_and_schedule_expire(html_cache, clock):
+    html_cache.put(MATCH_URL, PENDING_MATCH_HTML)
+    html_cache.put(SCHEDULE_URL, b"<html>schedule</html>", etag='"abc"')
+
+    clock[0] += 45
+    assert not html_cache.get(MATCH_URL)["is_fresh"]
+    assert html_cache.get(SCHEDULE_URL)["is_fresh"]
+
+    clock[0] += 30
+    entry = html_cache.get(SCHEDULE_URL)
+    assert not entry["is_fresh"]
+    assert html_cache.get_conditional_headers(entry) == {"If-None-Match": '"abc"'}
+    assert html_cache.stats["misses"] == 2
+
+
+def test_identical_content_is_stored_once(html_cache, tmp_path):
+    html_cache.put(MATCH_URL, FINISHED_MATCH_HTML)
+    html_cache.put(MATCH_URL + "?copy", FINISHED_MATCH_HTML)
+
+    assert len(list((tmp_path / "objects").iterdir())) == 1
+    assert len(list((tmp_path / "entries").iterdir())) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # Random bytes don't compress, so each page takes up just over 1000 bytes
+    html_cache = HtmlCache(str(tmp_path), max_size_bytes=2500)
+    urls = [f"https://fbref.com/en/matches/{match}" for match in range(3)]
+    pages = {url: os.urandom(1000) for url in urls}
+
+    html_cache.put(urls[0], pages[urls[0]])
+    clock[0] += 1
+    html_cache.put(urls[1], pages[urls[1]])
+    clock[0] += 1
+    # Using the first page makes the second page the least recently used
+    html_cache.get(urls[0])
+    clock[0] += 1
+    html_cache.put(urls[2], pages[urls[2]])
+
+    assert html_cache.stats["evicted"] == 1
+    assert html_cache.get(urls[1]) is None
+    assert html_cache.get(urls[0])["content"] == pages[urls[0]]
+    assert html_cache.get(urls[2])["content"] == pages[urls[2]]
+
+
+def test_get_returns_the_page_when_its_entry_is_evicted_while_reading(html_cache):
+    html_cache.put(MATCH_URL, FINISHED_MATCH_HTML)
+    read_bytes = type(html_cache._object_path("")).read_bytes
+
+    def read_then_evict(path):
+        # Another thread evicts the entry after its content was read
+        content = read_bytes(path)
+        html_cache._entry_path(MATCH_URL).unlink()
+        return content
+
+    with patch("pathlib.Path.read_bytes", autospec=True, side_effect=read_then_evict):
+        entry = html_cache.get(MATCH_URL)
+
+    assert entry["content"] == FINISHED_MATCH_HTML
+
+
+def test_content_shared_by_several_urls_is_kept_until_the_last_is_evicted(tmp_path, clock):
+    html_cache = HtmlCache(str(tmp_path), max_size_bytes=2500)
+    shared_page = os.urandom(1000)
+    for url in ["https://fbref.com/en/matches/a", "https://fbref.com/en/matches/b"]:
+        html_cache.put(url, shared_page)
+        clock[0] += 1
+    html_cache.put("https://fbref.com/en/matches/c", os.urandom(1000))
+    clock[0] += 1
+    html_cache.put("https://fbref.com/en/matches/d", os.urandom(1000))
+
+    # Evicting a frees nothing, so b goes too before the shared content is deleted
+    assert html_cache.stats["evicted"] == 2
+    assert len(list((tmp_path / "objects").iterdir())) == 2
+
+
+def test_cache_size_is_kept_without_scanning_the_directory(tmp_path, clock):
+    html_cache = HtmlCache(str(tmp_path), max_size_bytes=2500)
+    urls = [f"https://fbref.com/en/matches/{match}" for match in range(3)]
+
+    with patch.object(html_cache, "_get_object_sizes", wraps=html_cache._get_object_sizes) as mock_scan:
+        for url in urls[:2]:
+            html_cache.put(url, os.urandom(1000))
+            clock[0] += 1
+        # Only the put that goes over the limit scans the cache
+        assert mock_scan.call_count == 0
+        html_cache.put(urls[2], os.urandom(1000))
+        assert mock_scan.call_count == 1
+
+    stored_size = sum(path.stat().st_size for path in (tmp_path / "objects").iterdir())
+    assert html_cache.total_size == stored_size <= 2500
+    # A new cache on the same directory starts from the stored size
+    assert HtmlCache(str(tmp_path), max_size_bytes=2500).total_size == stored_size
+
+
+def test_get_html_content_revalidates_expired_page(html_cache, clock):
+    html_cache.put(SCHEDULE_URL, b"<html>schedule</html>", last_modified="Mon, 05 May 2025 22:00:00 GMT")
+    clock[0] += 120
+
+    with patch.object(fbref, "html_cache", html_cache), patch("scrapers.fbref.http_client.get") as mock_get, \
+            patch("time.sleep"):
+        mock_get.return_value = Mock(status_code=304)
+        content = fbref.get_html_content(SCHEDULE_URL)
+
+    assert content == b"<html>schedule</html>"
+    assert mock_get.call_args.kwargs["headers"] == {"If-Modified-Since": "Mon, 05 May 2025 22:00:00 GMT"}
+    assert html_cache.stats["revalidated"] == 1
+    assert html_cache.get(SCHEDULE_URL)["is_fresh"]
+
+
+def test_get_html_content_skips_request_for_fresh_page(html_cache):
+    html_cache.put(MATCH_URL, FINISHED_MATCH_HTML)
+
+    with patch.object(fbref, "html_cache", html_cache), patch("scrapers.fbref.http_client.get") as mock_get:
+        assert fbref.get_html_content(MATCH_URL) == FINISHED_MATCH_HTML
+
+    mock_get.assert_not_called()
@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+import pytest
+from scrapers.cli import get_status, main
+from scrapers.scraper_constants import ScraperConstants as sc
+
+HEAVY_MODULES = ["pandas", "boto3", "bs4", "selenium", "pyarrow", "lxml"]
+
+
+def get_imported_modules(statement: str, modules: list) -> list:
+    """
+    Runs the import statement in a new interpreter, as the modules are already imported by the test session
+    :return: The modules of the list that were imported
+    """
+    code = f"import sys\n{statement}\nprint([m for m in {modules!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.replace("'", '"'))
+
+
+def test_cli_does_not_import_the_scrapers_dependencies():
+    assert get_imported_modules("import scrapers.cli", HEAVY_MODULES) == []
+
+
+def test_status_command_only_imports_boto3():
+    statement = "import scrapers.cli, utils.ledger_utils, utils.schedule_index_utils, utils.s3_transfer_utils"
+    assert get_imported_modules(statement, ["pandas", "bs4", "selenium", "pyarrow", "lxml"]) == []
+
+
+def test_fbref_imports_parser_and_browser_only_when_used():
+    assert get_imported_modules("import scrapers.fbref", ["bs4", "selenium"]) == []
+
+
+def test_status_summarises_season(s3_client):
+    s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FBREF_RAW_METADATA_FILE_KEY,
+                         Body=json.dumps({"season": 2024, "last_updated": "2025-05-05"}))
+    manifest = {"season": 2024, "parts": [
+        {"key": "a.csv", "rows": 100, "first_date": "2024-08-16", "last_date": "2024-08-18"},
+        {"key": "b.csv", "rows": 40, "first_date": "2025-05-03", "last_date": "2025-05-05"}]}
+    s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025/manifest.json",
+                         Body=json.dumps(manifest))
+
+    status = get_status(s3_client, seasons=[2024, 2023])
+
+    assert status["last_updated"] == {"season": 2024, "last_updated": "2025-05-05"}
+    assert status["seasons"][2024] == {"parts": 2, "rows": 140, "last_date": "2025-05-05",
+                                       "ledger": {"completed": 0, "failed": 0},
+                                       "schedule": {"completed": 0, "scheduled": 0, "pending": 0}}
+    assert status["seasons"][2023]["parts"] == 0
+
+
+def test_unknown_command_is_rejected():
+    with pytest.raises(SystemExit):
+        main(["transfermarkt"])
@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from scrapers.compaction import compact_partitioned_dataset, compact_season, plan_compaction
+from scrapers.fbref import add_scraped_data_to_partitioned_dataset, add_scraped_data_to_season_parts, \
+    get_season_manifest, read_season_data, read_season_part
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.parquet_utils import read_partitioned_parquet_from_s3
+from utils.s3_utils import list_s3_keys, read_json_from_s3
+
+
+class ReadAfterEveryWriteClient:
+    """
+    S3 client that reads the season after every request that changes the bucket, to check what readers would see
+    at every step of a compaction
+    """
+
+    WRITES = {"put_object", "delete_objects", "upload_part", "complete_multipart_upload"}
+
+    def __init__(self, client, season_year: int):
+        self.client = client
+        self.season_year = season_year
+        self.reads = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if name not in self.WRITES:
+            return method
+
+        def write_then_read(*args, **kwargs):
+            response = method(*args, **kwargs)
+            self.reads.append(self.read())
+            return response
+        return write_then_read
+
+    def read(self):
+        return read_season_data(self.client, self.season_year, typed=True)
+
+
+class ReadPartitionedAfterEveryWriteClient(ReadAfterEveryWriteClient):
+    """
+    S3 client that reads the partitioned dataset after every request that changes the bucket
+    """
+
+    def read(self):
+        return read_partitioned_parquet_from_s3(self.client, sc.S3_BUCKET_NAME, sc.FBREF_PARTITIONED_S3_PREFIX)
+
+
+def add_weekly_parts(s3_client, weeks: int = 4):
+    for week in range(weeks):
+        date = (pd.Timestamp("2024-08-16") + pd.Timedelta(weeks=week)).strftime("%Y-%m-%d")
+        scraped_df = pd.DataFrame({"player": ["A", "B"], "date": date, "home_team": f"Home {week}",
+                                   "away_team": f"Away {week}", "minutes": ["90", "45"]})
+        add_scraped_data_to_season_parts(s3_client, 2024, scraped_df, update_metadata=False, upsert=True)
+
+
+def test_small_parts_are_grouped_up_to_the_target_size():
+    parts = [{"key": "raw/fbref_data/2024-2025.csv"}] + [{"key": f"2024-2025/parts/{i}.csv"} for i in range(4)]
+    sizes = {"raw/fbref_data/2024-2025.csv": 10, "2024-2025/parts/0.csv": 40, "2024-2025/parts/1.csv": 40,
+             "2024-2025/parts/2.csv": 40, "2024-2025/parts/3.csv": 200}
+
+    groups = plan_compaction(parts, sizes, target_size_bytes=100)
+
+    # The season csv is never merged, and parts over the target are left as they are
+    assert [[part["key"] for part in group] for group in groups] == [
+        ["2024-2025/parts/0.csv", "2024-2025/parts/1.csv"], ["2024-2025/parts/2.csv"]]
+    assert plan_compaction(parts[:2], sizes, target_size_bytes=100) == []
+
+
+def test_readers_never_see_partial_state_during_compaction(s3_client):
+    add_weekly_parts(s3_client)
+    # A rerun of the first week replaces its rows, so the compaction has to drop them
+    add_scraped_data_to_season_parts(s3_client, 2024, pd.DataFrame(
+        {"player": ["A"], "date": "2024-08-16", "home_team": "Home 0", "away_team": "Away 0", "minutes": ["12"]}),
+        update_metadata=False, upsert=True)
+    expected_df = read_season_data(s3_client, 2024, typed=True)
+    client = ReadAfterEveryWriteClient(s3_client, 2024)
+
+    result = compact_season(client, 2024, grace_seconds=3600)
+
+    assert result["merged"] == 5 and len(result["written"]) == 1 and result["deleted"] == []
+    assert client.reads
+    for season_df in client.reads:
+        # The teams of the merged part are read as one categorical, the teams of the small parts as strings
+        assert_frame_equal(season_df.sort_values(["date", "player"], ignore_index=True),
+                           expected_df.sort_values(["date", "player"], ignore_index=True),
+                           check_dtype=False, check_categorical=False)
+    manifest = get_season_manifest(s3_client, 2024)
+    assert [part["key"] for part in manifest["parts"]] == result["written"]
+    assert manifest["parts"][0]["rows"] - manifest["parts"][0]["replaced_rows"] == len(expected_df)
+    assert read_season_data(s3_client, 2024, typed=True)["minutes"].tolist() == [45, 90, 45, 90, 45, 90, 45, 12]
+
+
+def test_superseded_parts_are_kept_for_the_grace_period(s3_client):
+    add_weekly_parts(s3_client)
+    old_manifest = get_season_manifest(s3_client, 2024)
+
+    compact_season(s3_client, 2024, grace_seconds=3600)
+    # A reader that read the manifest before the swap can still read its parts
+    assert sum(len(read_season_part(s3_client, part["key"])) for part in old_manifest["parts"]) == 8
+
+    result = compact_season(s3_client, 2024, grace_seconds=0)
+
+    assert result["merged"] == 0
+    # Every week is in its own key index shard, so only the shards rewritten by the compaction are deleted with the
+    # parts
+    assert "superseded" not in old_manifest
+    assert sorted(result["deleted"]) == sorted([part["key"] for part in old_manifest["parts"]] +
+                                               list(old_manifest["key_index"]["shards"].values()))
+    manifest = get_season_manifest(s3_client, 2024)
+    assert manifest["superseded"] == []
+    assert list_s3_keys(s3_client, sc.S3_BUCKET_NAME, "raw/fbref_data/2024-2025/parts/") == \
+        [manifest["parts"][0]["key"]]
+    assert list_s3_keys(s3_client, sc.S3_BUCKET_NAME, "raw/fbref_data/2024-2025/key_index/") == \
+        sorted(manifest["key_index"]["shards"].values())
+    assert len(read_season_data(s3_client, 2024)) == 8
+
+
+def test_partition_files_are_merged_and_swapped_into_the_partition_list(s3_client):
+    # Each batch adds a small file to every gameweek partition it touches
+    for week in range(3):
+        add_scraped_data_to_partitioned_dataset(s3_client, 2024, pd.DataFrame(
+            {"player": [f"A{week}", f"B{week}"], "minutes": ["90", "45"], "gameweek": ["1", "2"],
+             "date": ["2024-08-16", "2024-08-24"]}), update_metadata=False)
+    expected_df = read_partitioned_parquet_from_s3(s3_client, sc.S3_BUCKET_NAME, sc.FBREF_PARTITIONED_S3_PREFIX)
+
+    client = ReadPartitionedAfterEveryWriteClient(s3_client, 2024)
+
+    result = compact_partitioned_dataset(client, seasons=[2024], grace_seconds=3600)
+
+    assert result["merged"] == 6 and len(result["written"]) == 2 and result["deleted"] == []
+    # Readers see the small files until the partition list is swapped, then the merged files
+    assert len(client.reads) == 3
+    for read_df in client.reads:
+        assert_frame_equal(read_df.sort_values("player", ignore_index=True),
+                           expected_df.sort_values("player", ignore_index=True), check_categorical=False)
+    partition_list = read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME,
+                                       key="raw/fbref_data/partitioned/_partitions.json")
+    assert [partition["files"] for partition in partition_list["partitions"]] == \
+        [[key.rsplit("/", 1)[1]] for key in result["written"]]
+    assert len(partition_list["superseded"]) == 6
+    season_df = read_partitioned_parquet_from_s3(s3_client, sc.S3_BUCKET_NAME, sc.FBREF_PARTITIONED_S3_PREFIX)
+    assert_frame_equal(season_df.sort_values("player", ignore_index=True),
+                       expected_df.sort_values("player", ignore_index=True), check_categorical=False)
+
+    # The small files are deleted once the grace period is over
+    result = compact_partitioned_dataset(s3_client, seasons=[2024], grace_seconds=0)
+    assert result["merged"] == 0 and len(result["deleted"]) == 6
+    assert len(list_s3_keys(s3_client, sc.S3_BUCKET_NAME, "raw/fbref_data/partitioned/season=2024/")) == 2
@@ -1,12 +1,28 @@
 import pytest
 from unittest.mock import Mock, patch
-from scrapers.fbref import scrape_match_report_data, scrape_data_in_date_range
+from scrapers.fbref import scrape_match_report_data, scrape_data_in_date_range, build_table_index, \
+    get_team_ids_from_table_index, add_scraped_data_to_season_parts, read_season_data, get_season_manifest, \
+    add_scraped_data_to_partitioned_dataset, add_scraped_data_to_season_csv, scrape_data_to_sink, MemorySink, \
+    LocalParquetSink, S3PartsSink, iter_match_batches, scrape_data_to_sink_asyncio, scrape_match_report_async, \
+    PlayerColumnBuilder, scrape_team_player_data, parse_match_report, MatchReportError
+from scrapers.parsers import BeautifulSoupParser, LxmlParser
+from utils.ledger_utils import LocalProgressLedger
+from utils.schedule_index_utils import LocalScheduleIndex
+from utils.rate_limit_utils import AdaptiveHostRateLimiter
+from scrapers.scraper_constants import ScraperConstants as sc
+from botocore.exceptions import ClientError
+import json
+import scrapers.fbref as scrapers_fbref
 import pandas as pd
 from pandas.testing import assert_frame_equal
 import numpy as np
 import pdb
 import os
+import threading
+import asyncio
 from schemas.pandas_schemas import FbRefSchema
+from utils.metrics_utils import metrics
+from utils.s3_utils import list_s3_keys
 
 @pytest.fixture(autouse=True)
 def fast_sleep():
@@ -15,14 +31,14 @@ def fast_sleep():
 
 @pytest.fixture
 def mock_new_vs_for_match_report():
-    """Mock the requests.get response to return sample HTML.
-    response = requests.get(match_url)"""
+    """Mock the http client response to return sample HTML.
+    response = http_client.get(match_url)"""
 
     file_path = "tests/test_files/new_vs_nott_for_22_23.html"
     with open(file_path, "r", encoding="utf-8") as f:
         new_vs_for_html = f.read()
 
-    with patch("requests.get") as mock_get:
+    with patch("scrapers.fbref.http_client.get") as mock_get:
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
@@ -34,13 +50,13 @@ def mock_new_vs_for_match_report():
 @pytest.fixture
 def mock_2024_2025_scores_and_fixtures():
     """
-    Reads the html content from the test files folder and mocks a requests.get to return the scores and fixtures html
+    Reads the html content from the test files folder and mocks the http client to return the scores and fixtures html
     """
     # Read the scores and fixtures html locally
     with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "r") as f:
         scores_and_fixtures_html = f.read()
 
-    with patch("requests.get") as mock_get:
+    with patch("scrapers.fbref.http_client.get") as mock_get:
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.raise_for_status.return_value = None
@@ -54,6 +70,12 @@ def mock_scrape_match_report():
     with patch("scrapers.fbref.scrape_match_report_data", return_value=dummy_df):
         yield
 
+@pytest.fixture
+def shared_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
 def test_scrape_match_report_data(mock_new_vs_for_match_report):
     """
     Testing that the scraper correctly scrapes the data in the Newcastle vs Nottingham Forrest game
@@ -61,7 +83,7 @@ def test_scrape_match_report_data(mock_new_vs_for_match_report):
     fbRefSchema = FbRefSchema()
 
     result_df = scrape_match_report_data("dummy_url")
-    exp_df = pd.read_csv("tests/test_files/new_vs_nott_for_22_23.csv", dtype=fbRefSchema.get_schema())
+    exp_df = pd.read_csv("tests/test_files/new_vs_nott_for_22_23.csv", dtype=fbRefSchema.get_raw_schema())
 
     # Empty cells are read as an empty string, convert these to null
     result_df.replace("", np.nan, inplace=True)
@@ -110,3 +132,668 @@ def test_scraper_updates_last_updated_value_correctly(mock_2024_2025_scores_and_
 
     assert result_last_updated == exp_last_updated
 
+
+@pytest.mark.parametrize("parser", [BeautifulSoupParser(), LxmlParser()], ids=lambda p: p.name)
+def test_table_index_identifies_home_and_away_tables(parser):
+    """
+    The table index should contain all six tabs for both teams, with the home team's tables first
+    """
+    with open("tests/test_files/new_vs_nott_for_22_23.html", "rb") as f:
+        document = parser.parse(f.read())
+
+    table_index = build_table_index(document, parser)
+
+    assert get_team_ids_from_table_index(table_index) == ["b2b47a98", "e4a775cb"]
+    for team_id in ["b2b47a98", "e4a775cb"]:
+        for tab in ["summary", "passing", "passing_types", "defense", "possession", "misc"]:
+            assert f"stats_{team_id}_{tab}" in table_index
+
+
+@pytest.mark.parametrize("file_path", ["tests/test_files/new_vs_nott_for_22_23.html",
+                                       "tests/test_files/scores_and_fixtures_2025_05_06.html"])
+def test_parser_backends_extract_identical_data(file_path):
+    """
+    The lxml backend should extract exactly the same header, stats tables and schedule rows as the reference
+    BeautifulSoup backend
+    """
+    with open(file_path, "rb") as f:
+        html = f.read()
+
+    reference, fast = BeautifulSoupParser(), LxmlParser()
+    reference_document, fast_document = reference.parse(html), fast.parse(html)
+
+    assert fast.get_match_header(fast_document) == reference.get_match_header(reference_document)
+    assert fast.get_stats_tables(fast_document) == reference.get_stats_tables(reference_document)
+    assert fast.get_schedule_rows(fast_document) == reference.get_schedule_rows(reference_document)
+
+
+def test_parser_backends_scrape_identical_match_report(mock_new_vs_for_match_report):
+    """
+    scrape_match_report_data should return the same dataframe for both parser backends
+    """
+    reference_df = scrape_match_report_data("dummy_url", parser=BeautifulSoupParser())
+    fast_df = scrape_match_report_data("dummy_url", parser=LxmlParser())
+
+    assert not reference_df.empty
+    assert_frame_equal(fast_df, reference_df)
+
+
+@pytest.mark.parametrize("parser", [BeautifulSoupParser(), LxmlParser()], ids=lambda p: p.name)
+def test_parser_backends_scrape_identical_schedule(mock_2024_2025_scores_and_fixtures, parser):
+    """
+    Both parser backends should scrape the same watermark columns from the scores and fixtures page
+    """
+    with patch("scrapers.fbref.scrape_match_report_data", side_effect=lambda *args: pd.DataFrame({"player": ["Test"]})):
+        result_df, result_last_updated = scrape_data_in_date_range(season=2025, start_date="2025-05-04",
+                                                                   end_date=None, parser=parser)
+
+    assert result_last_updated == "2025-05-05"
+    assert list(result_df["date"]) == ["2025-05-04", "2025-05-04", "2025-05-04", "2025-05-04", "2025-05-05"]
+    assert list(result_df["home_team"]) == ["Brighton", "West Ham", "Brentford", "Chelsea", "Crystal Palace"]
+    assert list(result_df["gameweek"]) == ["35"] * 5
+
+
+def test_concurrent_scraper_returns_matches_in_fixture_order(mock_2024_2025_scores_and_fixtures):
+    """
+    Match reports are scraped concurrently, so make the earlier fixtures finish last and check that the results and
+    the last_updated value still follow the fixture order
+    """
+    delays = iter([0.3, 0.2, 0.1, 0.0, 0.0])
+
+    def slow_match_report(match_url, parser=None):
+        threading.Event().wait(next(delays))
+        return pd.DataFrame({"player": [match_url]})
+
+    with patch("scrapers.fbref.scrape_match_report_data", side_effect=slow_match_report):
+        result_df, result_last_updated = scrape_data_in_date_range(season=2025, start_date="2025-05-04",
+                                                                   end_date=None, max_workers=5)
+
+    assert result_last_updated == "2025-05-05"
+    assert list(result_df["home_team"]) == ["Brighton", "West Ham", "Brentford", "Chelsea", "Crystal Palace"]
+    assert result_df["player"].is_unique
+
+
+def test_season_parts_are_appended_without_rewriting_season(s3_client):
+    """
+    Each run should upload only its own part and add it to the manifest. The existing season csv is kept as the
+    first part so no data is lost, and the season csv itself is never rewritten
+    """
+    s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025.csv",
+                         Body="player,date\nA,2024-08-16\n")
+    week_1 = pd.DataFrame({"player": ["B", "C"], "date": ["2024-08-24", "2024-08-25"]})
+    week_2 = pd.DataFrame({"player": ["D"], "date": ["2024-08-31"]})
+
+    with patch("scrapers.fbref.save_data_to_s3_bucket_as_csv", wraps=scrapers_fbref.save_data_to_s3_bucket_as_csv) \
+            as mock_save:
+        part_1 = add_scraped_data_to_season_parts(s3_client, 2024, week_1, "2024-08-25", update_metadata=True)
+        part_2 = add_scraped_data_to_season_parts(s3_client, 2024, week_2, "2024-08-31", update_metadata=True)
+
+    # Only the new rows were uploaded
+    assert [len(call.args[1]) for call in mock_save.call_args_list] == [2, 1]
+    assert part_1["rows"] == 2 and part_1["first_date"] == "2024-08-24" and part_1["last_date"] == "2024-08-25"
+
+    manifest = get_season_manifest(s3_client, 2024)
+    assert [part["key"] for part in manifest["parts"]] == ["raw/fbref_data/2024-2025.csv", part_1["key"],
+                                                           part_2["key"]]
+
+    season_df = read_season_data(s3_client, 2024)
+    assert list(season_df["player"]) == ["A", "B", "C", "D"]
+
+    metadata = json.load(s3_client.get_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FBREF_RAW_METADATA_FILE_KEY)["Body"])
+    assert metadata == {"season": 2024, "last_updated": "2024-08-31"}
+
+
+def test_rescraped_rows_replace_earlier_rows_of_the_season(s3_client, shared_metrics):
+    """
+    Re-running an overlapping date range should replace the rows of the matches scraped again, including the rows of
+    a season csv written before the key index, instead of duplicating them
+    """
+    s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025.csv",
+                         Body="player,date,home_team,away_team,minutes\nA,2024-08-16,Arsenal,Wolves,90\n")
+    week_1 = pd.DataFrame({"player": ["B", "C"], "date": ["2024-08-24", "2024-08-24"], "home_team": "Fulham",
+                           "away_team": "Leicester", "minutes": ["90", "90"]})
+    rerun = pd.DataFrame({"player": ["A", "C", "D"], "date": ["2024-08-16", "2024-08-24", "2024-08-31"],
+                          "home_team": ["Arsenal", "Fulham", "Everton"], "away_team": ["Wolves", "Leicester", "Spurs"],
+                          "minutes": ["85", "60", "90"]})
+
+    add_scraped_data_to_season_parts(s3_client, 2024, week_1, update_metadata=False, upsert=True)
+    part = add_scraped_data_to_season_parts(s3_client, 2024, rerun, update_metadata=False, upsert=True)
+    season_df = read_season_data(s3_client, 2024)
+
+    assert part["replaced_rows"] == 2
+    assert list(zip(season_df["player"], season_df["minutes"])) == [("B", 90), ("A", 85), ("C", 60), ("D", 90)]
+    assert shared_metrics.counters["upsert.replaced_rows"] == 2
+    assert shared_metrics.counters["upsert.inserted_rows"] == 3
+
+
+class ConflictOnceClient:
+    """
+    S3 client where the first conditional put of the key fails as if another writer changed it first
+    """
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+        self.conflicts = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def put_object(self, **kwargs):
+        if kwargs["Key"] == self.key and not self.conflicts:
+            self.conflicts += 1
+            raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "Conflict"}}, "PutObject")
+        return self.client.put_object(**kwargs)
+
+
+def test_replaced_key_indexes_are_superseded_and_lost_attempts_deleted(s3_client):
+    week_1 = pd.DataFrame({"player": ["A"], "date": ["2024-08-16"], "home_team": "Arsenal", "away_team": "Wolves"})
+    add_scraped_data_to_season_parts(s3_client, 2024, week_1, update_metadata=False, upsert=True)
+    first_shard = get_season_manifest(s3_client, 2024)["key_index"]["shards"]["2024-08-16"]
+
+    client = ConflictOnceClient(s3_client, "raw/fbref_data/2024-2025/manifest.json")
+    add_scraped_data_to_season_parts(client, 2024, week_1.assign(player="B"), update_metadata=False, upsert=True)
+
+    manifest = get_season_manifest(s3_client, 2024)
+    assert client.conflicts == 1
+    assert [entry["key"] for entry in manifest["superseded"]] == [first_shard]
+    # The shard of the attempt that lost the conflict is deleted, the superseded one is kept for the compaction
+    assert list_s3_keys(s3_client, sc.S3_BUCKET_NAME, "raw/fbref_data/2024-2025/key_index/") == \
+        sorted([first_shard, manifest["key_index"]["shards"]["2024-08-16"]])
+
+
+def test_only_the_key_index_shards_of_the_new_rows_are_read_and_written(s3_client):
+    for date in ["2024-08-16", "2024-08-24", "2024-08-31"]:
+        add_scraped_data_to_season_parts(s3_client, 2024, pd.DataFrame(
+            {"player": ["A", "B"], "date": date, "home_team": "Arsenal", "away_team": "Wolves"}),
+            update_metadata=False, upsert=True)
+    shards = get_season_manifest(s3_client, 2024)["key_index"]["shards"]
+
+    rerun = pd.DataFrame({"player": ["A"], "date": ["2024-08-24"], "home_team": "Arsenal", "away_team": "Wolves"})
+    with patch("scrapers.fbref.read_json_from_s3", wraps=scrapers_fbref.read_json_from_s3) as mock_read, \
+            patch("scrapers.fbref.save_json_to_s3", wraps=scrapers_fbref.save_json_to_s3) as mock_save:
+        part = add_scraped_data_to_season_parts(s3_client, 2024, rerun, update_metadata=False, upsert=True)
+
+    assert part["replaced_rows"] == 1
+    assert [call.kwargs["key"] for call in mock_read.call_args_list] == [shards["2024-08-24"]]
+    assert [call.kwargs["key"].split("/")[-2] for call in mock_save.call_args_list] == ["2024-08-24"]
+    new_shards = get_season_manifest(s3_client, 2024)["key_index"]["shards"]
+    assert {shard_id for shard_id in shards if new_shards[shard_id] != shards[shard_id]} == {"2024-08-24"}
+    assert len(read_season_data(s3_client, 2024)) == 6
+
+
+def test_appended_parts_keep_every_row(s3_client):
+    week_1 = pd.DataFrame({"player": ["A"], "date": ["2024-08-16"], "home_team": "Arsenal", "away_team": "Wolves"})
+
+    add_scraped_data_to_season_parts(s3_client, 2024, week_1, update_metadata=False, upsert=False)
+    add_scraped_data_to_season_parts(s3_client, 2024, week_1, update_metadata=False, upsert=False)
+
+    assert "key_index" not in get_season_manifest(s3_client, 2024)
+    assert len(read_season_data(s3_client, 2024)) == 2
+
+
+def test_season_csv_is_upserted(s3_client):
+    s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025.csv",
+                         Body="player,date,home_team,away_team,minutes\nA,2024-08-16,Arsenal,Wolves,90\n"
+                              "B,2024-08-16,Arsenal,Wolves,90\n")
+    rerun = pd.DataFrame({"player": ["B", "C"], "date": ["2024-08-16", "2024-08-24"], "home_team": "Arsenal",
+                          "away_team": "Wolves", "minutes": ["45", "90"]})
+
+    add_scraped_data_to_season_csv(s3_client, 2024, rerun, update_metadata=False, upsert=True)
+    add_scraped_data_to_season_csv(s3_client, 2024, rerun, update_metadata=False, upsert=True)
+
+    season_df = pd.read_csv(s3_client.get_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025.csv")["Body"])
+    assert list(zip(season_df["player"], season_df["minutes"])) == [("A", 90), ("B", 45), ("C", 90)]
+
+
+def test_season_csv_index_is_rebuilt_after_a_crash(s3_client):
+    """
+    A run that stops after rewriting the season csv but before saving the key index leaves the index of the previous
+    file. The next run should rebuild the index rather than replace the rows at the old row numbers
+    """
+    first_run = pd.DataFrame({"player": ["A", "B", "C"], "date": "2024-08-16", "home_team": "Arsenal",
+                              "away_team": "Wolves", "minutes": ["90", "45", "90"]})
+    add_scraped_data_to_season_csv(s3_client, 2024, first_run, update_metadata=False, upsert=True)
+
+    with patch("scrapers.fbref.save_json_to_s3", side_effect=RuntimeError("Crashed")):
+        with pytest.raises(RuntimeError):
+            add_scraped_data_to_season_csv(s3_client, 2024, first_run[first_run["player"] == "A"].assign(minutes="10"),
+                                           update_metadata=False, upsert=True)
+    add_scraped_data_to_season_csv(s3_client, 2024, first_run[first_run["player"] == "C"].assign(minutes="30"),
+                                   update_metadata=False, upsert=True)
+
+    season_df = pd.read_csv(s3_client.get_object(Bucket=sc.S3_BUCKET_NAME, Key="raw/fbref_data/2024-2025.csv")["Body"])
+    assert list(zip(season_df["player"], season_df["minutes"])) == [("B", 45), ("A", 10), ("C", 30)]
+
+
+def test_empty_scrape_does_not_add_a_part(s3_client):
+    assert add_scraped_data_to_season_parts(s3_client, 2024, pd.DataFrame(), update_metadata=False) is None
+    assert get_season_manifest(s3_client, 2024) == {"season": 2024, "parts": []}
+    assert read_season_data(s3_client, 2024).empty
+
+
+def test_parquet_parts_are_written_with_typed_schema(s3_client):
+    scraped_df = pd.DataFrame({"player": ["B", "C"], "minutes": ["90", ""], "xg": ["0.4", "1.2"],
+                               "date": ["2024-08-24", "2024-08-25"]})
+
+    part = add_scraped_data_to_season_parts(s3_client, 2024, scraped_df, "2024-08-25", update_metadata=False,
+                                            output_format="parquet", compression="zstd")
+    season_df = read_season_data(s3_client, 2024)
+
+    assert part["key"].endswith(".parquet")
+    assert str(season_df["minutes"].dtype) == "Int16"
+    assert season_df["minutes"].isna().tolist() == [False, True]
+    assert season_df["date"].tolist() == [pd.Timestamp("2024-08-24"), pd.Timestamp("2024-08-25")]
+
+
+def test_partitioned_dataset_is_written_by_gameweek(s3_client):
+    scraped_df = pd.DataFrame({"player": ["A", "B", "C"], "minutes": ["90", "45", "12"],
+                               "gameweek": ["1", "1", "2"], "date": ["2024-08-16", "2024-08-17", "2024-08-24"]})
+
+    keys = add_scraped_data_to_partitioned_dataset(s3_client, 2024, scraped_df, "2024-08-24", update_metadata=False)
+
+    assert [key.rsplit("/", 1)[0] for key in keys] == ["raw/fbref_data/partitioned/season=2024/gameweek=01",
+                                                       "raw/fbref_data/partitioned/season=2024/gameweek=02"]
+    partition_list = json.load(s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                                    Key="raw/fbref_data/partitioned/_partitions.json")["Body"])
+    assert [partition["path"] for partition in partition_list["partitions"]] == ["season=2024/gameweek=01",
+                                                                                 "season=2024/gameweek=02"]
+
+
+def test_partition_list_is_merged_without_listing_the_dataset(s3_client):
+    scraped_df = pd.DataFrame({"player": ["A", "B"], "minutes": ["90", "45"], "gameweek": ["1", "2"],
+                               "date": ["2024-08-16", "2024-08-24"]})
+    first_keys = add_scraped_data_to_partitioned_dataset(s3_client, 2024, scraped_df, update_metadata=False)
+
+    with patch("utils.parquet_utils.list_s3_keys") as mock_list:
+        second_keys = add_scraped_data_to_partitioned_dataset(s3_client, 2024, scraped_df.head(1),
+                                                              update_metadata=False)
+
+    mock_list.assert_not_called()
+    partition_list = json.load(s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                                    Key="raw/fbref_data/partitioned/_partitions.json")["Body"])
+    assert [partition["files"] for partition in partition_list["partitions"]] == [
+        sorted([first_keys[0].rsplit("/", 1)[1], second_keys[0].rsplit("/", 1)[1]]), [first_keys[1].rsplit("/", 1)[1]]]
+
+
+def test_pipeline_writes_batches_to_sink_in_fixture_order(mock_2024_2025_scores_and_fixtures):
+    with patch("scrapers.fbref.scrape_match_report_data",
+               side_effect=lambda match_url, parser=None: pd.DataFrame({"player": [match_url]})):
+        sink = MemorySink()
+        last_date = scrape_data_to_sink(2025, sink, start_date="2025-05-04", max_workers=2, batch_size=2)
+
+    assert last_date == "2025-05-05"
+    assert [len(batch) for batch in sink.batches] == [2, 2, 1]
+    assert list(sink.to_dataframe()["home_team"]) == ["Brighton", "West Ham", "Brentford", "Chelsea",
+                                                      "Crystal Palace"]
+
+
+def test_pipeline_keeps_written_batches_after_a_crash(mock_2024_2025_scores_and_fixtures, tmp_path):
+    """
+    Batches are written as they are scraped, so a crash part way through the range keeps the earlier batches
+    """
+    def crashing_match_report(match_url, parser=None):
+        if "Crystal-Palace" in match_url:
+            raise KeyboardInterrupt()
+        return pd.DataFrame({"player": [match_url], "minutes": ["90"]})
+
+    sink = LocalParquetSink(str(tmp_path))
+    with patch("scrapers.fbref.scrape_match_report_data", side_effect=crashing_match_report):
+        with pytest.raises(KeyboardInterrupt):
+            scrape_data_to_sink(2025, sink, start_date="2025-05-04", max_workers=1, batch_size=2)
+
+    written_df = pd.concat(pd.read_parquet(path) for path in sorted(sink.paths))
+    assert sorted(written_df["home_team"]) == ["Brentford", "Brighton", "Chelsea", "West Ham"]
+    assert str(written_df["minutes"].dtype) == "Int16"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_s3_parts_sink_updates_metadata_after_each_batch(mock_2024_2025_scores_and_fixtures, s3_client):
+    with patch("scrapers.fbref.scrape_match_report_data",
+               side_effect=lambda match_url, parser=None: pd.DataFrame({"player": [match_url]})):
+        sink = S3PartsSink(s3_client, 2024, update_metadata=True)
+        with patch("scrapers.fbref.set_last_updated_data", wraps=scrapers_fbref.set_last_updated_data) as mock_set:
+            scrape_data_to_sink(2025, sink, start_date="2025-05-04", batch_size=3)
+
+    assert [part["rows"] for part in sink.parts] == [3, 2]
+    assert [call.args[2] for call in mock_set.call_args_list] == ["2025-05-04", "2025-05-05"]
+    assert len(read_season_data(s3_client, 2024)) == 5
+
+
+def test_malformed_match_report_raises_instead_of_returning_no_rows():
+    with pytest.raises(MatchReportError):
+        parse_match_report(b"<html><body>Access denied</body></html>", LxmlParser())
+    with pytest.raises(MatchReportError):
+        parse_match_report(None)
+
+
+def test_restarted_scrape_skips_completed_and_retries_failed(tmp_path):
+    """
+    The first run is blocked (403) on one match report and selenium only gets an access denied page, so the match is
+    marked as failed rather than completed with no rows. The second run should only scrape that match, even though
+    it is before the start date of the second run
+    """
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        schedule_html = f.read()
+    with open("tests/test_files/new_vs_nott_for_22_23.html", "rb") as f:
+        match_html = f.read()
+
+    def get(url, headers=None):
+        requested_urls.append(url)
+        if "/schedule/" in url:
+            return Mock(status_code=200, headers={}, content=schedule_html)
+        if "West-Ham" in url and blocked:
+            return Mock(status_code=403, headers={}, content=b"Forbidden")
+        return Mock(status_code=200, headers={}, content=match_html)
+
+    requested_urls = []
+    blocked = True
+    with patch("scrapers.fbref.http_client.get", side_effect=get), \
+            patch.object(scrapers_fbref, "rate_limiter", AdaptiveHostRateLimiter(requests_per_minute=60000)), \
+            patch.object(scrapers_fbref.driver_pool, "get_page_source",
+                         return_value="<html><body>Access denied</body></html>"):
+        first_sink = MemorySink()
+        scrape_data_to_sink(2025, first_sink, start_date="2025-05-04", batch_size=2,
+                            ledger=LocalProgressLedger(str(tmp_path), 2025))
+
+        ledger = LocalProgressLedger(str(tmp_path), 2025)
+        assert ledger.get_summary() == {"completed": 4, "failed": 1}
+        assert "West-Ham" in ledger.get_urls("failed")[0]
+        assert "West Ham" not in set(first_sink.to_dataframe()["home_team"])
+
+        requested_urls.clear()
+        blocked = False
+        second_sink = MemorySink()
+        scrape_data_to_sink(2025, second_sink, start_date="2025-05-05", ledger=ledger)
+
+    match_urls = [url for url in requested_urls if "/schedule/" not in url]
+    assert len(match_urls) == 1 and "West-Ham" in match_urls[0]
+    assert set(second_sink.to_dataframe()["home_team"]) == {"West Ham"}
+    assert LocalProgressLedger(str(tmp_path), 2025).get_summary() == {"completed": 5, "failed": 0}
+
+
+def test_date_range_scrape_leaves_completed_matches_to_be_saved_by_the_caller(tmp_path):
+    """
+    The csv write mode writes the season file after the whole date range is scraped, so the matches are only saved as
+    completed by the caller, and a match that used up its attempts is skipped
+    """
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        schedule_html = f.read()
+    with open("tests/test_files/new_vs_nott_for_22_23.html", "rb") as f:
+        match_html = f.read()
+
+    def get(url, headers=None):
+        requested_urls.append(url)
+        if "/schedule/" in url:
+            return Mock(status_code=200, headers={}, content=schedule_html)
+        if "West-Ham" in url:
+            return Mock(status_code=403, headers={}, content=b"Forbidden")
+        return Mock(status_code=200, headers={}, content=match_html)
+
+    requested_urls = []
+    with patch("scrapers.fbref.http_client.get", side_effect=get), \
+            patch.object(scrapers_fbref, "rate_limiter", AdaptiveHostRateLimiter(requests_per_minute=60000)), \
+            patch.object(scrapers_fbref.driver_pool, "get_page_source",
+                         return_value="<html><body>Access denied</body></html>"):
+        ledger = LocalProgressLedger(str(tmp_path), 2025, max_attempts=1)
+        season_df, _ = scrape_data_in_date_range(2025, start_date="2025-05-04", ledger=ledger)
+
+        # Only the failure was saved while scraping
+        assert LocalProgressLedger(str(tmp_path), 2025).get_summary() == {"completed": 0, "failed": 1}
+        ledger.save()
+        assert LocalProgressLedger(str(tmp_path), 2025).get_summary() == {"completed": 4, "failed": 1}
+
+        requested_urls.clear()
+        rerun_df, _ = scrape_data_in_date_range(2025, start_date="2025-05-04",
+                                                ledger=LocalProgressLedger(str(tmp_path), 2025, max_attempts=1))
+
+    assert not season_df.empty and rerun_df.empty
+    assert all("/schedule/" in url for url in requested_urls)
+
+
+def test_configured_rate_is_never_raised_above_the_share_of_the_budget():
+    with patch.object(scrapers_fbref, "rate_limiter"), patch.object(scrapers_fbref, "http_client"):
+        scrapers_fbref.configure_fetching(requests_per_minute=5, pool_size=2)
+
+        assert scrapers_fbref.rate_limiter.requests_per_minute == 5
+        assert scrapers_fbref.rate_limiter.max_requests_per_minute == 5
+
+
+def test_parser_processes_return_the_same_data_as_parsing_in_threads(mock_new_vs_for_match_report):
+    """
+    In the two stage mode only the html is sent to the parser processes and only the records come back
+    """
+    row = {"th": {"gameweek": "1"}, "td": {"date": "2023-01-01", "home_team": "Newcastle Utd"}}
+    match_tasks = [(row, f"https://fbref.com/en/matches/{match}", "2023-01-01") for match in range(2)]
+
+    thread_batches = list(iter_match_batches(match_tasks, parse_workers=0))
+    process_batches = list(iter_match_batches(match_tasks, parse_workers=2))
+
+    assert [batch[2] for batch in process_batches] == [batch[2] for batch in thread_batches]
+    assert_frame_equal(process_batches[0][0], thread_batches[0][0])
+    assert len(process_batches[0][0]) == 2 * len(scrape_match_report_data("dummy_url"))
+
+
+def test_players_with_the_same_name_are_kept_as_separate_rows():
+    table_index = {
+        "stats_abc123_summary": [[("player", "Danilo"), ("minutes", "90")], [],
+                                 [("player", "Danilo"), ("minutes", "12")]],
+        "stats_abc123_passing": [[("player", "Danilo"), ("passes", "40"), ("minutes", "90")],
+                                 [("player", "Danilo"), ("passes", "3"), ("minutes", "12")]],
+    }
+
+    df = scrape_team_player_data(None, "Team", "home", table_index=table_index)
+
+    assert df.to_dict("records") == [{"player": "Danilo", "minutes": "90", "passes": "40"},
+                                     {"player": "Danilo", "minutes": "12", "passes": "3"}]
+
+
+def test_player_column_builder_matches_rows_by_name_when_the_order_differs():
+    builder = PlayerColumnBuilder(["player", "minutes", "passes"], size=2)
+    builder.add_table([[("player", "A"), ("minutes", "90")], [("player", "B"), ("minutes", "")]])
+    builder.add_table([[("player", "B"), ("minutes", "45"), ("passes", "7")],
+                       [("player", "A"), ("passes", "30")], [("player", "C"), ("new_stat", "1")]])
+
+    df = builder.to_dataframe()
+
+    assert list(df.columns) == ["player", "minutes", "passes", "new_stat"]
+    assert df.fillna("").to_dict("list") == {"player": ["A", "B", "C"], "minutes": ["90", "45", ""],
+                                             "passes": ["30", "7", ""], "new_stat": ["", "", "1"]}
+
+
+def test_throttled_request_is_retried_after_backoff_instead_of_selenium():
+    """
+    A 429 should slow the rate limiter down and the page should be requested again after its Retry-After, without
+    launching selenium
+    """
+    limiter = AdaptiveHostRateLimiter(requests_per_minute=10)
+    throttled = Mock(status_code=429, headers={"Retry-After": "20"})
+    ok = Mock(status_code=200, headers={}, content=b"<html>match</html>")
+
+    with patch.object(scrapers_fbref, "rate_limiter", limiter), \
+            patch("scrapers.fbref.http_client.get", side_effect=[throttled, ok]), \
+            patch.object(scrapers_fbref.driver_pool, "get_page_source") as mock_selenium:
+        assert scrapers_fbref.get_html_content("https://fbref.com/en/matches/1") == b"<html>match</html>"
+
+    mock_selenium.assert_not_called()
+    assert limiter.get_host_state("fbref.com")["requests_per_minute"] == 5.5
+
+
+def test_scheduled_runs_only_scrape_matches_pending_in_schedule_index(mock_2024_2025_scores_and_fixtures, tmp_path):
+    """
+    The first run seeds the index from the start date and scrapes the matches after it. A second run with the same
+    schedule has nothing to scrape, even with an earlier start date, and a failed match stays pending
+    """
+    def flaky_match_report(match_url, parser=None):
+        scraped_urls.append(match_url)
+        if "West-Ham" in match_url and first_run:
+            raise ValueError("Could not find tables")
+        return pd.DataFrame({"player": [match_url]})
+
+    scraped_urls = []
+    first_run = True
+    with patch("scrapers.fbref.scrape_match_report_data", side_effect=flaky_match_report):
+        scrape_data_to_sink(2025, MemorySink(), start_date="2025-05-04",
+                            ledger=LocalProgressLedger(str(tmp_path), 2025),
+                            schedule_index=LocalScheduleIndex(str(tmp_path), 2025))
+        assert len(scraped_urls) == 5
+        assert [entry["match_url"] for entry in LocalScheduleIndex(str(tmp_path), 2025).get_pending()] == \
+               [url for url in scraped_urls if "West-Ham" in url]
+
+        scraped_urls.clear()
+        first_run = False
+        second_sink = MemorySink()
+        scrape_data_to_sink(2025, second_sink, start_date="2024-08-01",
+                            ledger=LocalProgressLedger(str(tmp_path), 2025),
+                            schedule_index=LocalScheduleIndex(str(tmp_path), 2025))
+
+    assert len(scraped_urls) == 1 and "West-Ham" in scraped_urls[0]
+    assert list(second_sink.to_dataframe()["home_team"]) == ["West Ham"]
+    assert LocalScheduleIndex(str(tmp_path), 2025).get_pending() == []
+
+
+class FakeAsyncClient:
+    """
+    Stands in for the AsyncHttpClient, serving the page returned by get_page(url)
+    """
+
+    def __init__(self, get_page):
+        self.get_page = get_page
+        self.urls = []
+
+    async def get(self, url, headers=None):
+        self.urls.append(url)
+        return Mock(status_code=200, headers={}, content=self.get_page(url))
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def schedule_client():
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        scores_and_fixtures_html = f.read()
+    # The requests are not spaced out by the rate limiter
+    with patch.object(scrapers_fbref, "rate_limiter", AdaptiveHostRateLimiter(requests_per_minute=60000, burst=100)):
+        yield FakeAsyncClient(lambda url: scores_and_fixtures_html)
+
+
+def test_async_match_report_is_parsed_like_the_sync_one(mock_new_vs_for_match_report):
+    html = mock_new_vs_for_match_report.return_value.content
+    with patch.object(scrapers_fbref, "rate_limiter", AdaptiveHostRateLimiter(requests_per_minute=60000)):
+        async_df = asyncio.run(scrape_match_report_async("https://fbref.com/en/matches/1",
+                                                         FakeAsyncClient(lambda url: html), LxmlParser()))
+
+    assert not async_df.empty
+    assert_frame_equal(async_df, scrape_match_report_data("https://fbref.com/en/matches/1", parser=LxmlParser()))
+
+
+def test_async_pipeline_writes_batches_in_fixture_order(schedule_client):
+    """
+    Make the earlier fixtures finish last, the batches and the last date should still follow the fixture order
+    """
+    delays = iter([0.3, 0.2, 0.1, 0.0, 0.0])
+
+    async def slow_match_report(match_url, client, parser, parse_pool=None):
+        await asyncio.sleep(next(delays))
+        return pd.DataFrame({"player": [match_url]})
+
+    sink = MemorySink()
+    with patch("scrapers.fbref.scrape_match_report_async", new=slow_match_report):
+        last_date = scrape_data_to_sink_asyncio(2025, sink, start_date="2025-05-04", max_workers=5, batch_size=2,
+                                                client=schedule_client)
+
+    assert last_date == "2025-05-05"
+    assert [len(batch) for batch in sink.batches] == [2, 2, 1]
+    assert list(sink.to_dataframe()["home_team"]) == ["Brighton", "West Ham", "Brentford", "Chelsea",
+                                                      "Crystal Palace"]
+
+
+def test_async_pipeline_carries_on_after_a_failed_match(schedule_client, tmp_path):
+    async def flaky_match_report(match_url, client, parser, parse_pool=None):
+        if "West-Ham" in match_url:
+            raise ValueError("Could not find tables")
+        return pd.DataFrame({"player": [match_url]})
+
+    sink = MemorySink()
+    with patch("scrapers.fbref.scrape_match_report_async", new=flaky_match_report):
+        scrape_data_to_sink_asyncio(2025, sink, start_date="2025-05-04", batch_size=2, client=schedule_client,
+                                    ledger=LocalProgressLedger(str(tmp_path), 2025))
+
+    assert list(sink.to_dataframe()["home_team"]) == ["Brighton", "Brentford", "Chelsea", "Crystal Palace"]
+    ledger = LocalProgressLedger(str(tmp_path), 2025)
+    assert ledger.get_summary() == {"completed": 4, "failed": 1}
+    assert "West-Ham" in ledger.get_urls("failed")[0]
+
+
+def test_async_pipeline_cancels_match_reports_when_a_write_fails(schedule_client, tmp_path):
+    """
+    A failed write stops the run straight away, the match reports in flight are cancelled and only the batch that
+    was written is marked as completed
+    """
+    cancelled = []
+
+    async def slow_match_report(match_url, client, parser, parse_pool=None):
+        try:
+            # Only the first two matches finish
+            await asyncio.sleep(0 if "Brighton" in match_url or "West-Ham" in match_url else 10)
+        except asyncio.CancelledError:
+            cancelled.append(match_url)
+            raise
+        return pd.DataFrame({"player": [match_url]})
+
+    class FailingSink(MemorySink):
+        def write(self, batch_df, last_date):
+            if self.batches:
+                raise OSError("disk full")
+            super().write(batch_df, last_date)
+
+    sink = FailingSink()
+    with patch("scrapers.fbref.scrape_match_report_async", new=slow_match_report):
+        with pytest.raises(OSError):
+            scrape_data_to_sink_asyncio(2025, sink, start_date="2025-05-04", max_workers=5, batch_size=1,
+                                        client=schedule_client, ledger=LocalProgressLedger(str(tmp_path), 2025))
+
+    assert len(cancelled) == 3
+    assert list(sink.to_dataframe()["home_team"]) == ["Brighton"]
+    assert LocalProgressLedger(str(tmp_path), 2025).get_summary() == {"completed": 1, "failed": 0}
+
+
+def test_async_pipeline_marks_blocked_match_reports_as_failed_with_httpx(tmp_path):
+    """
+    Runs the asyncio mode on the httpx.AsyncClient with a mock transport: fbref throttles (429) the first Chelsea
+    request, which is retried after the backoff, and blocks (403) West Ham, where selenium only gets an access denied
+    page. West Ham is marked as failed and the run carries on
+    """
+    httpx = pytest.importorskip("httpx")
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        schedule_html = f.read()
+    with open("tests/test_files/new_vs_nott_for_22_23.html", "rb") as f:
+        match_html = f.read()
+    requested_urls = []
+
+    def handle(request):
+        url = str(request.url)
+        requested_urls.append(url)
+        if "/schedule/" in url:
+            return httpx.Response(200, content=schedule_html)
+        if "West-Ham" in url:
+            return httpx.Response(403, content=b"Forbidden")
+        if "Chelsea" in url and len([u for u in requested_urls if "Chelsea" in u]) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, content=match_html)
+
+    rate_limiter = AdaptiveHostRateLimiter(requests_per_minute=60000, min_requests_per_minute=60000)
+    with patch.object(httpx, "AsyncHTTPTransport", return_value=httpx.MockTransport(handle)), \
+            patch.object(scrapers_fbref, "rate_limiter", rate_limiter), \
+            patch.object(scrapers_fbref.driver_pool, "get_page_source",
+                         return_value="<html><body>Access denied</body></html>"):
+        sink = MemorySink()
+        scrape_data_to_sink_asyncio(2025, sink, start_date="2025-05-04", batch_size=2,
+                                    ledger=LocalProgressLedger(str(tmp_path), 2025))
+
+    assert len([url for url in requested_urls if "Chelsea" in url]) == 2
+    assert set(sink.to_dataframe()["home_team"]) == {"Brighton", "Brentford", "Chelsea", "Crystal Palace"}
+    ledger = LocalProgressLedger(str(tmp_path), 2025)
+    assert ledger.get_summary() == {"completed": 4, "failed": 1}
+    assert "West-Ham" in ledger.get_urls("failed")[0]
@@ -0,0 +1,86 @@
+import importlib.util
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import pytest
+import requests
+from scrapers.scraper_constants import ScraperConstants as sc
+
+# The script name has a hyphen, so it is loaded from its path
+spec = importlib.util.spec_from_file_location(
+    "football_data", Path(__file__).resolve().parents[1] / "scrapers" / "football-data.py")
+football_data = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(football_data)
+
+
+def mock_session(failing_seasons=()):
+    """
+    Session whose get returns a csv for the season in the url, or a 404 for the failing seasons
+    """
+    def get(url, timeout=None):
+        season = url.split("/")[-2]
+        response = MagicMock()
+        response.content = f"Div,HomeTeam,AwayTeam\nE0,{season},Team\n".encode("utf-8")
+        if season in failing_seasons:
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Client Error")
+        return response
+
+    session = MagicMock()
+    session.get.side_effect = get
+    return session
+
+
+def test_get_seasons_in_range():
+    assert football_data.get_seasons_in_range("9798", "0102") == ["9798", "9899", "9900", "0001"]
+
+
+def test_only_missing_seasons_are_downloaded(s3_client):
+    for season in ["2021", "2122"]:
+        s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season),
+                             Body=b"existing")
+    session = mock_session()
+
+    results = football_data.download_football_data_in_range(s3_client, "1920", "2324", session=session)
+
+    assert [(result["season"], result["status"]) for result in results] == [
+        ("1920", "uploaded"), ("2021", "skipped"), ("2122", "skipped"), ("2223", "uploaded")]
+    assert sorted(call.args[0] for call in session.get.call_args_list) == [
+        sc.FOOTBALL_DATA_URL.format(season="1920"), sc.FOOTBALL_DATA_URL.format(season="2223")]
+
+    body = s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season="2223"))["Body"].read()
+    assert body == b"Div,HomeTeam,AwayTeam\nE0,2223,Team\n"
+    existing = s3_client.get_object(Bucket=sc.S3_BUCKET_NAME,
+                                    Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season="2021"))["Body"].read()
+    assert existing == b"existing"
+
+
+def test_no_downloads_when_nothing_is_missing(s3_client):
+    for season in ["2122", "2223"]:
+        s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season),
+                             Body=b"existing")
+    session = mock_session()
+
+    results = football_data.download_football_data_in_range(s3_client, "2122", "2324", session=session)
+
+    assert all(result["status"] == "skipped" for result in results)
+    session.get.assert_not_called()
+
+
+def test_failed_download_is_reported(s3_client):
+    results = football_data.download_football_data_in_range(s3_client, "2122", "2324",
+                                                            session=mock_session(failing_seasons=["2122"]))
+
+    assert results[0]["status"] == "failed"
+    assert "404" in results[0]["error"]
+    assert results[1]["status"] == "uploaded"
+
+
+def test_single_download_closes_its_client(s3_client):
+    session = mock_session()
+    session.__enter__.return_value = session
+
+    with patch.object(football_data, "create_http_client", return_value=session):
+        result = football_data.upload_football_data_season("2324", s3_client)
+
+    assert result["status"] == "uploaded"
+    session.__exit__.assert_called_once()
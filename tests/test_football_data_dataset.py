@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scrapers.football_data_dataset import build_football_data_dataset, get_season_start_year, \
+    list_football_data_seasons, read_football_data_dataset
+from scrapers.scraper_constants import ScraperConstants as sc
+
+# The season files change over the years: latin-1 and 2 digit years in the 90s, trailing commas and empty rows in
+# the 2000s, and a byte order mark, kick off times and Max/Avg odds in recent seasons
+SEASON_FILES = {
+    "9394": "Div,Date,HomeTeam,AwayTeam,FTHG,FTAG,FTR,Referee\n"
+            "E0,14/08/93,Arsenal,Coventry,0,3,A,\n"
+            "E0,14/08/93,Nott'm Forest,Sheffield Weds,1,1,D,K Martín\n".encode("latin-1"),
+    "0203": b"Div,Date,HT,AT,FTHG,FTAG,FTR,HS,AS,B365H,B365D,B365A,BbMxH,BbAHh\n"
+            b"E0,17/08/02,Blackburn,Sunderland,0,0,D,15,7,1.66,3.4,5,1.75,-0.75,,,\n"
+            b",,,,,,,,,,,,,\n",
+    "2425": "﻿Div,Date,Time,HomeTeam,AwayTeam,FTHG,FTAG,FTR,Referee,HS,AS,B365H,MaxH,AvgH,P>2.5,PSCH\n"
+            "E0,16/08/2024,20:00,Man United,Fulham,1,0,H,R Jones,14,10,1.6,1.65,1.6,1.7,1.62\n".encode("utf-8"),
+}
+
+
+@pytest.fixture
+def s3_client(s3_client):
+    """
+    The mocked bucket with the raw season files
+    """
+    for season, data in SEASON_FILES.items():
+        s3_client.put_object(Bucket=sc.S3_BUCKET_NAME, Key=sc.FOOTBALL_DATA_S3_FILE_KEY.format(season=season),
+                             Body=data)
+    return s3_client
+
+
+def test_get_season_start_year():
+    assert [get_season_start_year(season) for season in ["9394", "9900", "0001", "2425"]] == [1993, 1999, 2000, 2024]
+
+
+def test_seasons_are_built_into_one_typed_dataset(s3_client):
+    result = build_football_data_dataset(s3_client)
+    dataset_df = read_football_data_dataset(s3_client)
+
+    assert list_football_data_seasons(s3_client) == ["9394", "0203", "2425"]
+    assert result["seasons"] == 3 and result["rows"] == 4 and result["failed"] == {}
+    assert [key.rsplit("/", 2)[1] for key in result["files"]] == ["season=1993", "season=2002", "season=2024"]
+    assert dataset_df["season"].tolist() == [1993, 1993, 2002, 2024]
+    assert dataset_df["date"].tolist() == [pd.Timestamp("1993-08-14"), pd.Timestamp("1993-08-14"),
+                                           pd.Timestamp("2002-08-17"), pd.Timestamp("2024-08-16")]
+    assert dataset_df["home_team"].tolist() == ["Arsenal", "Nott'm Forest", "Blackburn", "Man United"]
+    assert dataset_df["home_team"].dtype == "category"
+    assert dataset_df["referee"].isna().tolist()[:2] == [True, False] and dataset_df["referee"][1] == "K Martín"
+    assert str(dataset_df["full_time_home_goals"].dtype) == "Int16"
+    assert dataset_df["home_shots"].isna().tolist() == [True, True, False, False]
+    # BbMxH and MaxH are the same column family
+    assert dataset_df["odds_max_home"].dtype == np.float32
+    assert dataset_df["odds_max_home"].tolist()[2:] == [np.float32(1.75), np.float32(1.65)]
+    assert dataset_df["asian_handicap_line"].tolist()[2] == -0.75
+    assert dataset_df["odds_ps_over_2_5"].tolist()[3] == np.float32(1.7)
+    assert dataset_df["closing_odds_ps_home"].tolist()[3] == np.float32(1.62)
+    assert list(read_football_data_dataset(s3_client, seasons=[2002])["home_team"]) == ["Blackburn"]
+
+
+def test_failed_season_does_not_stop_the_build(s3_client, tmp_path):
+    result = build_football_data_dataset(s3_client, seasons=["9394", "9495"], output_dir=str(tmp_path))
+
+    assert result["seasons"] == 1 and list(result["failed"]) == ["9495"]
+    assert read_football_data_dataset(directory=str(tmp_path))["season"].tolist() == [1993, 1993]
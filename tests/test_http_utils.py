@@ -0,0 +1,155 @@
+import asyncio
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+from utils.http_utils import HttpClient, AsyncHttpClient, HTTP_ERRORS
+
+PAGE = b"<html>" + b"<td data-stat='player'>Player</td>" * 500 + b"</html>"
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Serves PAGE over keep-alive connections, gzipped if the client accepts it. /flaky answers 502 the first time and
+    /slow stalls before answering
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append({"path": self.path, "port": self.client_address[1],
+                                     "accept_encoding": self.headers.get("Accept-Encoding", "")})
+        if self.path == "/flaky" and len([r for r in self.server.requests if r["path"] == "/flaky"]) == 1:
+            self.send_response(502)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            time.sleep(0.5)
+
+        body = PAGE
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(PAGE)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_the_pooled_connection(server):
+    with HttpClient(pool_size=2) as client:
+        responses = [client.get(f"{server.url}/page/{i}") for i in range(3)]
+
+    assert [response.status_code for response in responses] == [200] * 3
+    assert len({request["port"] for request in server.requests}) == 1
+
+
+def test_compressed_responses_are_decoded(server):
+    with HttpClient() as client:
+        response = client.get(f"{server.url}/page")
+
+    assert "gzip" in server.requests[0]["accept_encoding"]
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content == PAGE
+
+
+def test_server_errors_are_retried(server):
+    with HttpClient(backoff_factor=0) as client:
+        response = client.get(f"{server.url}/flaky")
+
+    assert response.status_code == 200
+    assert [request["path"] for request in server.requests] == ["/flaky", "/flaky"]
+
+
+def test_stalled_response_times_out(server):
+    with HttpClient(read_timeout=0.1, max_retries=0) as client:
+        with pytest.raises(HTTP_ERRORS):
+            client.get(f"{server.url}/slow")
+
+
+def test_http2_client_fetches_pages(server):
+    pytest.importorskip("h2")
+    # Plain http is served over HTTP/1.1, HTTP/2 is negotiated over TLS
+    with HttpClient(http2=True) as client:
+        response = client.get(f"{server.url}/page")
+
+    assert response.status_code == 200
+    assert response.content == PAGE
+
+
+def test_async_client_fetches_pages_concurrently(server):
+    async def fetch_pages():
+        async with AsyncHttpClient(pool_size=3, backoff_factor=0) as client:
+            return await asyncio.gather(*(client.get(f"{server.url}/page/{i}") for i in range(3)),
+                                        client.get(f"{server.url}/flaky"))
+
+    responses = asyncio.run(fetch_pages())
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all(response.content == PAGE for response in responses)
+    assert len([request for request in server.requests if request["path"] == "/flaky"]) == 2
+
+
+def create_mock_async_client(handle, **kwargs) -> AsyncHttpClient:
+    """
+    AsyncHttpClient on the httpx.AsyncClient path, with its transport answering every request with handle(request)
+    """
+    import httpx
+    with patch.object(httpx, "AsyncHTTPTransport", return_value=httpx.MockTransport(handle)):
+        return AsyncHttpClient(backoff_factor=0, **kwargs)
+
+
+def test_httpx_async_client_retries_server_errors():
+    httpx = pytest.importorskip("httpx")
+    statuses = iter([502, 500, 200])
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(next(statuses), content=PAGE)
+
+    async def fetch_page():
+        async with create_mock_async_client(handle) as client:
+            return await client.get("https://fbref.com/page")
+
+    response = asyncio.run(fetch_page())
+
+    assert response.status_code == 200 and response.content == PAGE
+    assert len(requests) == 3
+    assert "gzip" in requests[0].headers["Accept-Encoding"]
+
+
+def test_httpx_async_client_returns_the_error_when_retries_run_out():
+    httpx = pytest.importorskip("httpx")
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(429 if request.url.path == "/throttled" else 504)
+
+    async def fetch_pages():
+        async with create_mock_async_client(handle, max_retries=2) as client:
+            return await client.get("https://fbref.com/throttled"), await client.get("https://fbref.com/down")
+
+    throttled, down = asyncio.run(fetch_pages())
+
+    # A 429 is returned straight away for the rate limiter to back off, server errors are retried max_retries times
+    assert (throttled.status_code, down.status_code) == (429, 504)
+    assert [request.url.path for request in requests] == ["/throttled"] + ["/down"] * 3
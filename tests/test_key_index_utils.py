@@ -0,0 +1,63 @@
+import io
+import pandas as pd
+from schemas.pandas_schemas import FbRefSchema
+from utils.key_index_utils import KeyIndex, hash_keys, upsert_dataframe
+
+KEY_COLUMNS = ["date", "home_team", "away_team", "player"]
+
+
+def match_rows(players: list, date="2024-08-16", **columns) -> pd.DataFrame:
+    return pd.DataFrame({"player": players, "date": date, "home_team": "Arsenal", "away_team": "Wolves",
+                         **columns})
+
+
+def test_hashes_match_for_scraped_csv_and_typed_rows():
+    scraped_df = match_rows(["Saka", "Rice"], minutes=["90", "85"])
+    csv_df = pd.read_csv(io.StringIO(scraped_df.to_csv(index=False)))
+    typed_df = FbRefSchema().coerce(scraped_df)
+
+    assert hash_keys(csv_df, KEY_COLUMNS) == hash_keys(scraped_df, KEY_COLUMNS)
+    assert hash_keys(typed_df, KEY_COLUMNS) == hash_keys(scraped_df, KEY_COLUMNS)
+
+
+def test_players_with_the_same_name_have_different_keys():
+    hashes = hash_keys(match_rows(["Danilo", "Danilo", "Saka"]), KEY_COLUMNS)
+
+    assert len(set(hashes)) == 3
+    # The second Danilo keeps his key when the match is scraped again
+    assert hash_keys(match_rows(["Danilo", "Danilo"]), KEY_COLUMNS) == hashes[:2]
+
+
+def test_replaced_rows_are_skipped_when_reading_parts():
+    key_index = KeyIndex()
+    first = key_index.upsert(hash_keys(match_rows(["Saka", "Rice"]), KEY_COLUMNS), "part-1")
+    second = key_index.upsert(hash_keys(match_rows(["Rice", "Odegaard"]), KEY_COLUMNS), "part-2")
+
+    assert (first["inserted"], first["replaced"]) == (2, 0)
+    assert (second["inserted"], second["replaced"], second["superseded"]) == (1, 1, {"part-1": [1]})
+    assert key_index.get_current_rows() == {"part-1": [0], "part-2": [0, 1]}
+    assert list(key_index.filter_part("part-1", match_rows(["Saka", "Rice"]))["player"]) == ["Saka"]
+    # Parts written before the index are read as they are
+    assert len(key_index.filter_part("season.csv", match_rows(["Saka", "Rice"]))) == 2
+
+
+def test_upsert_dataframe_replaces_rows_in_a_rewritten_file():
+    existing_df = match_rows(["Saka", "Rice", "Odegaard"], minutes=[90, 85, 90])
+    key_index = KeyIndex()
+    key_index.upsert(hash_keys(existing_df, KEY_COLUMNS), "season.csv")
+
+    corrected_df = match_rows(["Rice"], minutes=[88])
+    updated_df, stats = upsert_dataframe(existing_df, corrected_df, key_index, "season.csv", KEY_COLUMNS)
+    assert list(updated_df["player"]) == ["Saka", "Odegaard", "Rice"]
+    assert list(updated_df["minutes"]) == [90, 90, 88]
+    assert (stats["inserted"], stats["replaced"]) == (0, 1)
+
+    # The index points at the rows of the rewritten file, so the next upsert finds them
+    next_week_df = match_rows(["Saka", "Havertz"], date="2024-08-24")
+    updated_df, stats = upsert_dataframe(updated_df, pd.concat([match_rows(["Odegaard"], minutes=[70]),
+                                                                next_week_df]), key_index, "season.csv", KEY_COLUMNS)
+    assert list(zip(updated_df["player"], updated_df["date"])) == [
+        ("Saka", "2024-08-16"), ("Rice", "2024-08-16"), ("Odegaard", "2024-08-16"), ("Saka", "2024-08-24"),
+        ("Havertz", "2024-08-24")]
+    assert (stats["inserted"], stats["replaced"]) == (2, 1)
+    assert sorted(row for _, row in key_index.shards[""].values()) == list(range(5))
@@ -0,0 +1,44 @@
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.ledger_utils import LocalProgressLedger, S3ProgressLedger
+
+BUCKET = sc.S3_BUCKET_NAME
+
+
+def test_local_ledger_is_reloaded(tmp_path):
+    ledger = LocalProgressLedger(str(tmp_path), 2024)
+    ledger.mark_completed(["https://fbref.com/a", "https://fbref.com/b"])
+    ledger.mark_failed("https://fbref.com/c", ValueError("table not found"))
+    ledger.save()
+
+    reloaded = LocalProgressLedger(str(tmp_path), 2024)
+
+    assert reloaded.is_completed("https://fbref.com/a")
+    assert not reloaded.is_completed("https://fbref.com/c")
+    assert reloaded.get_urls("failed") == ["https://fbref.com/c"]
+    assert reloaded.matches["https://fbref.com/c"]["error"] == "table not found"
+    assert reloaded.get_summary() == {"completed": 2, "failed": 1}
+    assert (tmp_path / "2024-2025.json").exists()
+
+
+def test_retried_match_counts_attempts(s3_client):
+    ledger = S3ProgressLedger(s3_client, bucket=BUCKET, key="raw/ledger.json", season=2024)
+    ledger.mark_failed("https://fbref.com/a", "timeout")
+    ledger.save()
+
+    reloaded = S3ProgressLedger(s3_client, bucket=BUCKET, key="raw/ledger.json", season=2024)
+    reloaded.mark_completed(["https://fbref.com/a"])
+
+    assert reloaded.matches["https://fbref.com/a"]["attempts"] == 2
+    assert reloaded.matches["https://fbref.com/a"]["error"] is None
+    assert reloaded.get_urls("completed") == ["https://fbref.com/a"]
+
+
+def test_matches_that_fail_max_attempts_times_are_given_up_on(tmp_path):
+    ledger = LocalProgressLedger(str(tmp_path), 2024, max_attempts=2)
+    ledger.mark_failed("https://fbref.com/a", "timeout")
+    ledger.mark_failed("https://fbref.com/b", "timeout")
+    ledger.mark_failed("https://fbref.com/b", "timeout")
+
+    assert ledger.get_retry_urls() == ["https://fbref.com/a"]
+    assert ledger.get_exhausted_urls() == ["https://fbref.com/b"]
+    assert not LocalProgressLedger(str(tmp_path), 2024).is_exhausted("https://fbref.com/b")
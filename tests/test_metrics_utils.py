@@ -0,0 +1,102 @@
+import json
+import pstats
+from unittest.mock import Mock, patch
+import pytest
+import scrapers.fbref as fbref
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.metrics_utils import MetricsRecorder, metrics, profile_run
+from utils.s3_utils import save_json_to_s3, read_json_from_s3
+
+
+@pytest.fixture
+def recorder():
+    recorder = MetricsRecorder()
+    for seconds in range(1, 21):
+        recorder.observe("fetch.requests", seconds / 10)
+    recorder.add_bytes("fetch.requests", 2048)
+    recorder.add_bytes("s3.save_data_to_s3_bucket_as_csv", 1024)
+    recorder.increment("fetch.cache_hits", 3)
+    return recorder
+
+
+@pytest.fixture
+def shared_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+def test_summary_has_percentiles_and_bytes_per_stage(recorder):
+    summary = recorder.get_summary()
+    requests_stats = summary["stages"]["fetch.requests"]
+
+    assert requests_stats["count"] == 20
+    assert requests_stats["total_seconds"] == pytest.approx(21.0)
+    assert requests_stats["p50_seconds"] == pytest.approx(1.0)
+    assert requests_stats["p95_seconds"] == pytest.approx(1.9)
+    assert requests_stats["max_seconds"] == pytest.approx(2.0)
+    assert requests_stats["bytes"] == 2048
+    # Stages with only bytes recorded are still reported
+    assert summary["stages"]["s3.save_data_to_s3_bucket_as_csv"]["count"] == 0
+    assert summary["stages"]["s3.save_data_to_s3_bucket_as_csv"]["bytes"] == 1024
+    assert summary["counters"] == {"fetch.cache_hits": 3}
+
+
+def test_timer_records_calls_that_raise():
+    recorder = MetricsRecorder()
+    with pytest.raises(ValueError):
+        with recorder.timer("parse.match_report"):
+            raise ValueError("bad html")
+
+    assert recorder.get_summary()["stages"]["parse.match_report"]["count"] == 1
+
+
+def test_write_emf_documents(recorder, tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    recorder.write(str(path), output_format="emf", dimensions={"Competition": "premier-league"})
+
+    documents = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [document["Stage"] for document in documents] == ["fetch.requests", "s3.save_data_to_s3_bucket_as_csv"]
+    definition = documents[0]["_aws"]["CloudWatchMetrics"][0]
+    assert definition["Dimensions"] == [["Stage", "Competition"]]
+    assert {"Name": "P95Seconds", "Unit": "Seconds"} in definition["Metrics"]
+    # Every metric in the definition must be a member of the document
+    assert all(metric["Name"] in documents[0] for metric in definition["Metrics"])
+    assert documents[0]["Competition"] == "premier-league"
+    assert documents[0]["Bytes"] == 2048
+
+
+def test_get_html_content_times_requests_and_selenium(shared_metrics):
+    """
+    A blocked request should be timed as a request and the fallback as a selenium fetch, each with its bytes
+    """
+    with patch("scrapers.fbref.http_client.get", return_value=Mock(status_code=403, headers={})), \
+            patch.object(fbref.rate_limiter, "wait", return_value=0.0), \
+            patch.object(fbref.driver_pool, "get_page_source", return_value="<html>match</html>"):
+        assert fbref.get_html_content("https://fbref.com/en/matches/1") == "<html>match</html>"
+
+    summary = shared_metrics.get_summary()
+    assert summary["stages"]["fetch.requests"]["count"] == 1
+    assert summary["stages"]["fetch.requests"]["bytes"] == 0
+    assert summary["stages"]["fetch.selenium"]["count"] == 1
+    assert summary["stages"]["fetch.selenium"]["bytes"] == len("<html>match</html>")
+    assert summary["stages"]["fetch.rate_limit_wait"]["count"] == 2
+    assert summary["counters"] == {"fetch.requests.status_403": 1}
+
+
+def test_s3_utils_calls_are_timed(shared_metrics, s3_client):
+    save_json_to_s3(s3_client, {"season": 2024}, bucket=sc.S3_BUCKET_NAME, key="meta.json")
+    read_json_from_s3(s3_client, bucket=sc.S3_BUCKET_NAME, key="meta.json")
+
+    stages = shared_metrics.get_summary()["stages"]
+    assert stages["s3.save_json_to_s3"]["count"] == 1
+    assert stages["s3.save_json_to_s3"]["bytes"] == len(json.dumps({"season": 2024}))
+    assert stages["s3.read_json_from_s3"]["bytes"] == stages["s3.save_json_to_s3"]["bytes"]
+
+
+def test_profile_run_writes_cprofile_stats(tmp_path):
+    path = str(tmp_path / "run.pstats")
+    with profile_run("cprofile", path):
+        sorted(range(1000), reverse=True)
+
+    assert pstats.Stats(path).total_calls > 0
@@ -0,0 +1,100 @@
+import pytest
+import pandas as pd
+from unittest.mock import Mock, patch
+from scrapers.orchestrator import expand_work_items, publish_work_items, run_worker
+from scrapers.fbref import get_season_url, read_season_data, get_progress_ledger
+import scrapers.fbref as fbref
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.queue_utils import SqliteWorkQueue
+from utils.rate_limit_utils import AdaptiveHostRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def fast_sleep():
+    with patch("time.sleep", return_value=None):
+        yield
+
+
+@pytest.fixture
+def mock_2024_2025_scores_and_fixtures():
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "r") as f:
+        scores_and_fixtures_html = f.read()
+
+    with patch("scrapers.fbref.http_client.get") as mock_get:
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.content = scores_and_fixtures_html.encode("utf-8")
+        mock_get.return_value = mock_response
+        yield mock_get
+
+
+def match_report(match_url, parser=None):
+    return pd.DataFrame({"player": [match_url], "minutes": ["90"]})
+
+
+def test_season_url_for_competition():
+    assert get_season_url(2024) == ("https://fbref.com/en/comps/9/2024-2025/schedule/"
+                                    "2024-2025-Premier-League-Scores-and-Fixtures")
+    assert get_season_url(2023, "la-liga") == ("https://fbref.com/en/comps/12/2023-2024/schedule/"
+                                               "2023-2024-La-Liga-Scores-and-Fixtures")
+
+
+def test_work_items_are_expanded_per_competition_and_season(mock_2024_2025_scores_and_fixtures):
+    work_items = expand_work_items(["premier-league", "la-liga"], [2024], start_date="2025-05-04")
+
+    requested_urls = [call.args[0] for call in mock_2024_2025_scores_and_fixtures.call_args_list]
+    assert requested_urls == [get_season_url(2024, "premier-league"), get_season_url(2024, "la-liga")]
+    assert len(work_items) == 10
+    assert {item["competition"] for item in work_items} == {"premier-league", "la-liga"}
+    assert work_items[0]["date"] == "2025-05-04" and work_items[0]["row"]["td"]["home_team"] == "Brighton"
+
+
+def test_workers_share_the_queue_and_recover_crashed_items(mock_2024_2025_scores_and_fixtures, s3_client, tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=0)
+    assert publish_work_items(queue, ["la-liga"], [2024], start_date="2025-05-04", s3_client=s3_client) == 5
+
+    # A worker claims two items and crashes before writing them, they become visible again straight away
+    queue.receive_messages(2)
+
+    with patch("scrapers.fbref.scrape_match_report_data", side_effect=match_report):
+        totals = run_worker(queue, s3_client, max_messages=2, idle_polls=1)
+
+    assert totals == {"completed": 5, "skipped": 0, "failed": 0}
+    season_df = read_season_data(s3_client, 2024, competition="la-liga")
+    assert sorted(season_df["home_team"]) == ["Brentford", "Brighton", "Chelsea", "Crystal Palace", "West Ham"]
+    assert get_progress_ledger(s3_client, 2024, competition="la-liga").get_summary() == {"completed": 5, "failed": 0}
+    assert read_season_data(s3_client, 2024).empty
+
+    # Completed matches are not published again
+    assert publish_work_items(queue, ["la-liga"], [2024], start_date="2025-05-04", s3_client=s3_client) == 0
+
+
+def test_failed_items_stay_on_the_queue(s3_client, tmp_path):
+    """
+    fbref blocks (403) the Chelsea match report and selenium only gets an access denied page, so the item fails
+    through the real download and parse path, is retried once and then moved to the dead letter queue
+    """
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        schedule_html = f.read()
+    with open("tests/test_files/new_vs_nott_for_22_23.html", "rb") as f:
+        match_html = f.read()
+
+    def get(url, headers=None):
+        if "/schedule/" in url:
+            return Mock(status_code=200, headers={}, content=schedule_html)
+        if "Chelsea" in url:
+            return Mock(status_code=403, headers={}, content=b"Forbidden")
+        return Mock(status_code=200, headers={}, content=match_html)
+
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=0, max_receives=2)
+    with patch("scrapers.fbref.http_client.get", side_effect=get), \
+            patch.object(fbref, "rate_limiter", AdaptiveHostRateLimiter(requests_per_minute=60000)), \
+            patch.object(fbref.driver_pool, "get_page_source", return_value="<html><body>Access denied</body></html>"):
+        publish_work_items(queue, ["premier-league"], [2024], start_date="2025-05-04")
+        totals = run_worker(queue, s3_client, max_messages=5, idle_polls=1)
+
+    assert totals == {"completed": 4, "skipped": 0, "failed": 2}
+    assert queue.get_summary()["dead"] == 1
+    failed_urls = get_progress_ledger(s3_client, 2024).get_urls("failed")
+    assert len(failed_urls) == 1 and "Chelsea" in failed_urls[0]
+    assert "Chelsea" not in set(read_season_data(s3_client, 2024)["home_team"])
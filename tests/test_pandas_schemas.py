@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from schemas.pandas_schemas import FbRefSchema, FootballDataSchema
+
+
+def test_coerce_handles_fbref_quirks():
+    """
+    Empty cells become nulls, "%" and thousand separators are removed and ages in years-days are converted to years
+    """
+    scraped_df = pd.DataFrame({
+        "player": ["Callum Wilson", "Chris Wood"],
+        "nationality": ["engENG", "nzNZL"],
+        "age": ["30-160", "26"],
+        "minutes": ["89", ""],
+        "passes_pct": ["62.5%", ""],
+        "xg": ["0.6", "0.0"],
+        "attendance": ["52,245", "52,245"],
+        "date": ["2022-08-06", "2022-08-06"],
+        "not_in_schema": ["a", "b"],
+    })
+
+    typed_df = FbRefSchema().coerce(scraped_df)
+
+    assert str(typed_df["minutes"].dtype) == "Int16"
+    assert typed_df["minutes"].tolist()[0] == 89 and typed_df["minutes"].isna().tolist() == [False, True]
+    assert typed_df["passes_pct"].dtype == np.float32
+    assert typed_df["passes_pct"].tolist()[0] == np.float32(62.5) and np.isnan(typed_df["passes_pct"].tolist()[1])
+    assert typed_df["age"].round(3).tolist() == [np.float32(30 + 160 / 365.25).round(3), 26.0]
+    assert typed_df["attendance"].tolist() == [52245, 52245]
+    assert typed_df["nationality"].dtype == "category"
+    assert typed_df["date"].tolist() == [pd.Timestamp("2022-08-06")] * 2
+    assert typed_df["not_in_schema"].tolist() == ["a", "b"]
+
+
+def test_raw_schema_is_all_strings():
+    fbref_schema = FbRefSchema()
+
+    assert list(fbref_schema.get_raw_schema()) == list(fbref_schema.get_schema())
+    assert set(fbref_schema.get_raw_schema().values()) == {"object"}
+
+
+def test_football_data_columns_of_every_era_are_mapped_to_one_schema():
+    schema = FootballDataSchema()
+    old_df = pd.DataFrame({"Date": ["14/08/93", ""], "HT": ["Arsenal", "Leeds"], "BbMxH": ["2.1", None],
+                           "BbAvH": ["1.9", "2.0"], "Bb1X2": ["30", "31"]})
+    new_df = pd.DataFrame({"Date": ["16/08/2024"], "HomeTeam": ["Man United"], "MaxH": ["1.65"], "PSCH": ["1.62"]})
+
+    typed_df = schema.coerce(pd.concat([schema.rename(old_df), schema.rename(new_df)], ignore_index=True))
+
+    assert list(typed_df.columns) == list(schema.get_schema())
+    assert typed_df["date"].tolist()[0] == pd.Timestamp("1993-08-14") and pd.isna(typed_df["date"].tolist()[1])
+    assert typed_df["date"].tolist()[2] == pd.Timestamp("2024-08-16")
+    assert typed_df["home_team"].tolist() == ["Arsenal", "Leeds", "Man United"]
+    assert typed_df["odds_max_home"].tolist()[0] == np.float32(2.1) and np.isnan(typed_df["odds_max_home"].tolist()[1])
+    assert typed_df["odds_avg_home"].tolist()[:2] == [np.float32(1.9), np.float32(2.0)]
+    assert typed_df["closing_odds_ps_home"].tolist()[2] == np.float32(1.62)
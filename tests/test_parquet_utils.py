@@ -0,0 +1,79 @@
+import json
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from utils.parquet_utils import save_partitioned_parquet_locally, update_partition_list_locally, get_partition_list
+
+
+def build_season_df():
+    """
+    30 players per match, 2 matches in each of 3 gameweeks
+    """
+    return pd.DataFrame({
+        "season": 2024,
+        "gameweek": [gameweek for gameweek in (1, 2, 10) for _ in range(60)],
+        "player": [f"Player {player}" for _ in range(6) for player in range(30)],
+        "minutes": list(range(180)),
+    })
+
+
+def test_single_gameweek_query_reads_one_partition(tmp_path):
+    save_partitioned_parquet_locally(build_season_df(), str(tmp_path), partition_cols=["season", "gameweek"],
+                                     file_name="part-0.parquet", row_group_size=25)
+    dataset = ds.dataset(str(tmp_path), format="parquet", partitioning="hive")
+
+    gameweek_filter = (ds.field("season") == 2024) & (ds.field("gameweek") == 2)
+    fragments = list(dataset.get_fragments(filter=gameweek_filter))
+
+    assert [fragment.path for fragment in fragments] == [f"{tmp_path}/season=2024/gameweek=02/part-0.parquet"]
+    assert dataset.to_table(filter=gameweek_filter).num_rows == 60
+
+
+def test_partition_files_have_row_groups_with_statistics(tmp_path):
+    paths = save_partitioned_parquet_locally(build_season_df(), str(tmp_path), partition_cols=["season", "gameweek"],
+                                             file_name="part-0.parquet", row_group_size=25)
+
+    metadata = pq.ParquetFile(paths[0]).metadata
+    minutes_col = metadata.schema.names.index("minutes")
+
+    # Partition columns are stored in the path, not the file
+    assert metadata.schema.names == ["player", "minutes"]
+    assert metadata.num_row_groups == 3
+    statistics = metadata.row_group(0).column(minutes_col).statistics
+    assert statistics.has_min_max and (statistics.min, statistics.max) == (0, 24)
+
+
+def test_rows_without_a_partition_value_are_written_to_the_null_partition(tmp_path):
+    season_df = build_season_df()
+    season_df["gameweek"] = season_df["gameweek"].astype("Int64")
+    season_df.loc[:29, "gameweek"] = None
+
+    paths = save_partitioned_parquet_locally(season_df, str(tmp_path), partition_cols=["season", "gameweek"],
+                                             file_name="part-0.parquet")
+    dataset = ds.dataset(str(tmp_path), format="parquet", partitioning="hive")
+
+    assert f"{tmp_path}/season=2024/gameweek=__HIVE_DEFAULT_PARTITION__/part-0.parquet" in paths
+    assert dataset.count_rows() == 180
+    assert dataset.to_table(filter=ds.field("gameweek").is_null()).num_rows == 30
+
+
+def test_partition_list_is_regenerated(tmp_path):
+    save_partitioned_parquet_locally(build_season_df(), str(tmp_path), partition_cols=["season", "gameweek"],
+                                     file_name="part-0.parquet")
+    save_partitioned_parquet_locally(build_season_df().head(60), str(tmp_path), partition_cols=["season", "gameweek"],
+                                     file_name="part-1.parquet")
+
+    partitions = update_partition_list_locally(str(tmp_path))
+
+    assert [(partition["path"], len(partition["files"])) for partition in partitions] == [
+        ("season=2024/gameweek=01", 2), ("season=2024/gameweek=02", 1), ("season=2024/gameweek=10", 1)]
+    assert json.loads((tmp_path / "_partitions.json").read_text())["partitions"] == partitions
+
+
+def test_partition_list_ignores_files_outside_partitions():
+    keys = ["raw/fbref_data/partitioned/_partitions.json", "raw/fbref_data/partitioned/readme.parquet",
+            "raw/fbref_data/partitioned/season=2024/gameweek=01/part-0.parquet"]
+
+    assert get_partition_list(keys, "raw/fbref_data/partitioned") == [
+        {"path": "season=2024/gameweek=01", "values": {"season": "2024", "gameweek": "01"},
+         "files": ["part-0.parquet"]}]
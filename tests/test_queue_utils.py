@@ -0,0 +1,60 @@
+import time
+import boto3
+from moto import mock_aws
+from unittest.mock import patch
+from utils.queue_utils import SqliteWorkQueue, SqsWorkQueue
+
+
+def test_received_messages_are_leased(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=60)
+    queue.send_messages([{"match_url": "a"}, {"match_url": "b"}, {"match_url": "c"}])
+
+    first = queue.receive_messages(2)
+    second = queue.receive_messages(2)
+
+    assert [message["body"]["match_url"] for message in first] == ["a", "b"]
+    assert [message["body"]["match_url"] for message in second] == ["c"]
+    assert queue.receive_messages(2) == []
+    assert queue.get_summary() == {"visible": 0, "in_flight": 3, "dead": 0}
+
+
+def test_expired_lease_is_delivered_again_and_cannot_be_deleted_by_old_worker(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=60)
+    queue.send_messages([{"match_url": "a"}])
+    crashed_worker_message = queue.receive_messages()[0]
+
+    with patch("time.time", return_value=time.time() + 61):
+        redelivered = queue.receive_messages()
+        queue.delete_message(crashed_worker_message["receipt_handle"])
+        assert queue.get_summary()["in_flight"] == 1
+
+        queue.delete_message(redelivered[0]["receipt_handle"])
+        assert queue.get_summary() == {"visible": 0, "in_flight": 0, "dead": 0}
+
+    assert redelivered[0]["body"] == {"match_url": "a"}
+
+
+def test_message_is_given_up_after_max_receives(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=0, max_receives=2)
+    queue.send_messages([{"match_url": "a"}])
+
+    assert len(queue.receive_messages()) == 1
+    assert len(queue.receive_messages()) == 1
+    assert queue.receive_messages() == []
+    assert queue.get_summary()["dead"] == 1
+
+
+def test_sqs_queue_round_trip():
+    with mock_aws():
+        sqs_client = boto3.client("sqs", region_name="eu-west-2")
+        queue_url = sqs_client.create_queue(QueueName="fbref-work-queue")["QueueUrl"]
+        queue = SqsWorkQueue(sqs_client, queue_url, visibility_timeout=60, wait_time_seconds=0)
+
+        assert queue.send_messages([{"match_url": str(i)} for i in range(12)]) == 12
+        messages = queue.receive_messages(10)
+        for message in messages:
+            queue.delete_message(message["receipt_handle"])
+        remaining = queue.receive_messages(10)
+
+    assert len(messages) == 10
+    assert len(remaining) == 2
@@ -0,0 +1,176 @@
+import math
+import random
+from collections import deque
+from unittest.mock import patch
+import pytest
+from utils.rate_limit_utils import TokenBucket, HostRateLimiter, AdaptiveHostRateLimiter, parse_retry_after
+
+FBREF_URL = "https://fbref.com/en/matches/1"
+
+
+class SimulatedServer:
+    """
+    Allows requests_per_minute requests in any 60 seconds and answers the requests over the limit with a 429 and the
+    number of seconds until a request is allowed again in Retry-After
+    """
+
+    def __init__(self, clock: list, requests_per_minute: int):
+        self.clock = clock
+        self.requests_per_minute = requests_per_minute
+        self.window = deque()
+        self.throttled = 0
+
+    def get(self):
+        now = self.clock[0]
+        while self.window and self.window[0] <= now - 60:
+            self.window.popleft()
+        if len(self.window) >= self.requests_per_minute:
+            self.throttled += 1
+            return 429, {"Retry-After": str(math.ceil(self.window[0] + 60 - now))}
+        self.window.append(now)
+        return 200, {}
+
+
+@pytest.fixture
+def clock():
+    """
+    Simulated clock, sleeping moves it forward instead of waiting
+    """
+    clock = [100.0]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    with patch("utils.rate_limit_utils.time.monotonic", side_effect=lambda: clock[0]), \
+            patch("utils.rate_limit_utils.time.sleep", side_effect=sleep):
+        yield clock
+
+
+def run_requests(limiter, server: SimulatedServer, clock: list, successes: int) -> float:
+    """
+    Requests pages from the server through the limiter until the number of successes is reached
+    :return: The number of successful requests per minute
+    """
+    start = clock[0]
+    completed = 0
+    while completed < successes:
+        limiter.wait(FBREF_URL)
+        status_code, headers = server.get()
+        if isinstance(limiter, AdaptiveHostRateLimiter):
+            limiter.record_response(FBREF_URL, status_code, headers)
+        completed += status_code == 200
+    return completed / ((clock[0] - start) / 60)
+
+
+def test_token_bucket_spaces_out_requests_after_burst():
+    """
+    With a burst of 2 and 1 token per second, the first two requests are free and the next requests have to wait for
+    their reserved tokens to refill in turn
+    """
+    with patch("utils.rate_limit_utils.time.monotonic", return_value=100.0):
+        bucket = TokenBucket(rate=1, capacity=2)
+        delays = [bucket.reserve() for _ in range(4)]
+
+    assert delays == [0.0, 0.0, 1.0, 2.0]
+
+
+def test_token_bucket_refills_over_time():
+    clock = [100.0]
+    with patch("utils.rate_limit_utils.time.monotonic", side_effect=lambda: clock[0]):
+        bucket = TokenBucket(rate=0.5, capacity=1)
+        assert bucket.reserve() == 0.0
+        clock[0] += 2
+        assert bucket.reserve() == 0.0
+        clock[0] += 1
+        assert bucket.reserve() == 1.0
+
+
+def test_host_rate_limiter_keeps_separate_budget_per_host():
+    """
+    Requests to one host should not wait on the budget of another host, and host overrides should be applied
+    """
+    with patch("utils.rate_limit_utils.time.monotonic", return_value=100.0), \
+            patch("utils.rate_limit_utils.time.sleep") as mock_sleep:
+        limiter = HostRateLimiter(requests_per_minute=10, host_limits={"www.football-data.co.uk": 60})
+
+        assert limiter.wait("https://fbref.com/en/matches/1") == 0.0
+        assert limiter.wait("https://www.football-data.co.uk/mmz4281/2324/E0.csv") == 0.0
+        assert limiter.wait("https://fbref.com/en/matches/2") == 6.0
+        assert limiter.wait("https://www.football-data.co.uk/mmz4281/2425/E0.csv") == 1.0
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [6.0, 1.0]
+
+
+def test_adaptive_limiter_converges_close_to_server_limit(clock):
+    """
+    Starting from a conservative rate, the adaptive limiter should speed up to near the server's real limit with only
+    a few 429s, where a constant rate stays at its worst case
+    """
+    random.seed(0)
+    adaptive = AdaptiveHostRateLimiter(requests_per_minute=10, min_requests_per_minute=2, max_requests_per_minute=120)
+    adaptive_server = SimulatedServer(clock, requests_per_minute=30)
+    adaptive_rate = run_requests(adaptive, adaptive_server, clock, successes=300)
+
+    constant_rate = run_requests(HostRateLimiter(requests_per_minute=10), SimulatedServer(clock, 30), clock, 300)
+
+    assert 24 <= adaptive_rate <= 30
+    assert adaptive_server.throttled <= 15
+    assert constant_rate == pytest.approx(10, rel=0.05)
+
+
+def test_adaptive_limiter_backs_off_when_the_limit_drops(clock):
+    """
+    Starting above the server's limit, the limiter should slow down to it instead of being throttled repeatedly
+    """
+    random.seed(0)
+    limiter = AdaptiveHostRateLimiter(requests_per_minute=60, min_requests_per_minute=2)
+    server = SimulatedServer(clock, requests_per_minute=10)
+
+    rate = run_requests(limiter, server, clock, successes=100)
+
+    assert 8 <= rate <= 10
+    assert server.throttled <= 10
+
+
+def test_retry_after_pauses_the_host(clock):
+    limiter = AdaptiveHostRateLimiter(requests_per_minute=60, burst=1)
+    assert limiter.wait(FBREF_URL) == 0.0
+
+    backoff = limiter.record_response(FBREF_URL, 429, {"Retry-After": "30"})
+
+    assert 30 <= backoff <= 33
+    assert limiter.wait(FBREF_URL) >= 30
+    # Other hosts keep their own budget
+    assert limiter.wait("https://www.football-data.co.uk/mmz4281/2425/E0.csv") == 0.0
+
+
+def test_backoff_grows_with_consecutive_errors_down_to_the_floor(clock):
+    """
+    Without a Retry-After the backoff doubles (with jitter) on each consecutive 503 and the rate is halved down to the
+    minimum. A healthy response resets the backoff and raises the rate again
+    """
+    random.seed(0)
+    limiter = AdaptiveHostRateLimiter(requests_per_minute=16, min_requests_per_minute=2, backoff_seconds=4,
+                                      increase_per_success=1)
+
+    backoffs = [limiter.record_response(FBREF_URL, 503) for _ in range(4)]
+    host_state = limiter.get_host_state("fbref.com")
+
+    for errors, backoff in enumerate(backoffs):
+        assert 2 * 2 ** errors <= backoff <= 4 * 2 ** errors
+    assert host_state["requests_per_minute"] == 2
+
+    assert limiter.record_response(FBREF_URL, 200) == 0.0
+    assert host_state == {"requests_per_minute": 3, "errors": 0}
+    # Client errors are not a sign of the rate
+    assert limiter.record_response(FBREF_URL, 404) == 0.0
+    assert host_state["requests_per_minute"] == 3
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"Retry-After": "120"}) == 120.0
+    assert parse_retry_after({}) is None
+    assert parse_retry_after({"Retry-After": "soon"}) is None
+    with patch("utils.rate_limit_utils.time.time", return_value=1746568800.0):
+        # The mocked time is 2025-05-06 22:00:00 GMT
+        assert parse_retry_after({"Retry-After": "Tue, 06 May 2025 22:01:00 GMT"}) == pytest.approx(60)
@@ -0,0 +1,105 @@
+import asyncio
+import io
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.s3_transfer_utils import S3MultipartWriter, stream_dataframe_to_s3_as_csv, \
+    stream_dataframe_to_s3_as_parquet, upload_files_async, download_files_async, do_files_exist_async, get_s3_client
+
+BUCKET = sc.S3_BUCKET_NAME
+
+
+@pytest.fixture(autouse=True)
+def small_parts():
+    # Allow small parts so multipart uploads can be tested without 5MB of data
+    with patch("moto.s3.models.S3_UPLOAD_PART_MIN_SIZE", 256):
+        yield
+
+
+@pytest.fixture
+def season_df():
+    return pd.DataFrame({"player": [f"Player {row}" for row in range(2000)], "minutes": range(2000)})
+
+
+def test_csv_is_streamed_in_parts(s3_client, season_df):
+    with patch.object(s3_client, "upload_part", wraps=s3_client.upload_part) as mock_upload_part:
+        size = stream_dataframe_to_s3_as_csv(s3_client, season_df, BUCKET, "season.csv", part_size=4096,
+                                             chunk_rows=300)
+
+    body = s3_client.get_object(Bucket=BUCKET, Key="season.csv")["Body"].read()
+    assert body == season_df.to_csv(index=False).encode("utf-8")
+    assert size == len(body)
+    assert mock_upload_part.call_count == -(-len(body) // 4096)
+    # Only the last part can be smaller than the part size
+    assert all(len(call.kwargs["Body"]) == 4096 for call in mock_upload_part.call_args_list[:-1])
+
+
+def test_small_file_uses_single_put(s3_client, season_df):
+    with patch.object(s3_client, "create_multipart_upload") as mock_create:
+        stream_dataframe_to_s3_as_csv(s3_client, season_df.head(5), BUCKET, "small.csv")
+
+    mock_create.assert_not_called()
+    assert pd.read_csv(io.BytesIO(s3_client.get_object(Bucket=BUCKET, Key="small.csv")["Body"].read())).equals(
+        season_df.head(5))
+
+
+def test_parquet_is_streamed(s3_client, season_df):
+    stream_dataframe_to_s3_as_parquet(s3_client, season_df, BUCKET, "season.parquet", part_size=1024)
+
+    body = s3_client.get_object(Bucket=BUCKET, Key="season.parquet")["Body"].read()
+    assert pd.read_parquet(io.BytesIO(body)).equals(season_df)
+
+
+def test_failed_upload_is_aborted(s3_client):
+    with pytest.raises(ValueError):
+        with S3MultipartWriter(s3_client, BUCKET, "failed.csv", part_size=256) as writer:
+            writer.write(b"x" * 1000)
+            raise ValueError("serialization failed")
+
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=BUCKET)
+
+
+def test_failed_complete_is_aborted(s3_client):
+    error = ClientError({"Error": {"Code": "InternalError", "Message": "We encountered an internal error"}},
+                        "CompleteMultipartUpload")
+    with patch.object(s3_client, "complete_multipart_upload", side_effect=error):
+        with pytest.raises(ClientError):
+            with S3MultipartWriter(s3_client, BUCKET, "failed.csv", part_size=256) as writer:
+                writer.write(b"x" * 1000)
+
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=BUCKET)
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=BUCKET)
+
+
+def test_async_batch_transfers(s3_client):
+    files = {f"raw/football_data/{season}.csv": f"season {season}".encode() for season in ("2223", "2324")}
+
+    async def run():
+        await upload_files_async(s3_client, BUCKET, files, max_concurrency=2)
+        exists = await do_files_exist_async(s3_client, BUCKET, list(files) + ["raw/football_data/2425.csv"])
+        downloaded = await download_files_async(s3_client, BUCKET, list(files) + ["raw/football_data/2425.csv"])
+        return exists, downloaded
+
+    exists, downloaded = asyncio.run(run())
+
+    assert exists == {"raw/football_data/2223.csv": True, "raw/football_data/2324.csv": True,
+                      "raw/football_data/2425.csv": False}
+    assert downloaded == {**files, "raw/football_data/2425.csv": None}
+
+
+def test_s3_client_is_shared():
+    with mock_aws(), patch.dict("utils.s3_transfer_utils._s3_clients", clear=True):
+        assert get_s3_client() is get_s3_client()
+
+
+def test_s3_client_is_created_for_each_pool_size():
+    with mock_aws(), patch.dict("utils.s3_transfer_utils._s3_clients", clear=True):
+        large_pool_client = get_s3_client(max_pool_connections=50)
+
+        assert large_pool_client is not get_s3_client()
+        assert large_pool_client.meta.config.max_pool_connections == 50
+        assert get_s3_client(max_pool_connections=50) is large_pool_client
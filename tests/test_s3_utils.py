@@ -0,0 +1,38 @@
+from scrapers.scraper_constants import ScraperConstants as sc
+from utils.s3_utils import read_json_from_s3, save_json_to_s3, update_json_in_s3
+
+BUCKET = sc.S3_BUCKET_NAME
+
+
+def test_json_round_trip(s3_client):
+    save_json_to_s3(s3_client, {"season": 2024, "parts": []}, bucket=BUCKET, key="raw/manifest.json")
+
+    assert read_json_from_s3(s3_client, bucket=BUCKET, key="raw/manifest.json") == {"season": 2024, "parts": []}
+
+
+def test_read_missing_json_returns_default(s3_client):
+    assert read_json_from_s3(s3_client, bucket=BUCKET, key="raw/missing.json", default={}) == {}
+
+
+def test_update_json_retries_when_another_writer_changes_the_file(s3_client):
+    save_json_to_s3(s3_client, {"parts": ["a"]}, bucket=BUCKET, key="raw/manifest.json")
+    attempts = []
+
+    def add_part(manifest):
+        if not attempts:
+            # Another worker adds its part between the read and the write
+            save_json_to_s3(s3_client, {"parts": ["a", "b"]}, bucket=BUCKET, key="raw/manifest.json")
+        attempts.append(list(manifest["parts"]))
+        return {"parts": manifest["parts"] + ["c"]}
+
+    update_json_in_s3(s3_client, bucket=BUCKET, key="raw/manifest.json", update=add_part)
+
+    assert attempts == [["a"], ["a", "b"]]
+    assert read_json_from_s3(s3_client, bucket=BUCKET, key="raw/manifest.json") == {"parts": ["a", "b", "c"]}
+
+
+def test_update_json_creates_missing_file_from_default(s3_client):
+    update_json_in_s3(s3_client, bucket=BUCKET, key="raw/ledger.json", default={"matches": {}},
+                      update=lambda ledger: {"matches": {**ledger["matches"], "a": "completed"}})
+
+    assert read_json_from_s3(s3_client, bucket=BUCKET, key="raw/ledger.json") == {"matches": {"a": "completed"}}
@@ -0,0 +1,116 @@
+import copy
+import pytest
+from scrapers.scraper_constants import ScraperConstants as sc
+from scrapers.fbref import get_match_tasks_in_date_range
+from scrapers.parsers import LxmlParser
+from utils.schedule_index_utils import LocalScheduleIndex, S3ScheduleIndex, build_schedule_entry, get_fixture_key
+
+
+@pytest.fixture(scope="module")
+def schedule_rows():
+    parser = LxmlParser()
+    with open("tests/test_files/scores_and_fixtures_2025_05_06.html", "rb") as f:
+        return parser.get_schedule_rows(parser.parse(f.read()))
+
+
+def find_row(rows: list, home_team: str, away_team: str) -> dict:
+    return next(row for row in rows
+                if row["td"].get("home_team") == home_team and row["td"].get("away_team") == away_team)
+
+
+def test_schedule_entry_is_compact(schedule_rows):
+    entry = build_schedule_entry(schedule_rows[0])
+
+    assert entry == {
+        "match_id": "cc5b4244",
+        "date": "2024-08-16",
+        "gameweek": "1",
+        "match_url": "https://fbref.com/en/matches/cc5b4244/Manchester-United-Fulham-August-16-2024-Premier-League",
+        "status": "completed",
+        "score": "1–0",
+        "digest": entry["digest"],
+    }
+    upcoming = build_schedule_entry(find_row(schedule_rows, "Tottenham", "Brighton"))
+    assert (upcoming["status"], upcoming["match_id"], upcoming["match_url"]) == ("scheduled", None, None)
+
+
+def test_new_index_only_has_matches_from_start_date_pending(schedule_rows, tmp_path):
+    """
+    Seeding the index should leave the same matches to scrape as filtering the schedule by the start date
+    """
+    schedule_index = LocalScheduleIndex(str(tmp_path), 2024)
+    diff = schedule_index.update(schedule_rows, start_date="2025-04-26")
+
+    expected_urls = [match_url for _, match_url, _ in get_match_tasks_in_date_range(schedule_rows, "2025-04-26")]
+    assert [entry["match_url"] for entry in schedule_index.get_pending()] == expected_urls
+    assert len(diff["completed"]) == len(expected_urls)
+    assert diff["changed"] == []
+    assert schedule_index.get_summary() == {"completed": 350, "scheduled": 30, "pending": len(expected_urls)}
+
+
+def test_scraped_matches_are_not_pending_after_reload(schedule_rows, tmp_path):
+    schedule_index = LocalScheduleIndex(str(tmp_path), 2024)
+    schedule_index.update(schedule_rows, start_date="2025-05-04")
+    schedule_index.mark_scraped([entry["match_url"] for entry in schedule_index.get_pending()])
+    schedule_index.save()
+
+    reloaded = LocalScheduleIndex(str(tmp_path), 2024)
+    diff = reloaded.update(schedule_rows)
+
+    assert reloaded.get_pending() == []
+    assert diff == {"completed": [], "changed": []}
+
+
+def test_diff_finds_newly_completed_and_corrected_matches(schedule_rows, tmp_path):
+    schedule_index = LocalScheduleIndex(str(tmp_path), 2024)
+    schedule_index.update(schedule_rows, start_date="2025-06-01")
+    assert schedule_index.get_pending() == []
+
+    new_rows = copy.deepcopy(schedule_rows)
+    # A late score correction of a match scraped weeks ago
+    corrected = find_row(new_rows, "Manchester Utd", "Fulham")
+    corrected["td"]["score"] = "2–0"
+    # An upcoming fixture that has been played
+    played = find_row(new_rows, "Tottenham", "Brighton")
+    played["td"].update({"score": "1–4", "match_report": "Match Report"})
+    played["match_report_href"] = "/en/matches/abcd1234/Tottenham-Hotspur-Brighton-and-Hove-Albion-May-25-2025"
+
+    diff = schedule_index.update(new_rows)
+
+    assert diff == {"completed": [get_fixture_key(played)], "changed": [get_fixture_key(corrected)]}
+    assert [entry["match_url"] for entry in schedule_index.get_pending()] == [
+        "https://fbref.com" + corrected["match_report_href"], "https://fbref.com" + played["match_report_href"]]
+    assert schedule_index.get_changed_urls() == {"https://fbref.com" + corrected["match_report_href"]}
+    assert [entry["match_url"] for entry in schedule_index.get_pending(end_date="2025-05-24")] == [
+        "https://fbref.com" + corrected["match_report_href"]]
+
+
+def test_concurrent_s3_writers_keep_each_others_scraped_matches(schedule_rows, s3_client):
+    key = "raw/fbref_data/2024-2025/schedule_index.json"
+    seed = S3ScheduleIndex(s3_client, sc.S3_BUCKET_NAME, key, 2024)
+    seed.update(schedule_rows, start_date="2025-05-04")
+    seed.save()
+    pending_urls = [entry["match_url"] for entry in seed.get_pending()]
+
+    # Two workers read the index before either of them saves
+    workers = [S3ScheduleIndex(s3_client, sc.S3_BUCKET_NAME, key, 2024) for _ in range(2)]
+    workers[0].mark_scraped(pending_urls[:2])
+    workers[1].mark_scraped(pending_urls[2:])
+    for worker in workers:
+        worker.save()
+
+    assert S3ScheduleIndex(s3_client, sc.S3_BUCKET_NAME, key, 2024).get_pending() == []
+    assert workers[1].get_pending() == []
+
+
+def test_dates_without_zero_padding_are_normalised(schedule_rows):
+    rows = [{"td": {"date": date_str, "match_report": "Match Report"}, "match_report_href": f"/en/matches/{date_str}"}
+            for date_str in ["2024-08-16", "2024-09-14", "2024-10-05"]]
+    assert [date_str for _, _, date_str in get_match_tasks_in_date_range(rows, "2024-8-20", "2024-10-1")] == \
+        ["2024-09-14"]
+
+    padded = get_match_tasks_in_date_range(schedule_rows, "2024-08-20", "2024-10-01")
+
+    assert [date_str for _, _, date_str in get_match_tasks_in_date_range(schedule_rows, "2024-8-20", "2024-10-1")] \
+        == [date_str for _, _, date_str in padded]
+    assert padded and all("2024-08-20" <= date_str <= "2024-10-01" for _, _, date_str in padded)
@@ -0,0 +1,108 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+from utils.selenium_utils import ChromeDriverPool, get_chrome_options
+
+
+class FakeDriver:
+    """
+    Stand-in for a chrome webdriver that records the pages it loads. Set crash_on to a url to simulate a crash
+    """
+
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+        self.urls = []
+        self.quit_called = False
+        self.page_source = None
+
+    def get(self, url):
+        if url == self.crash_on:
+            raise WebDriverException("chrome not reachable")
+        self.urls.append(url)
+        self.page_source = f"<html>{url}</html>"
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def fake_drivers():
+    return []
+
+
+@pytest.fixture
+def driver_factory(fake_drivers):
+    def create_fake_driver(crash_on=None):
+        driver = FakeDriver(crash_on=crash_on)
+        fake_drivers.append(driver)
+        return driver
+    return create_fake_driver
+
+
+def test_chrome_options_are_headless():
+    assert "--headless" in get_chrome_options().arguments
+
+
+def test_pool_launches_driver_lazily_and_reuses_it(fake_drivers, driver_factory):
+    pool = ChromeDriverPool(size=1, max_pages=10, driver_factory=driver_factory)
+    assert fake_drivers == []
+
+    assert pool.get_page_source("https://fbref.com/a") == "<html>https://fbref.com/a</html>"
+    assert pool.get_page_source("https://fbref.com/b") == "<html>https://fbref.com/b</html>"
+
+    assert len(fake_drivers) == 1
+    assert fake_drivers[0].urls == ["https://fbref.com/a", "https://fbref.com/b"]
+    assert not fake_drivers[0].quit_called
+
+
+def test_pool_recycles_driver_after_max_pages(fake_drivers, driver_factory):
+    pool = ChromeDriverPool(size=1, max_pages=2, driver_factory=driver_factory)
+
+    for page in range(5):
+        pool.get_page_source(f"https://fbref.com/{page}")
+
+    assert [len(driver.urls) for driver in fake_drivers] == [2, 2, 1]
+    assert [driver.quit_called for driver in fake_drivers] == [True, True, False]
+
+
+def test_pool_replaces_crashed_driver_and_retries(fake_drivers, driver_factory):
+    # Only the first driver crashes
+    crash_on = iter(["https://fbref.com/a", None])
+    pool = ChromeDriverPool(size=1, driver_factory=lambda: driver_factory(crash_on=next(crash_on)))
+
+    assert pool.get_page_source("https://fbref.com/a") == "<html>https://fbref.com/a</html>"
+    assert len(fake_drivers) == 2
+    assert fake_drivers[0].quit_called
+    assert not fake_drivers[1].quit_called
+
+
+def test_pool_raises_if_retry_also_crashes(fake_drivers, driver_factory):
+    pool = ChromeDriverPool(size=1, driver_factory=lambda: driver_factory(crash_on="https://fbref.com/a"))
+
+    with pytest.raises(WebDriverException):
+        pool.get_page_source("https://fbref.com/a")
+    assert len(fake_drivers) == 2
+    assert all(driver.quit_called for driver in fake_drivers)
+
+
+def test_driver_is_quit_and_not_returned_when_the_page_load_is_interrupted(fake_drivers, driver_factory):
+    pool = ChromeDriverPool(size=1, driver_factory=driver_factory)
+    pool.get_page_source("https://fbref.com/a")
+
+    def interrupted_get(url):
+        raise KeyboardInterrupt()
+    fake_drivers[0].get = interrupted_get
+
+    with pytest.raises(KeyboardInterrupt):
+        pool.get_page_source("https://fbref.com/b")
+
+    assert fake_drivers[0].quit_called
+    assert pool.idle_drivers.empty()
+
+
+def test_close_quits_idle_drivers(fake_drivers, driver_factory):
+    pool = ChromeDriverPool(size=1, driver_factory=driver_factory)
+    pool.get_page_source("https://fbref.com/a")
+
+    pool.close()
+
+    assert fake_drivers[0].quit_called
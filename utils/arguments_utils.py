@@ -1,8 +1,83 @@
 import argparse
+from scrapers.scraper_constants import ScraperConstants as sc
 
-def get_fbref_arguments():
+def get_fbref_arguments(argv: list = None):
     parser = argparse.ArgumentParser(description="Run FBRef scraper.")
-    parser.add_argument("--season", type=int, help="Season year, e.g. 2024")
+    parser.add_argument("--season", type=int, nargs="+", help="Season year(s), e.g. 2024 or 2021 2022 2023")
+    parser.add_argument("--competition", type=str, choices=list(sc.FBREF_COMPETITIONS),
+                        help="Competition to scrape, defaults to the premier league")
     parser.add_argument("--start_date", type=str, help="Start date in YYYY-MM-DD")
     parser.add_argument("--end_date", type=str, help="End date in YYYY-MM-DD")
-    return parser.parse_args()
\ No newline at end of file
+    parser.add_argument("--max_workers", type=int, help="Number of match reports to scrape concurrently")
+    parser.add_argument("--parse_workers", type=int,
+                        help="Number of processes parsing match reports, 0 parses in the download threads")
+    parser.add_argument("--batch_size", type=int, help="Number of matches written to S3 at a time")
+    parser.add_argument("--ledger_dir", type=str,
+                        help="Local directory for the progress ledger and schedule index, they are kept in S3 next to "
+                             "the season if not set")
+    parser.add_argument("--cache_dir", type=str, help="Local directory to cache downloaded html pages in")
+    parser.add_argument("--http2", action="store_true", help="Fetch pages over HTTP/2 (requires httpx[http2])")
+    parser.add_argument("--run_mode", type=str, choices=["threads", "asyncio"],
+                        help="'threads' scrapes match reports in a thread pool, 'asyncio' overlaps the fetches and "
+                             "the S3 writes of every season in one event loop (the 'csv' write mode always uses "
+                             "threads)")
+    parser.add_argument("--write_mode", type=str, choices=["parts", "csv", "partitioned"],
+                        help="'parts' appends a part file to the season manifest, 'csv' rewrites the season file, "
+                             "'partitioned' writes season=YYYY/gameweek=NN/ parquet partitions")
+    parser.add_argument("--output_format", type=str, choices=["csv", "parquet"],
+                        help="File format of the season parts. Parquet parts are written with the typed FbRefSchema")
+    parser.add_argument("--compression", type=str, choices=["snappy", "zstd"], help="Parquet compression codec")
+    parser.add_argument("--row_group_size", type=int, help="Maximum number of rows in each parquet row group")
+    parser.add_argument("--upsert", action="store_true",
+                        help="Replace the rows of the season with the same key instead of appending the scraped rows "
+                             "(the 'partitioned' write mode always appends)")
+    parser.add_argument("--metrics_format", type=str, choices=["json", "emf"],
+                        help="Write the per stage metrics of the run as a json summary or as CloudWatch EMF")
+    parser.add_argument("--metrics_path", type=str, help="File to write the metrics to, stdout if not set")
+    parser.add_argument("--profile", type=str, choices=["cprofile", "pyinstrument"], help="Profile the run")
+    parser.add_argument("--profile_path", type=str,
+                        help="File to write the profile to (.pstats for cprofile, .html or .txt for pyinstrument)")
+    return parser.parse_args(argv)
+
+def get_football_data_arguments(argv: list = None):
+    parser = argparse.ArgumentParser(description="Download football-data.co.uk seasons to S3.")
+    parser.add_argument("--start_season", type=str, default="9394", help="First season to download, e.g. 9394")
+    parser.add_argument("--end_season", type=str, default="2425", help="Season to stop downloads at (exclusive)")
+    parser.add_argument("--overwrite", action="store_true", help="Download seasons that are already in S3")
+    parser.add_argument("--max_workers", type=int, help="Number of seasons to download concurrently")
+    return parser.parse_args(argv)
+
+def get_football_data_dataset_arguments(argv: list = None):
+    parser = argparse.ArgumentParser(description="Build the typed football-data.co.uk dataset from the raw seasons.")
+    parser.add_argument("--season", type=str, nargs="+",
+                        help="Season(s) to build, e.g. 9394 2324. Defaults to every season file in S3")
+    parser.add_argument("--max_workers", type=int, help="Number of season files read concurrently")
+    parser.add_argument("--output_dir", type=str,
+                        help="Local directory to write the dataset to, it is written to S3 if not set")
+    parser.add_argument("--compression", type=str, choices=["snappy", "zstd"], help="Parquet compression codec")
+    return parser.parse_args(argv)
+
+def get_orchestrator_arguments(argv: list = None):
+    parser = argparse.ArgumentParser(description="Publish fbref work items to a queue or run a queue worker.")
+    queue_group = parser.add_mutually_exclusive_group(required=True)
+    queue_group.add_argument("--queue_url", type=str, help="Url of the SQS work queue")
+    queue_group.add_argument("--queue_path", type=str, help="Path of a local SQLite work queue")
+    parser.add_argument("--visibility_timeout", type=int, help="Seconds a claimed work item is leased to a worker")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    publish_parser = subparsers.add_parser("publish", help="Expand competitions and seasons into match work items")
+    publish_parser.add_argument("--competitions", type=str, nargs="+", default=[sc.FBREF_DEFAULT_COMPETITION],
+                                choices=list(sc.FBREF_COMPETITIONS), help="Competitions to scrape")
+    publish_parser.add_argument("--seasons", type=int, nargs="+", required=True, help="Season years, e.g. 2023 2024")
+    publish_parser.add_argument("--start_date", type=str, help="Start date in YYYY-MM-DD")
+    publish_parser.add_argument("--end_date", type=str, help="End date in YYYY-MM-DD")
+
+    work_parser = subparsers.add_parser("work", help="Scrape work items from the queue until it is empty")
+    work_parser.add_argument("--max_workers", type=int, help="Number of match reports to scrape concurrently")
+    work_parser.add_argument("--idle_polls", type=int, default=3, help="Number of empty polls before stopping")
+    work_parser.add_argument("--requests_per_minute", type=float,
+                             help="This worker's share of the fbref.com request budget")
+    work_parser.add_argument("--output_format", type=str, choices=["csv", "parquet"],
+                             help="File format of the season parts")
+    work_parser.add_argument("--compression", type=str, choices=["snappy", "zstd"], help="Parquet compression codec")
+    return parser.parse_args(argv)
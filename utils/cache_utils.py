@@ -0,0 +1,233 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# A finished match report shows the final score of each team in the scorebox
+MATCH_REPORT_SCORE_PATTERN = re.compile(rb'<div class="score">\d+</div>')
+
+
+def get_cache_ttl(url: str, content: bytes, schedule_ttl: int, pending_match_ttl: int, default_ttl: int):
+    """
+    The TTL policy for cached fbref pages
+    1) The scores and fixtures page changes every match day, so it expires quickly
+    2) A match report with a score will never change, so it never expires
+    3) A match report without a score (match not played yet) expires quickly
+    :param url: The url of the page
+    :param content: The html of the page
+    :param schedule_ttl: Seconds before a scores and fixtures page expires
+    :param pending_match_ttl: Seconds before a match report without a score expires
+    :param default_ttl: Seconds before any other page expires
+    :return: Number of seconds before the page expires, or None if it never expires
+    """
+    if "/schedule/" in url:
+        return schedule_ttl
+    if "/matches/" in url:
+        return None if MATCH_REPORT_SCORE_PATTERN.search(content) else pending_match_ttl
+    return default_ttl
+
+
+class HtmlCache:
+    """
+    On-disk cache of downloaded html pages.
+    1) The html is stored gzip compressed under objects/ and named by the sha256 of its content, so pages with the
+    same content are only stored once
+    2) Each url has a json entry under entries/ (named by the sha256 of the url) that points to the content and stores
+    the ETag / Last-Modified headers from the response and when the page expires
+    3) Expired pages with an ETag or Last-Modified header can be revalidated with a conditional request
+    4) When the total size of the stored html exceeds max_size_bytes, the least recently used entries are evicted.
+    The total is kept as the html is stored and evicted, so the cache directory is only scanned on startup and when
+    the limit is exceeded
+    """
+
+    def __init__(self, directory: str, max_size_bytes: int, schedule_ttl: int = 6 * 60 * 60,
+                 pending_match_ttl: int = 60 * 60, default_ttl: int = 24 * 60 * 60):
+        """
+        :param directory: Local directory the cache is stored in
+        :param max_size_bytes: Maximum total size of the compressed html in the cache
+        :param schedule_ttl: Seconds before a scores and fixtures page expires
+        :param pending_match_ttl: Seconds before a match report without a score expires
+        :param default_ttl: Seconds before any other page expires
+        """
+        self.directory = Path(directory)
+        self.entries_dir = self.directory / "entries"
+        self.objects_dir = self.directory / "objects"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.schedule_ttl = schedule_ttl
+        self.pending_match_ttl = pending_match_ttl
+        self.default_ttl = default_ttl
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+        self.lock = threading.Lock()
+        self.total_size = sum(self._get_object_sizes().values())
+
+    def _get_object_sizes(self) -> dict:
+        return {path.name: path.stat().st_size for path in self.objects_dir.glob("*.html.gz")}
+
+    def _entry_path(self, url: str) -> Path:
+        return self.entries_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def _object_path(self, content_hash: str) -> Path:
+        return self.objects_dir / f"{content_hash}.html.gz"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _touch(path: Path):
+        # The modification time of an entry records when it was last used
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            # Evicted by another thread since it was read or written, the page is still returned
+            pass
+
+    def _increment(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _read_entry(self, url: str):
+        try:
+            return json.loads(self._entry_path(url).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, url: str):
+        """
+        Looks up the url in the cache. A fresh entry counts as a hit and a missing or expired entry counts as a miss
+        :param url: The url of the page
+        :return: None if the url is not cached, otherwise a dict with the content, etag, last_modified and
+        is_fresh (False if the entry has expired and should be revalidated)
+        """
+        entry = self._read_entry(url)
+        if entry is None:
+            self._increment("misses")
+            return None
+
+        try:
+            content = gzip.decompress(self._object_path(entry["content_hash"]).read_bytes())
+        except (FileNotFoundError, OSError, EOFError):
+            self._increment("misses")
+            return None
+
+        entry["content"] = content
+        entry["is_fresh"] = entry["expires_at"] is None or time.time() < entry["expires_at"]
+        self._increment("hits" if entry["is_fresh"] else "misses")
+
+        # Mark the entry as recently used for eviction
+        self._touch(self._entry_path(url))
+        return entry
+
+    @staticmethod
+    def get_conditional_headers(entry) -> dict:
+        """
+        :param entry: The entry returned by get
+        :return: Headers for a conditional request to revalidate the entry
+        """
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _get_expiry(self, url: str, content: bytes):
+        ttl = get_cache_ttl(url, content, self.schedule_ttl, self.pending_match_ttl, self.default_ttl)
+        return None if ttl is None else time.time() + ttl
+
+    def put(self, url: str, content, etag: str = None, last_modified: str = None):
+        """
+        Stores the page in the cache
+        :param url: The url of the page
+        :param content: The html of the page (bytes or str)
+        :param etag: The ETag header of the response
+        :param last_modified: The Last-Modified header of the response
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(content_hash)
+        if not object_path.exists():
+            data = gzip.compress(content)
+            with self.lock:
+                # Checked again under the lock, so content stored by two threads at once is only counted once
+                if not object_path.exists():
+                    self._write_atomic(object_path, data)
+                    self.total_size += len(data)
+
+        entry = {
+            "url": url,
+            "content_hash": content_hash,
+            "etag": etag if isinstance(etag, str) else None,
+            "last_modified": last_modified if isinstance(last_modified, str) else None,
+            "fetched_at": time.time(),
+            "expires_at": self._get_expiry(url, content),
+        }
+        self._write_atomic(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+        self._touch(self._entry_path(url))
+        self._increment("stored")
+        self.evict()
+
+    def refresh(self, url: str, content: bytes):
+        """
+        Resets the expiry of an entry after the server confirmed it has not changed (304 response)
+        :param url: The url of the page
+        :param content: The cached html of the page
+        """
+        entry = self._read_entry(url)
+        if entry is None:
+            return
+        entry["fetched_at"] = time.time()
+        entry["expires_at"] = self._get_expiry(url, content)
+        self._write_atomic(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+        self._increment("revalidated")
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the compressed html in the cache fits in max_size_bytes
+        """
+        with self.lock:
+            if self.total_size <= self.max_size_bytes:
+                return
+            # The sizes are read from the directory, in case another process shares the cache
+            object_sizes = self._get_object_sizes()
+            total_size = sum(object_sizes.values())
+
+            entries = sorted(self.entries_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+            content_hashes = {}
+            for entry_path in entries:
+                content_hashes[entry_path] = json.loads(entry_path.read_text(encoding="utf-8"))["content_hash"]
+            # Number of urls that point to each content
+            references = Counter(content_hashes.values())
+
+            for entry_path in entries:
+                if total_size <= self.max_size_bytes:
+                    break
+                content_hash = content_hashes.pop(entry_path)
+                entry_path.unlink()
+                self.stats["evicted"] += 1
+
+                # Only delete the content if no other url points to it
+                references[content_hash] -= 1
+                if not references[content_hash]:
+                    object_name = self._object_path(content_hash).name
+                    total_size -= object_sizes.pop(object_name, 0)
+                    self._object_path(content_hash).unlink(missing_ok=True)
+            self.total_size = total_size
+
+    def log_summary(self):
+        logger.info(f"HTML cache summary: {self.stats}")
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Errors raised by either backend when a request fails
+HTTP_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+# Server errors that are worth retrying. 429 and 503 are left to the rate limiter of the scraper unless they are
+# passed in, so the backoff is shared with the other requests to the host
+DEFAULT_RETRY_STATUS_CODES = (500, 502, 504)
+
+
+class HttpClient:
+    """
+    Connection pooled HTTP client shared by the scrapers, so requests reuse keep-alive connections instead of paying
+    for a new TCP and TLS handshake every time
+    1) requests.Session with a connection pool sized to the number of concurrent fetches
+    2) Compressed responses (gzip/deflate, and br if brotli is installed)
+    3) Connect and read timeouts on every request, so a stalled connection can not hang a task
+    4) Retries with exponential backoff of connection errors and server errors. Only idempotent GET and HEAD requests
+    are retried
+    5) Optional HTTP/2 through httpx (requires pip install httpx[http2])
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 10, read_timeout: float = 30,
+                 max_retries: int = 3, backoff_factor: float = 1, retry_status_codes=DEFAULT_RETRY_STATUS_CODES,
+                 http2: bool = False):
+        """
+        :param pool_size: Maximum number of connections kept open to a host, the number of concurrent fetches
+        :param connect_timeout: Seconds to wait for a connection to the server
+        :param read_timeout: Seconds to wait between bytes of the response
+        :param max_retries: Number of times a failed request is retried
+        :param backoff_factor: Retries wait backoff_factor * 2 ** (retry - 1) seconds, or the response's Retry-After
+        :param retry_status_codes: Response status codes that are retried
+        :param http2: Use httpx with HTTP/2 instead of requests
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.http2 = http2
+        self.headers = {"Accept-Encoding": ACCEPT_ENCODING}
+
+        if http2:
+            if httpx is None:
+                raise ImportError("HTTP/2 requires pip install httpx[http2]")
+            # httpx only retries failed connections, server errors are left to the caller
+            transport = httpx.HTTPTransport(http2=True, retries=max_retries,
+                                            limits=httpx.Limits(max_connections=pool_size,
+                                                                max_keepalive_connections=pool_size))
+            self.session = httpx.Client(transport=transport, headers=self.headers, follow_redirects=True,
+                                        timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+        else:
+            retry = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=retry_status_codes,
+                          allowed_methods=frozenset(["GET", "HEAD"]), respect_retry_after_header=True,
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def get(self, url: str, headers: dict = None, timeout=None):
+        """
+        Sends a GET request through the pooled connections
+        :param url: The url to request
+        :param headers: Optional extra headers, e.g. conditional request headers
+        :param timeout: Optional (connect, read) timeout in seconds to use instead of the client's
+        :return: The response (requests.Response, or httpx.Response with HTTP/2) with status_code, headers and the
+        decompressed content
+        """
+        timeout = timeout or self.timeout
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        if self.http2:
+            return self.session.get(url, headers=headers,
+                                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+        return self.session.get(url, headers=headers, timeout=(connect_timeout, read_timeout))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncHttpClient:
+    """
+    Asyncio counterpart of HttpClient for the asyncio run mode of the scrapers
+    1) httpx.AsyncClient with a connection pool of pool_size connections if httpx is installed, with optional HTTP/2
+    2) Otherwise every request is sent through a pooled HttpClient in a worker thread, so the event loop is never
+    blocked on the network
+    Server errors in retry_status_codes are retried with the same backoff as HttpClient in both cases
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 10, read_timeout: float = 30,
+                 max_retries: int = 3, backoff_factor: float = 1, retry_status_codes=DEFAULT_RETRY_STATUS_CODES,
+                 http2: bool = False):
+        """
+        See HttpClient for the parameters
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.retry_status_codes = retry_status_codes
+
+        if httpx is None:
+            if http2:
+                raise ImportError("HTTP/2 requires pip install httpx[http2]")
+            self.session = None
+            self.client = HttpClient(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                     max_retries=max_retries, backoff_factor=backoff_factor,
+                                     retry_status_codes=retry_status_codes)
+        else:
+            self.client = None
+            transport = httpx.AsyncHTTPTransport(http2=http2, retries=max_retries,
+                                                 limits=httpx.Limits(max_connections=pool_size,
+                                                                     max_keepalive_connections=pool_size))
+            self.session = httpx.AsyncClient(transport=transport, headers={"Accept-Encoding": ACCEPT_ENCODING},
+                                             follow_redirects=True,
+                                             timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    async def get(self, url: str, headers: dict = None, timeout=None):
+        """
+        Sends a GET request through the pooled connections, see HttpClient.get
+        """
+        if self.session is None:
+            return await asyncio.to_thread(self.client.get, url, headers=headers, timeout=timeout)
+
+        timeout = timeout or self.timeout
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        for retry in range(self.max_retries + 1):
+            response = await self.session.get(url, headers=headers,
+                                              timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+            if response.status_code not in self.retry_status_codes or retry == self.max_retries:
+                return response
+            await asyncio.sleep(self.backoff_factor * 2 ** retry)
+
+    async def aclose(self):
+        if self.session is None:
+            self.client.close()
+        else:
+            await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
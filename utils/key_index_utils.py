@@ -0,0 +1,169 @@
+import bisect
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def hash_keys(df: pd.DataFrame, key_columns: list) -> list:
+    """
+    Hashes the key columns of every row, vectorized with pandas. The values are compared as text, so the same row
+    hashes the same whether it was scraped, read back from a csv part or read from a typed parquet part. Rows with
+    the same key in a dataframe (e.g. two players with the same name in a match) are told apart by their occurrence
+    :param df: The rows to hash
+    :param key_columns: The columns that identify a row, missing columns are hashed as empty values
+    :return: List of 16 character hex digests, one for each row
+    """
+    keys = pd.DataFrame(index=range(len(df)))
+    for column in key_columns:
+        values = df[column].reset_index(drop=True) if column in df else pd.Series([None] * len(df))
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime("%Y-%m-%d")
+        keys[column] = values.astype(object).where(values.notna(), "").astype(str)
+    keys["occurrence"] = keys.groupby(key_columns, sort=False).cumcount() if key_columns else 0
+    return [format(value, "016x") for value in pd.util.hash_pandas_object(keys, index=False)]
+
+
+def get_shard_ids(df: pd.DataFrame, shard_column: str = "date") -> list:
+    """
+    Names the index shard of every row. Rows are sharded by match date, so the rows of a scrape run (and the earlier
+    rows they replace, which have the same date in their key) fall in the few shards of the dates it scraped
+    :param df: The rows to shard
+    :param shard_column: The column the shards are named after, rows without a value are in the "undated" shard
+    :return: List of shard ids, one for each row
+    """
+    if shard_column not in df:
+        return ["undated"] * len(df)
+    values = df[shard_column].reset_index(drop=True)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.strftime("%Y-%m-%d")
+    return values.astype(object).where(values.notna(), "undated").astype(str).tolist()
+
+
+class KeyIndex:
+    """
+    Hashed index of the rows of a season dataset, so the rows replaced by scraped rows are looked up by their key
+    hash instead of rescanning the season.
+    The keys are split into shards (see get_shard_ids), so a writer only has to load and save the shards of the rows it
+    writes: {"parts": [indexed part keys], "shards": {shard id: {key hash: [part key, row number]}}}, where the
+    location is the row's current version. Rows of an indexed part that the index points elsewhere have been replaced
+    by a later write. Parts that are not in "parts" were written before the index and are read as they are.
+    The shards that were changed since the index was loaded are tracked in changed_shards
+    """
+
+    def __init__(self, data: dict = None):
+        data = data or {}
+        self.parts = data.get("parts", [])
+        self.shards = data.get("shards", {})
+        self.changed_shards = set()
+
+    def upsert(self, hashes: list, part_key: str, rows: list = None, shard_ids: list = None) -> dict:
+        """
+        Points the keys at their new location
+        :param hashes: Key hashes of the new rows, see hash_keys
+        :param part_key: The key of the object the rows were written to
+        :param rows: Row numbers of the new rows in the object, defaults to 0 to len(hashes) - 1
+        :param shard_ids: Shard of each new row, see get_shard_ids. Defaults to a single shard
+        :return: Dict of {"inserted": number of new keys, "replaced": number of keys that already had a row,
+        "superseded": {part key: [row numbers]} of the replaced rows}
+        """
+        rows = range(len(hashes)) if rows is None else rows
+        shard_ids = [""] * len(hashes) if shard_ids is None else shard_ids
+        stats = {"inserted": 0, "replaced": 0, "superseded": {}}
+        for key_hash, row, shard_id in zip(hashes, rows, shard_ids):
+            shard = self.shards.setdefault(shard_id, {})
+            previous = shard.get(key_hash)
+            if previous is None:
+                stats["inserted"] += 1
+            else:
+                stats["replaced"] += 1
+                stats["superseded"].setdefault(previous[0], []).append(previous[1])
+            shard[key_hash] = [part_key, int(row)]
+            self.changed_shards.add(shard_id)
+        if part_key not in self.parts:
+            self.parts.append(part_key)
+        return stats
+
+    def remove_rows(self, part_key: str, rows: list):
+        """
+        Renumbers the rows of a part after the rows were deleted from it, the keys of the deleted rows are left to be
+        upserted again
+        :param part_key: The key of the part
+        :param rows: Sorted row numbers that were deleted
+        """
+        if not rows:
+            return
+        for shard_id, shard in self.shards.items():
+            for location in shard.values():
+                if location[0] == part_key:
+                    location[1] -= bisect.bisect_left(rows, location[1])
+                    self.changed_shards.add(shard_id)
+
+    def move_rows(self, moves: dict):
+        """
+        Points the keys at the rows' new location after their parts were rewritten (e.g. merged by a compaction) and
+        replaces the rewritten parts in "parts"
+        :param moves: {old part key: {old row number: [new part key, new row number]}}, every current row of the old
+        parts has to be moved
+        """
+        for shard_id, shard in self.shards.items():
+            for location in shard.values():
+                if location[0] in moves:
+                    location[0], location[1] = moves[location[0]][location[1]]
+                    self.changed_shards.add(shard_id)
+        new_parts = [new_part for rows in moves.values() for new_part, _ in rows.values()]
+        self.parts = [part_key for part_key in self.parts if part_key not in moves] + \
+            [part_key for part_key in dict.fromkeys(new_parts) if part_key not in self.parts]
+
+    def lookup(self, hashes: list, shard_ids: list = None) -> list:
+        """
+        :return: The [part key, row number] of each key hash, None for keys that are not in the index
+        """
+        shard_ids = [""] * len(hashes) if shard_ids is None else shard_ids
+        return [self.shards.get(shard_id, {}).get(key_hash) for key_hash, shard_id in zip(hashes, shard_ids)]
+
+    def get_current_rows(self) -> dict:
+        """
+        :return: {part key: sorted row numbers} of the current version of every key in the loaded shards
+        """
+        current = {part_key: [] for part_key in self.parts}
+        for shard in self.shards.values():
+            for part_key, row in shard.values():
+                current.setdefault(part_key, []).append(row)
+        return {part_key: sorted(rows) for part_key, rows in current.items()}
+
+    def filter_part(self, part_key: str, part_df: pd.DataFrame, current_rows: dict = None) -> pd.DataFrame:
+        """
+        Drops the rows of a part that were replaced by a later write. Every shard has to be loaded
+        :param part_key: The key of the part
+        :param part_df: The rows of the part, in the order they were written
+        :param current_rows: Optional result of get_current_rows, to share between the parts of a season
+        """
+        if part_key not in self.parts:
+            return part_df
+        current_rows = self.get_current_rows() if current_rows is None else current_rows
+        return part_df.iloc[current_rows.get(part_key, [])]
+
+    def to_dict(self) -> dict:
+        return {"parts": self.parts, "shards": self.shards}
+
+
+def upsert_dataframe(existing_df: pd.DataFrame, new_df: pd.DataFrame, key_index: KeyIndex, part_key: str,
+                     key_columns: list) -> tuple:
+    """
+    Upserts rows into a dataset object that is rewritten as a whole (e.g. the season csv). The rows that are replaced
+    are found from the key index, so only the new rows are hashed, but the object is still read and rewritten whole
+    :param existing_df: The rows of the object, in the order the index was built for
+    :param new_df: The rows to upsert
+    :param key_index: The KeyIndex of the object, updated in place
+    :param part_key: The key of the object
+    :param key_columns: The columns that identify a row
+    :return: (updated dataframe, stats of KeyIndex.upsert)
+    """
+    hashes = hash_keys(new_df, key_columns)
+    replaced_rows = sorted({location[1] for location in key_index.lookup(hashes)
+                            if location is not None and location[0] == part_key})
+    kept_df = existing_df.drop(index=existing_df.index[replaced_rows])
+    key_index.remove_rows(part_key, replaced_rows)
+    stats = key_index.upsert(hashes, part_key, rows=range(len(kept_df), len(kept_df) + len(hashes)))
+    return pd.concat([kept_df, new_df], ignore_index=True), stats
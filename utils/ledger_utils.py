@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from utils.s3_utils import read_json_from_s3, update_json_in_s3
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class ProgressLedger:
+    """
+    Records the status of every match scraped for a season, so a restarted run can skip the matches that are already
+    written and retry the ones that failed.
+    The ledger is a json document of {"season": YYYY, "matches": {match_url: {"status", "updated_at", "attempts",
+    "error"}}}. Subclasses decide where the document is stored.
+    Saving merges the matches marked since the last save into the stored document, so several workers can share the
+    ledger of a season.
+    Matches that failed max_attempts times are given up on instead of being retried by every run.
+    """
+
+    def __init__(self, season: int, max_attempts: int = None):
+        """
+        :param season: YYYY - the starting year of the season
+        :param max_attempts: Number of attempts after which a failed match is no longer retried, no limit if not given
+        """
+        self.season = season
+        self.max_attempts = max_attempts
+        data = self._read() or {}
+        self.matches = data.get("matches", {})
+        self.changes = {}
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _update(self, update) -> dict:
+        """
+        Applies the update function to the stored document and writes the result
+        """
+        raise NotImplementedError
+
+    def save(self):
+        changes = self.changes
+        data = self._update(lambda data: {"season": self.season, "matches": {**(data or {}).get("matches", {}),
+                                                                             **changes}})
+        self.matches = data["matches"]
+        self.changes = {}
+
+    def _mark(self, match_url: str, status: str, error: str = None):
+        entry = self.matches.get(match_url, {"attempts": 0})
+        self.matches[match_url] = self.changes[match_url] = {
+            "status": status,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "attempts": entry["attempts"] + 1,
+            "error": error,
+        }
+
+    def mark_completed(self, match_urls: list):
+        """
+        Marks the matches as completed, this should only be called once their data has been written
+        """
+        for match_url in match_urls:
+            self._mark(match_url, COMPLETED)
+
+    def mark_failed(self, match_url: str, error):
+        self._mark(match_url, FAILED, error=str(error))
+
+    def is_completed(self, match_url: str) -> bool:
+        return self.matches.get(match_url, {}).get("status") == COMPLETED
+
+    def get_urls(self, status: str) -> list:
+        """
+        :param status: 'completed' or 'failed'
+        :return: The urls of the matches with the status
+        """
+        return [match_url for match_url, entry in self.matches.items() if entry["status"] == status]
+
+    def is_exhausted(self, match_url: str) -> bool:
+        """
+        :return: True if the match failed and has used up its max_attempts
+        """
+        entry = self.matches.get(match_url, {})
+        return entry.get("status") == FAILED and self.max_attempts is not None and \
+            entry["attempts"] >= self.max_attempts
+
+    def get_retry_urls(self) -> list:
+        """
+        :return: The urls of the failed matches that have attempts left
+        """
+        return [match_url for match_url in self.get_urls(FAILED) if not self.is_exhausted(match_url)]
+
+    def get_exhausted_urls(self) -> list:
+        """
+        :return: The urls of the failed matches that are no longer retried
+        """
+        return [match_url for match_url in self.get_urls(FAILED) if self.is_exhausted(match_url)]
+
+    def get_summary(self) -> dict:
+        """
+        :return: Dict of {status: number of matches}
+        """
+        summary = {COMPLETED: 0, FAILED: 0}
+        for entry in self.matches.values():
+            summary[entry["status"]] += 1
+        return summary
+
+
+class LocalProgressLedger(ProgressLedger):
+    """
+    Progress ledger stored as a json file in a local directory
+    """
+
+    def __init__(self, directory: str, season: int, max_attempts: int = None):
+        """
+        :param directory: Local directory the ledger files are stored in, one file per season
+        :param season: YYYY - the starting year of the season
+        :param max_attempts: Number of attempts after which a failed match is no longer retried, no limit if not given
+        """
+        self.path = Path(directory) / f"{season}-{season + 1}.json"
+        super().__init__(season, max_attempts=max_attempts)
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def _update(self, update) -> dict:
+        data = update(self._read())
+
+        # Replace the file in one step so a crash never leaves a partial ledger
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        return data
+
+
+class S3ProgressLedger(ProgressLedger):
+    """
+    Progress ledger stored as a json object in S3
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, season: int, max_attempts: int = None):
+        """
+        :param s3_client: Boto3 S3 client
+        :param bucket: Name of the S3 bucket
+        :param key: Key of the ledger object
+        :param season: YYYY - the starting year of the season
+        :param max_attempts: Number of attempts after which a failed match is no longer retried, no limit if not given
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        super().__init__(season, max_attempts=max_attempts)
+
+    def _read(self):
+        return read_json_from_s3(self.s3_client, bucket=self.bucket, key=self.key)
+
+    def _update(self, update) -> dict:
+        return update_json_in_s3(self.s3_client, bucket=self.bucket, key=self.key, update=update)
@@ -0,0 +1,221 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import math
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRecorder:
+    """
+    Collects the timings, byte counts and counters of the stages of a scraper run so a slow run can be broken down
+    into time spent waiting on the rate limiter, downloading (requests or selenium), parsing and talking to S3.
+    Safe to share between the download threads.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.bytes = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Records a duration for the stage
+        :param stage: Name of the stage, e.g. 'fetch.requests'
+        :param seconds: The time taken
+        """
+        with self.lock:
+            self.durations.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Times the code in the with block as one call of the stage, also when it raises
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add_bytes(self, stage: str, num_bytes: int):
+        with self.lock:
+            self.bytes[stage] = self.bytes.get(stage, 0) + num_bytes
+
+    def increment(self, counter: str, value: int = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.durations = {}
+            self.bytes = {}
+            self.counters = {}
+
+    @staticmethod
+    def get_percentile(sorted_values: list, percentile: float) -> float:
+        """
+        Nearest rank percentile of a sorted list
+        """
+        rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+        return sorted_values[rank - 1]
+
+    def get_summary(self) -> dict:
+        """
+        :return: Dict of {"stages": {stage: {"count", "total_seconds", "p50_seconds", "p95_seconds", "max_seconds",
+        "bytes"}}, "counters": {counter: value}}
+        """
+        with self.lock:
+            durations = {stage: sorted(values) for stage, values in self.durations.items()}
+            stage_bytes = dict(self.bytes)
+            counters = dict(self.counters)
+
+        stages = {}
+        for stage in sorted(set(durations) | set(stage_bytes)):
+            values = durations.get(stage, [])
+            stages[stage] = {
+                "count": len(values),
+                "total_seconds": round(sum(values), 6),
+                "p50_seconds": round(self.get_percentile(values, 50), 6) if values else None,
+                "p95_seconds": round(self.get_percentile(values, 95), 6) if values else None,
+                "max_seconds": round(values[-1], 6) if values else None,
+                "bytes": stage_bytes.get(stage, 0),
+            }
+        return {"stages": stages, "counters": counters}
+
+    def log_summary(self):
+        summary = self.get_summary()
+        for stage, stats in summary["stages"].items():
+            if stats["count"]:
+                logger.info(f"⏱️ {stage}: {stats['count']} calls, total {stats['total_seconds']:.2f}s, "
+                            f"p50 {stats['p50_seconds'] * 1000:.1f}ms, p95 {stats['p95_seconds'] * 1000:.1f}ms, "
+                            f"{stats['bytes'] / 1024:.0f}KB")
+            else:
+                logger.info(f"⏱️ {stage}: {stats['bytes'] / 1024:.0f}KB")
+        if summary["counters"]:
+            logger.info(f"⏱️ counters: {summary['counters']}")
+
+    def to_emf(self, namespace: str, dimensions: dict = None) -> list:
+        """
+        Formats the summary as CloudWatch embedded metric format documents, one per stage. Written to the logs of an
+        ECS task they are turned into CloudWatch metrics without any calls to the CloudWatch API
+        :param namespace: The CloudWatch namespace of the metrics
+        :param dimensions: Optional extra {name: value} dimensions, e.g. {"Competition": "premier-league"}
+        :return: List of EMF documents
+        """
+        dimensions = dimensions or {}
+        timestamp = int(time.time() * 1000)
+        summary = self.get_summary()
+        documents = []
+        for stage, stats in summary["stages"].items():
+            metrics = {"Count": (stats["count"], "Count"), "Bytes": (stats["bytes"], "Bytes")}
+            if stats["count"]:
+                metrics.update({"TotalSeconds": (stats["total_seconds"], "Seconds"),
+                                "P50Seconds": (stats["p50_seconds"], "Seconds"),
+                                "P95Seconds": (stats["p95_seconds"], "Seconds")})
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": namespace,
+                        "Dimensions": [["Stage", *dimensions]],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()],
+                    }],
+                },
+                "Stage": stage,
+                **dimensions,
+            }
+            document.update({name: value for name, (value, _) in metrics.items()})
+            documents.append(document)
+        return documents
+
+    def write(self, path: str = None, output_format: str = "json", namespace: str = "football-etl",
+              dimensions: dict = None):
+        """
+        Writes the metrics as a json summary or as EMF json lines
+        :param path: File to write to, printed to stdout (the task's CloudWatch log stream) if not given
+        :param output_format: 'json' or 'emf'
+        :param namespace: The CloudWatch namespace of the EMF metrics
+        :param dimensions: Optional extra dimensions of the EMF metrics
+        """
+        if output_format == "emf":
+            output = "\n".join(json.dumps(document) for document in self.to_emf(namespace, dimensions))
+        else:
+            output = json.dumps(self.get_summary(), indent=2)
+
+        if path:
+            with open(path, "w") as f:
+                f.write(output + "\n")
+            logger.info(f"✅ Metrics written to {path}")
+        else:
+            print(output)
+
+
+# Shared by the scrapers and the s3 utils, summarised at the end of a run
+metrics = MetricsRecorder()
+
+
+def timed(stage: str):
+    """
+    Decorator that times every call of the function as the stage in the shared metrics
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile_run(profiler: str = None, path: str = None):
+    """
+    Profiles the code in the with block. Does nothing unless a profiler is given
+    :param profiler: 'cprofile' or 'pyinstrument' (requires pip install pyinstrument)
+    :param path: File to write the profile to: pstats for cProfile (open with snakeviz or pstats), html or text for
+    pyinstrument depending on the extension. Only the top functions are logged if not given
+    """
+    if not profiler:
+        yield
+        return
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("The pyinstrument profiler requires pip install pyinstrument") from e
+        session = Profiler()
+        session.start()
+        try:
+            yield
+        finally:
+            session.stop()
+            if path:
+                with open(path, "w") as f:
+                    f.write(session.output_html() if path.endswith(".html") else session.output_text())
+                logger.info(f"✅ Profile written to {path}")
+            else:
+                logger.info(session.output_text())
+        return
+
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        yield
+    finally:
+        session.disable()
+        if path:
+            session.dump_stats(path)
+            logger.info(f"✅ Profile written to {path}")
+        else:
+            stream = io.StringIO()
+            pstats.Stats(session, stream=stream).sort_stats("cumulative").print_stats(25)
+            logger.info(stream.getvalue())
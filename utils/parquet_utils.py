@@ -0,0 +1,228 @@
+import io
+import json
+import logging
+import re
+from pathlib import Path
+import pandas as pd
+from utils.s3_utils import list_s3_keys, read_json_from_s3, save_json_to_s3, update_json_in_s3
+
+logger = logging.getLogger(__name__)
+
+PARTITION_LIST_FILE_NAME = "_partitions.json"
+# The partition of the rows without a value, the name Hive, Athena and pyarrow read as null
+NULL_PARTITION_VALUE = "__HIVE_DEFAULT_PARTITION__"
+
+
+def format_partition_value(value) -> str:
+    """
+    Integer partition values are zero padded to 2 digits (gameweek=05) so partitions sort in order when listed.
+    Missing values are written to the null partition (gameweek=__HIVE_DEFAULT_PARTITION__)
+    """
+    if pd.isna(value):
+        return NULL_PARTITION_VALUE
+    try:
+        return f"{int(value):02d}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def build_partition_files(df, partition_cols: list, file_name: str, row_group_size: int = None,
+                          compression: str = "snappy") -> dict:
+    """
+    Splits the dataframe into hive style partitions (e.g. season=2024/gameweek=05/) and serializes each partition as a
+    parquet file. The partition columns are encoded in the path, so they are dropped from the files.
+    Column min/max statistics are written for every row group so readers can skip row groups as well as partitions.
+    Rows with a missing partition value are written to the null partition, see format_partition_value
+    :param df: The dataframe to write
+    :param partition_cols: The columns to partition by, in order
+    :param file_name: Name of the parquet file written in each partition
+    :param row_group_size: Maximum number of rows in each row group (defaults to pyarrow's default)
+    :param compression: Parquet compression codec ('snappy' or 'zstd')
+    :return: Dict of {relative path: parquet bytes}
+    """
+    # pyarrow is only imported by the runs that write parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    partition_files = {}
+    for partition_values, partition_df in df.groupby(partition_cols, sort=True, observed=True, dropna=False):
+        if not isinstance(partition_values, tuple):
+            partition_values = (partition_values,)
+
+        partition_path = "/".join(f"{col}={format_partition_value(value)}"
+                                  for col, value in zip(partition_cols, partition_values))
+        table = pa.Table.from_pandas(partition_df.drop(columns=partition_cols), preserve_index=False)
+
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, row_group_size=row_group_size, compression=compression, write_statistics=True)
+        partition_files[f"{partition_path}/{file_name}"] = buffer.getvalue()
+
+    return partition_files
+
+
+def merge_parquet_files(files: list, row_group_size: int = None, compression: str = "snappy") -> bytes:
+    """
+    Merges parquet files with the same schema (e.g. the files of a partition, see build_partition_files) into one file
+    :param files: The bytes of the files, in order
+    :param row_group_size: Maximum number of rows in each row group (defaults to pyarrow's default)
+    :param compression: Parquet compression codec ('snappy' or 'zstd')
+    :return: The bytes of the merged file
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.concat_tables([pq.read_table(io.BytesIO(data)) for data in files])
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=row_group_size, compression=compression, write_statistics=True)
+    return buffer.getvalue()
+
+
+def get_partition_list(keys: list, prefix: str) -> list:
+    """
+    Builds the list of partitions from the keys of the files in a partitioned dataset
+    :param keys: Keys (or relative paths) of the files in the dataset
+    :param prefix: The root of the dataset
+    :return: List of {"path": partition path, "values": {col: value}, "files": sorted file names} sorted by path
+    """
+    partitions = {}
+    for key in keys:
+        relative_key = key[len(prefix):].lstrip("/") if key.startswith(prefix) else key
+        if not relative_key.endswith(".parquet"):
+            continue
+        partition_path = relative_key.rsplit("/", 1)[0]
+        values = dict(re.findall(r"([^/=]+)=([^/]+)", partition_path))
+        if not values:
+            continue
+        partition = partitions.setdefault(partition_path, {"path": partition_path, "values": values, "files": []})
+        partition["files"].append(relative_key.rsplit("/", 1)[1])
+
+    return [{**partitions[path], "files": sorted(partitions[path]["files"])} for path in sorted(partitions)]
+
+
+def merge_partition_list(partitions: list, keys: list, prefix: str) -> list:
+    """
+    Adds the files to a partition list, see get_partition_list
+    :param partitions: The partitions of the list
+    :param keys: Keys (or relative paths) of the files to add
+    :param prefix: The root of the dataset
+    :return: The merged list of partitions sorted by path
+    """
+    merged = {partition["path"]: partition for partition in partitions}
+    for new_partition in get_partition_list(keys, prefix):
+        partition = merged.setdefault(new_partition["path"], {**new_partition, "files": []})
+        partition["files"] = sorted(set(partition["files"]) | set(new_partition["files"]))
+    return [merged[path] for path in sorted(merged)]
+
+
+def save_partitioned_parquet_to_s3(s3_client, df, bucket: str, prefix: str, partition_cols: list, file_name: str,
+                                   row_group_size: int = None, compression: str = "snappy") -> list:
+    """
+    Uploads a dataframe to S3 as a hive partitioned parquet dataset
+    :param s3_client: Boto3 S3 client
+    :param df: Pandas dataframe to upload
+    :param bucket: Name of the S3 bucket
+    :param prefix: The root of the dataset in the bucket (e.g. "raw/fbref_data/partitioned/")
+    :param partition_cols: The columns to partition by, in order
+    :param file_name: Name of the parquet file written in each partition
+    :param row_group_size: Maximum number of rows in each row group
+    :param compression: Parquet compression codec ('snappy' or 'zstd')
+    :return: The keys of the uploaded files
+    """
+    keys = []
+    for relative_path, data in build_partition_files(df, partition_cols, file_name, row_group_size,
+                                                     compression).items():
+        key = f"{prefix.rstrip('/')}/{relative_path}"
+        s3_client.put_object(Bucket=bucket, Key=key, Body=data, ContentType="application/vnd.apache.parquet")
+        logger.info(f"✅ File successfully uploaded to s3://{bucket}/{key}")
+        keys.append(key)
+    return keys
+
+
+def save_partitioned_parquet_locally(df, directory: str, partition_cols: list, file_name: str,
+                                     row_group_size: int = None, compression: str = "snappy") -> list:
+    """
+    Writes a dataframe to a local directory as a hive partitioned parquet dataset, e.g. to query with DuckDB
+    :return: The paths of the written files
+    """
+    paths = []
+    for relative_path, data in build_partition_files(df, partition_cols, file_name, row_group_size,
+                                                     compression).items():
+        path = Path(directory) / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        paths.append(str(path))
+    return paths
+
+
+def add_files_to_partition_list_in_s3(s3_client, bucket: str, prefix: str, keys: list) -> list:
+    """
+    Merges the files a write uploaded into the partition list file at the root of a partitioned dataset in S3, so
+    the dataset is not listed after every write. The list is replaced with a conditional put, so files added by
+    concurrent writers are not lost. A dataset without a partition list is listed once to create it
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param prefix: The root of the dataset in the bucket
+    :param keys: The keys of the files uploaded
+    :return: The list of partitions
+    """
+    def add_files(partition_list):
+        if partition_list is None:
+            return {"partitions": get_partition_list(list_s3_keys(s3_client, bucket, prefix), prefix)}
+        partition_list["partitions"] = merge_partition_list(partition_list["partitions"], keys, prefix)
+        return partition_list
+
+    return update_json_in_s3(s3_client, bucket=bucket, key=f"{prefix.rstrip('/')}/{PARTITION_LIST_FILE_NAME}",
+                             update=add_files)["partitions"]
+
+
+def update_partition_list_in_s3(s3_client, bucket: str, prefix: str) -> list:
+    """
+    Regenerates the partition list file at the root of a partitioned dataset in S3 from the files in the dataset.
+    This lists the whole dataset, use it once per run (e.g. after building the dataset) and
+    add_files_to_partition_list_in_s3 for incremental writes
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param prefix: The root of the dataset in the bucket
+    :return: The list of partitions
+    """
+    partitions = get_partition_list(list_s3_keys(s3_client, bucket, prefix), prefix)
+    save_json_to_s3(s3_client, {"partitions": partitions}, bucket=bucket,
+                    key=f"{prefix.rstrip('/')}/{PARTITION_LIST_FILE_NAME}")
+    return partitions
+
+
+def read_partitioned_parquet_from_s3(s3_client, bucket: str, prefix: str, partition_filter=None) -> pd.DataFrame:
+    """
+    Reads the files listed in the partition list of a partitioned dataset in S3. Files that are not listed (e.g.
+    merged by a compaction that has not been swapped in yet) are never read, so readers see a consistent dataset
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param prefix: The root of the dataset in the bucket
+    :param partition_filter: Optional function that takes the {col: value} of a partition and returns True to read it
+    :return: Dataframe with the partition columns added as strings (None for the null partition), in partition order
+    """
+    prefix = prefix.rstrip("/")
+    partition_list = read_json_from_s3(s3_client, bucket=bucket, key=f"{prefix}/{PARTITION_LIST_FILE_NAME}",
+                                       default={"partitions": []})
+    partition_dfs = []
+    for partition in partition_list["partitions"]:
+        if partition_filter and not partition_filter(partition["values"]):
+            continue
+        values = {col: None if value == NULL_PARTITION_VALUE else value for col, value in partition["values"].items()}
+        for file_name in partition["files"]:
+            data = s3_client.get_object(Bucket=bucket, Key=f"{prefix}/{partition['path']}/{file_name}")
+            partition_dfs.append(pd.read_parquet(io.BytesIO(data["Body"].read())).assign(**values))
+    return pd.concat(partition_dfs, ignore_index=True) if partition_dfs else pd.DataFrame()
+
+
+def update_partition_list_locally(directory: str) -> list:
+    """
+    Regenerates the partition list file at the root of a local partitioned dataset
+    :param directory: The root of the dataset
+    :return: The list of partitions
+    """
+    root = Path(directory)
+    keys = [path.relative_to(root).as_posix() for path in root.rglob("*.parquet")]
+    partitions = get_partition_list(keys, "")
+    (root / PARTITION_LIST_FILE_NAME).write_text(json.dumps({"partitions": partitions}), encoding="utf-8")
+    return partitions
@@ -0,0 +1,141 @@
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+# SQS accepts at most 10 messages in a batch
+SQS_MAX_BATCH_SIZE = 10
+
+
+class SqsWorkQueue:
+    """
+    Work queue backed by an SQS queue. A received message is hidden from other workers until its visibility timeout
+    expires, so a message that is not deleted (the worker failed or crashed) is delivered again. Messages that keep
+    failing are moved to the dead letter queue by the queue's redrive policy.
+    """
+
+    def __init__(self, sqs_client, queue_url: str, visibility_timeout: int = None, wait_time_seconds: int = 20):
+        """
+        :param sqs_client: Boto3 SQS client
+        :param queue_url: Url of the queue
+        :param visibility_timeout: Seconds a received message is leased to the worker, defaults to the queue's setting
+        :param wait_time_seconds: Seconds to long poll for when the queue is empty
+        """
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+        self.wait_time_seconds = wait_time_seconds
+
+    def send_messages(self, bodies: list) -> int:
+        """
+        :param bodies: json serializable message bodies
+        :return: The number of messages sent
+        """
+        for start in range(0, len(bodies), SQS_MAX_BATCH_SIZE):
+            entries = [{"Id": str(i), "MessageBody": json.dumps(body)}
+                       for i, body in enumerate(bodies[start:start + SQS_MAX_BATCH_SIZE])]
+            response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            if response.get("Failed"):
+                raise RuntimeError(f"Failed to send messages to {self.queue_url}: {response['Failed']}")
+        return len(bodies)
+
+    def receive_messages(self, max_messages: int = SQS_MAX_BATCH_SIZE) -> list:
+        """
+        Leases up to max_messages messages
+        :return: List of {"receipt_handle", "body"}
+        """
+        kwargs = {"VisibilityTimeout": self.visibility_timeout} if self.visibility_timeout else {}
+        response = self.sqs_client.receive_message(QueueUrl=self.queue_url,
+                                                   MaxNumberOfMessages=min(max_messages, SQS_MAX_BATCH_SIZE),
+                                                   WaitTimeSeconds=self.wait_time_seconds, **kwargs)
+        return [{"receipt_handle": message["ReceiptHandle"], "body": json.loads(message["Body"])}
+                for message in response.get("Messages", [])]
+
+    def delete_message(self, receipt_handle: str):
+        """
+        Deletes a message once it has been processed
+        """
+        self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt_handle)
+
+
+class SqliteWorkQueue:
+    """
+    Local stand-in for SqsWorkQueue stored in a SQLite file, so several worker processes on one machine can share a
+    queue. Receiving a message leases it for visibility_timeout seconds, and the lease is part of the receipt handle so
+    a worker whose lease expired cannot delete a message that was delivered to another worker. Messages that have
+    been received max_receives times without being deleted are no longer delivered (like a dead letter queue).
+    """
+
+    def __init__(self, path: str, visibility_timeout: int = 900, max_receives: int = 5):
+        """
+        :param path: Path of the SQLite database file
+        :param visibility_timeout: Seconds a received message is leased to the worker
+        :param max_receives: Number of times a message is delivered before it is given up on
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_receives = max_receives
+        with closing(self._connect()) as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS messages (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                               "body TEXT NOT NULL, visible_at REAL NOT NULL, receive_count INTEGER NOT NULL, "
+                               "lease TEXT)")
+
+    def _connect(self):
+        # Transactions are started explicitly, so a lease is claimed by one process at a time
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def send_messages(self, bodies: list) -> int:
+        """
+        :param bodies: json serializable message bodies
+        :return: The number of messages sent
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany("INSERT INTO messages (body, visible_at, receive_count) VALUES (?, ?, 0)",
+                                   [(json.dumps(body), now) for body in bodies])
+            connection.execute("COMMIT")
+        return len(bodies)
+
+    def receive_messages(self, max_messages: int = SQS_MAX_BATCH_SIZE) -> list:
+        """
+        Leases up to max_messages messages
+        :return: List of {"receipt_handle", "body"}
+        """
+        now = time.time()
+        lease = uuid.uuid4().hex
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute("SELECT id, body FROM messages WHERE visible_at <= ? AND receive_count < ? "
+                                      "ORDER BY id LIMIT ?", (now, self.max_receives, max_messages)).fetchall()
+            connection.executemany("UPDATE messages SET visible_at = ?, receive_count = receive_count + 1, lease = ? "
+                                   "WHERE id = ?", [(now + self.visibility_timeout, lease, row[0]) for row in rows])
+            connection.execute("COMMIT")
+        return [{"receipt_handle": f"{message_id}:{lease}", "body": json.loads(body)} for message_id, body in rows]
+
+    def delete_message(self, receipt_handle: str):
+        """
+        Deletes a message once it has been processed, if the worker still holds its lease
+        """
+        message_id, lease = receipt_handle.split(":")
+        with closing(self._connect()) as connection:
+            deleted = connection.execute("DELETE FROM messages WHERE id = ? AND lease = ?",
+                                         (int(message_id), lease)).rowcount
+        if not deleted:
+            logger.warning(f"Message {message_id} was not deleted, its lease has expired")
+
+    def get_summary(self) -> dict:
+        """
+        :return: Dict with the number of visible, in flight and dead messages
+        """
+        now = time.time()
+        with closing(self._connect()) as connection:
+            visible, in_flight, dead = connection.execute(
+                "SELECT COALESCE(SUM(receive_count < ? AND visible_at <= ?), 0), COALESCE(SUM(visible_at > ?), 0), "
+                "COALESCE(SUM(receive_count >= ? AND visible_at <= ?), 0) FROM messages",
+                (self.max_receives, now, now, self.max_receives, now)).fetchone()
+        return {"visible": visible, "in_flight": in_flight, "dead": dead}
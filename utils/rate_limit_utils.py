@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter that is safe to share between threads.
+    Tokens are added at a fixed rate up to the capacity of the bucket and every request takes one token. If the bucket
+    is empty the token is reserved anyway and the caller is told how long to wait for it, so concurrent callers are
+    spaced out by the refill rate instead of all waking up at the same time.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        :param rate: Number of tokens added per second
+        :param capacity: Maximum number of tokens the bucket can hold (the size of a burst)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token from the bucket
+        :return: The number of seconds the caller must wait before using the token
+        """
+        with self.lock:
+            now = self._refill()
+            self.tokens -= 1
+            # updated_at is in the future while the bucket is paused, tokens only start refilling after the pause
+            return (0.0 if self.tokens >= 0 else -self.tokens / self.rate) + (self.updated_at - now)
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+        return now
+
+    def set_rate(self, rate: float):
+        """
+        Changes the refill rate, the tokens added at the old rate are kept
+        """
+        with self.lock:
+            self._refill()
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """
+        Empties the bucket and stops it refilling for the number of seconds, so no request is allowed before the pause
+        ends and the requests after it are spaced out by the refill rate again
+        """
+        with self.lock:
+            now = self._refill()
+            self.tokens = min(self.tokens, 0)
+            self.updated_at = max(self.updated_at, now + seconds)
+
+
+class HostRateLimiter:
+    """
+    Keeps a separate token bucket for each host so requests to one website do not use up the budget of another
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1, host_limits: dict = None):
+        """
+        :param requests_per_minute: Default number of requests allowed per minute for each host
+        :param burst: Number of requests that can be made back to back before the rate limit applies
+        :param host_limits: Optional {host: requests_per_minute} overrides for specific hosts
+        """
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.host_limits = host_limits or {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def get_bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                requests_per_minute = self.host_limits.get(host, self.requests_per_minute)
+                self.buckets[host] = TokenBucket(rate=requests_per_minute / 60, capacity=self.burst)
+            return self.buckets[host]
+
+    def wait(self, url: str) -> float:
+        """
+        Blocks until a request to the url's host is allowed
+        :param url: The url about to be requested
+        :return: The number of seconds spent waiting
+        """
+        host = urlparse(url).netloc
+        delay = self.get_bucket(host).reserve()
+        if delay > 0:
+            logger.info(f"Rate limiting requests to {host}, waiting {delay:.1f}s")
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: str) -> float:
+        """
+        Waits without blocking the event loop until a request to the url's host is allowed, the buckets are shared
+        with the threads calling wait
+        :param url: The url about to be requested
+        :return: The number of seconds spent waiting
+        """
+        host = urlparse(url).netloc
+        delay = self.get_bucket(host).reserve()
+        if delay > 0:
+            logger.info(f"Rate limiting requests to {host}, waiting {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return delay
+
+
+# Responses telling the client to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(headers) -> float:
+    """
+    Reads the Retry-After header, which is either a number of seconds or a http date
+    :param headers: The response headers
+    :return: The number of seconds to wait, or None if the header is missing or invalid
+    """
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveHostRateLimiter(HostRateLimiter):
+    """
+    Host rate limiter that adapts the rate of each host to the responses of the host instead of assuming a worst case
+    constant (additive increase, multiplicative decrease):
+    1) Every healthy response raises the host's rate a little, up to max_requests_per_minute (the floor of the delay
+    between requests)
+    2) A 429 or 503 response cuts the rate by backoff_factor, down to min_requests_per_minute, and pauses the host for
+    its Retry-After, or for an exponential backoff with jitter if the host does not send one. Consecutive errors grow
+    the backoff, so concurrent workers do not all retry at the same time
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 1, host_limits: dict = None,
+                 min_requests_per_minute: float = 1, max_requests_per_minute: float = None,
+                 increase_per_success: float = 0.5, backoff_factor: float = 0.5, backoff_seconds: float = 5,
+                 max_backoff_seconds: float = 300):
+        """
+        :param requests_per_minute: Starting number of requests per minute for each host
+        :param burst: Number of requests that can be made back to back before the rate limit applies
+        :param host_limits: Optional {host: requests_per_minute} starting rates for specific hosts
+        :param min_requests_per_minute: The rate is never cut below this
+        :param max_requests_per_minute: The rate is never raised above this, defaults to the starting rate
+        :param increase_per_success: Requests per minute added to the rate after each healthy response
+        :param backoff_factor: The rate is multiplied by this after a 429 or 503 response
+        :param backoff_seconds: Pause after the first error without a Retry-After, doubled by each consecutive error
+        :param max_backoff_seconds: Maximum pause after an error
+        """
+        super().__init__(requests_per_minute, burst=burst, host_limits=host_limits)
+        self.min_requests_per_minute = min_requests_per_minute
+        self.max_requests_per_minute = max_requests_per_minute
+        self.increase_per_success = increase_per_success
+        self.backoff_factor = backoff_factor
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        # {host: {"requests_per_minute", "errors"}} with the current rate and number of consecutive errors of a host
+        self.host_states = {}
+
+    def get_host_state(self, host: str) -> dict:
+        with self.lock:
+            if host not in self.host_states:
+                self.host_states[host] = {"requests_per_minute": self.host_limits.get(host, self.requests_per_minute),
+                                          "errors": 0}
+            return self.host_states[host]
+
+    def get_backoff(self, errors: int, headers) -> float:
+        """
+        :param errors: Number of consecutive errors from the host
+        :param headers: The response headers
+        :return: The Retry-After of the response, or an exponential backoff with jitter
+        """
+        retry_after = parse_retry_after(headers)
+        if retry_after is not None:
+            # A little jitter on top so the workers waiting on the same Retry-After do not all wake up together
+            return min(self.max_backoff_seconds, retry_after) * random.uniform(1, 1.1)
+        backoff = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (errors - 1))
+        return random.uniform(backoff / 2, backoff)
+
+    def record_response(self, url: str, status_code: int, headers=None) -> float:
+        """
+        Adapts the rate of the url's host to a response
+        :param url: The url that was requested
+        :param status_code: The status code of the response
+        :param headers: The response headers, used for Retry-After
+        :return: The number of seconds the host is paused for, 0 unless the response was a 429 or 503
+        """
+        host = urlparse(url).netloc
+        bucket = self.get_bucket(host)
+        state = self.get_host_state(host)
+        max_requests_per_minute = self.max_requests_per_minute or self.host_limits.get(host, self.requests_per_minute)
+
+        with self.lock:
+            if status_code in THROTTLE_STATUS_CODES:
+                state["errors"] += 1
+                state["requests_per_minute"] = max(self.min_requests_per_minute,
+                                                   state["requests_per_minute"] * self.backoff_factor)
+                backoff = self.get_backoff(state["errors"], headers)
+            elif status_code < 400:
+                state["errors"] = 0
+                state["requests_per_minute"] = min(max_requests_per_minute,
+                                                   state["requests_per_minute"] + self.increase_per_success)
+                backoff = 0.0
+            else:
+                return 0.0
+            requests_per_minute = state["requests_per_minute"]
+
+        bucket.set_rate(requests_per_minute / 60)
+        if backoff:
+            bucket.pause(backoff)
+            logger.info(f"{host} responded {status_code}, backing off for {backoff:.1f}s and slowing down to "
+                        f"{requests_per_minute:.1f} requests per minute")
+        return backoff
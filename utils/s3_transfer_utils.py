@@ -0,0 +1,232 @@
+import asyncio
+import io
+import logging
+import threading
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# S3 requires every part of a multipart upload except the last to be at least 5MB
+MIN_PART_SIZE = 5 * 1024 ** 2
+DEFAULT_PART_SIZE = 8 * 1024 ** 2
+DEFAULT_MAX_POOL_CONNECTIONS = 20
+DEFAULT_MAX_CONCURRENCY = 10
+# Rows serialized at a time when streaming a dataframe as csv
+CSV_CHUNK_ROWS = 5000
+
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(profile_name: str = None, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+    """
+    Returns a shared S3 client for the profile and pool size, creating it the first time. boto3 clients are thread
+    safe, so one client (and its connection pool) is reused for every transfer instead of creating a client per call
+    :param profile_name: AWS profile to use, None uses the default credentials (e.g. the ECS task role)
+    :param max_pool_connections: Size of the connection pool, should be at least the number of concurrent transfers
+    :return: Boto3 S3 client
+    """
+    client_key = (profile_name, max_pool_connections)
+    with _s3_clients_lock:
+        if client_key not in _s3_clients:
+            session = boto3.Session(profile_name=profile_name)
+            config = Config(max_pool_connections=max_pool_connections, tcp_keepalive=True,
+                            retries={"max_attempts": 5, "mode": "standard"})
+            _s3_clients[client_key] = session.client("s3", config=config)
+        return _s3_clients[client_key]
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Writable file object that uploads to S3 as the data is written.
+    1) Written bytes are buffered until there is a full part, which is uploaded with upload_part
+    2) On close the remaining bytes are uploaded as the last part and the multipart upload is completed. The upload
+    is aborted if either fails
+    3) If less than one part was written in total, a single put_object is used instead
+    4) If an error is raised inside a `with` block the multipart upload is aborted, so no partial object is created
+    Only one part is held in memory at a time, no matter how much data is written.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 content_type: str = "binary/octet-stream"):
+        """
+        :param s3_client: Boto3 S3 client
+        :param bucket: Name of the S3 bucket
+        :param key: Key of the object to upload
+        :param part_size: Size of each uploaded part in bytes
+        :param content_type: Content type of the object
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def _upload_part(self, data):
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type)["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                              PartNumber=part_number, Body=data)
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def write(self, data):
+        self.buffer += data
+        self.bytes_written += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer),
+                                          ContentType=self.content_type)
+            else:
+                try:
+                    if self.buffer:
+                        self._upload_part(bytes(self.buffer))
+                    self.s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                                             UploadId=self.upload_id,
+                                                             MultipartUpload={"Parts": self.parts})
+                except Exception:
+                    # The uploaded parts are stored (and billed) until the upload is aborted
+                    self.abort()
+                    raise
+            self.buffer = bytearray()
+        finally:
+            super().close()
+
+    def abort(self):
+        """
+        Aborts the multipart upload, discarding any parts already uploaded
+        """
+        if self.upload_id is not None:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            logger.warning(f"Aborted multipart upload of s3://{self.bucket}/{self.key}")
+        self.buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def stream_dataframe_to_s3_as_csv(s3_client, df, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                                  chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+    """
+    Serializes a dataframe as csv a chunk of rows at a time, straight into a multipart upload
+    :param s3_client: Boto3 S3 client
+    :param df: Pandas dataframe to upload
+    :param bucket: Name of the S3 bucket
+    :param key: Key of the object to upload
+    :param part_size: Size of each uploaded part in bytes
+    :param chunk_rows: Number of rows serialized at a time
+    :return: Number of bytes uploaded
+    """
+    with S3MultipartWriter(s3_client, bucket, key, part_size=part_size, content_type="text/csv") as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            chunk_csv = df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0)
+            writer.write(chunk_csv.encode("utf-8"))
+        return writer.tell()
+
+
+def stream_dataframe_to_s3_as_parquet(s3_client, df, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                                      compression: str = "snappy") -> int:
+    """
+    Serializes a dataframe as parquet straight into a multipart upload, parts are uploaded as row groups are written
+    :return: Number of bytes uploaded
+    """
+    with S3MultipartWriter(s3_client, bucket, key, part_size=part_size,
+                           content_type="application/vnd.apache.parquet") as writer:
+        df.to_parquet(writer, index=False, compression=compression)
+        return writer.tell()
+
+
+def _does_file_exist(s3_client, bucket: str, key: str) -> bool:
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return False
+        raise
+
+
+async def _gather_with_limit(func, items, max_concurrency: int) -> list:
+    """
+    Runs the blocking func on each item in a thread, with at most max_concurrency running at once
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(item):
+        async with semaphore:
+            return await asyncio.to_thread(func, item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def upload_files_async(s3_client, bucket: str, files: dict, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                             content_type: str = "binary/octet-stream") -> list:
+    """
+    Uploads a batch of files concurrently
+    :param s3_client: Boto3 S3 client (shared between the transfers)
+    :param bucket: Name of the S3 bucket
+    :param files: Dict of {key: bytes}
+    :param max_concurrency: Maximum number of transfers running at once
+    :param content_type: Content type of the objects
+    :return: The uploaded keys
+    """
+    def upload(item):
+        key, body = item
+        s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
+        return key
+
+    return await _gather_with_limit(upload, list(files.items()), max_concurrency)
+
+
+async def download_files_async(s3_client, bucket: str, keys: list,
+                               max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> dict:
+    """
+    Downloads a batch of files concurrently
+    :return: Dict of {key: bytes}, missing files have the value None
+    """
+    def download(key):
+        try:
+            return s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    return dict(zip(keys, await _gather_with_limit(download, keys, max_concurrency)))
+
+
+async def do_files_exist_async(s3_client, bucket: str, keys: list,
+                               max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> dict:
+    """
+    Checks if a batch of files exist concurrently
+    :return: Dict of {key: True if the file exists}
+    """
+    return dict(zip(keys, await _gather_with_limit(lambda key: _does_file_exist(s3_client, bucket, key), keys,
+                                                   max_concurrency)))
@@ -1,10 +1,11 @@
+import copy
+import json
 import logging
 from botocore.exceptions import ClientError
-from io import StringIO
 import os
+from utils.s3_transfer_utils import stream_dataframe_to_s3_as_csv, stream_dataframe_to_s3_as_parquet
+from utils.metrics_utils import metrics, timed
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def is_running_in_aws() -> str:
@@ -21,6 +22,7 @@ def is_running_in_aws() -> str:
     """
     return os.getenv('APP_ENV', 'local')
 
+@timed("s3.does_file_exist_in_s3")
 def does_file_exist_in_s3(s3_client, bucket: str, key: str) -> bool:
     """
     Check if a file exists in a s3 bucket
@@ -44,6 +46,7 @@ def does_file_exist_in_s3(s3_client, bucket: str, key: str) -> bool:
         return False
 
 
+@timed("s3.save_data_to_s3_bucket_as_csv")
 def save_data_to_s3_bucket_as_csv(s3_client, df,  bucket: str, key: str, **kwargs):
     """
     Uploads a Pandas DataFrame to an S3 bucket as a CSV file.
@@ -55,21 +58,165 @@ def save_data_to_s3_bucket_as_csv(s3_client, df,  bucket: str, key: str, **kwarg
     :param kwargs: Additional formatting arguments for the key (e.g., season="2024-25")
     """
 
-    # Store csv in memory buffer
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
+    # Stream the csv into the upload a part at a time instead of building the whole file in memory
+    formatted_key = key.format(**kwargs)
+    num_bytes = stream_dataframe_to_s3_as_csv(s3_client, df, bucket=bucket, key=formatted_key)
+    metrics.add_bytes("s3.save_data_to_s3_bucket_as_csv", num_bytes)
+    logger.info(f"✅ File successfully uploaded to s3://{bucket}/{formatted_key}")
+
+
+@timed("s3.save_data_to_s3_bucket_as_parquet")
+def save_data_to_s3_bucket_as_parquet(s3_client, df, bucket: str, key: str, compression: str = "snappy", **kwargs):
+    """
+    Uploads a Pandas DataFrame to an S3 bucket as a Parquet file.
 
-    # Store in S3
+    :param s3_client: Boto3 S3 client
+    :param df: Pandas dataframe to upload as a parquet file
+    :param bucket: Name of the S3 bucket
+    :param key: S3 object key with placeholders (e.g., "data/{season}/matches.parquet")
+    :param compression: Parquet compression codec ('snappy' or 'zstd')
+    :param kwargs: Additional formatting arguments for the key (e.g., season="2024-25")
+    """
+
+    # Stream the parquet file into the upload as row groups are written
+    formatted_key = key.format(**kwargs)
+    num_bytes = stream_dataframe_to_s3_as_parquet(s3_client, df, bucket=bucket, key=formatted_key,
+                                                  compression=compression)
+    metrics.add_bytes("s3.save_data_to_s3_bucket_as_parquet", num_bytes)
+    logger.info(f"✅ File successfully uploaded to s3://{bucket}/{formatted_key}")
+
+
+@timed("s3.read_json_from_s3")
+def read_json_from_s3(s3_client, bucket: str, key: str, default=None):
+    """
+    Reads a json file stored in a S3 bucket
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param key: Path of the file in the bucket
+    :param default: Value to return if the file doesn't exist
+    :return: The parsed json, or default if the file doesn't exist
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return default
+        raise
+    body = response["Body"].read()
+    metrics.add_bytes("s3.read_json_from_s3", len(body))
+    return json.loads(body)
+
+
+@timed("s3.save_json_to_s3")
+def save_json_to_s3(s3_client, data, bucket: str, key: str):
+    """
+    Uploads a json serializable object to an S3 bucket as a json file
+    :param s3_client: Boto3 S3 client
+    :param data: The object to upload
+    :param bucket: Name of the S3 bucket
+    :param key: Path of the file in the bucket
+    """
+    body = json.dumps(data)
     s3_client.put_object(
         Bucket=bucket,
-        Key=key.format(**kwargs),
-        Body=csv_buffer.getvalue(),
-        ContentType="text/csv"
+        Key=key,
+        Body=body,
+        ContentType="application/json"
     )
-    formatted_key = key.format(**kwargs)
-    logger.info(f"✅ File successfully uploaded to s3://{bucket}/{formatted_key}")
+    metrics.add_bytes("s3.save_json_to_s3", len(body))
+    logger.info(f"✅ File successfully uploaded to s3://{bucket}/{key}")
+
+
+@timed("s3.update_json_in_s3")
+def update_json_in_s3(s3_client, bucket: str, key: str, update, default=None, max_attempts: int = 10):
+    """
+    Read-modify-write of a json file that is safe with several concurrent writers. The file is only replaced if it
+    has not changed since it was read (a conditional put on its ETag), otherwise it is read again and the update is
+    retried
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param key: Path of the file in the bucket
+    :param update: Function that takes the current json (or default if the file doesn't exist) and returns the new json
+    :param default: Value passed to update if the file doesn't exist
+    :param max_attempts: Number of times to retry when another writer changed the file first
+    :return: The json that was written
+    """
+    for attempt in range(max_attempts):
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            body = response["Body"].read()
+            metrics.add_bytes("s3.update_json_in_s3", len(body))
+            data = json.loads(body)
+            condition = {"IfMatch": response["ETag"]}
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                raise
+            data = copy.deepcopy(default)
+            condition = {"IfNoneMatch": "*"}
+
+        new_data = update(data)
+        body = json.dumps(new_data)
+        try:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/json", **condition)
+            metrics.add_bytes("s3.update_json_in_s3", len(body))
+            return new_data
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise
+            metrics.increment("s3.update_json_in_s3.conflicts")
+            logger.info(f"s3://{bucket}/{key} was changed by another writer, retrying update")
+
+    raise RuntimeError(f"Failed to update s3://{bucket}/{key} after {max_attempts} attempts")
+
+
+@timed("s3.list_s3_keys")
+def list_s3_keys(s3_client, bucket: str, prefix: str) -> list:
+    """
+    Lists the keys of every object under a prefix in a S3 bucket
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param prefix: The prefix to list
+    :return: List of keys
+    """
+    keys = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+
+@timed("s3.list_s3_object_sizes")
+def list_s3_object_sizes(s3_client, bucket: str, prefix: str) -> dict:
+    """
+    Lists the size of every object under a prefix in a S3 bucket
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param prefix: The prefix to list
+    :return: Dict of {key: size in bytes}
+    """
+    sizes = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        sizes.update((obj["Key"], obj["Size"]) for obj in page.get("Contents", []))
+    return sizes
+
+
+@timed("s3.delete_s3_objects")
+def delete_s3_objects(s3_client, bucket: str, keys: list):
+    """
+    Deletes the objects in batches of 1000 keys, the most a single request can delete
+    :param s3_client: Boto3 S3 client
+    :param bucket: Name of the S3 bucket
+    :param keys: The keys of the objects to delete
+    """
+    for start in range(0, len(keys), 1000):
+        response = s3_client.delete_objects(Bucket=bucket, Delete={
+            "Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True})
+        for error in response.get("Errors", []):
+            logger.error(f"❌ Failed to delete s3://{bucket}/{error['Key']}: {error['Message']}")
 
 
+@timed("s3.rename_file_in_s3")
 def rename_file_in_s3(s3_client, bucket: str, old_key: str, new_key):
     """
     Rename the object stored in S3
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from utils.s3_utils import read_json_from_s3, update_json_in_s3
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+SCHEDULED = "scheduled"
+
+# Cells of a schedule row that describe the match, a change to any of them (e.g. a corrected score) means the match
+# report has to be scraped again
+DIGEST_FIELDS = ["date", "home_team", "away_team", "score", "home_xg", "away_xg", "notes"]
+
+
+def get_fixture_key(row: dict) -> str:
+    """
+    Each pair of teams only hosts each other once in a season, so the teams identify a fixture even before it has a
+    match report (and a match id)
+    :param row: The schedule row dict created by the parser backend's get_schedule_rows
+    """
+    return f"{row['td'].get('home_team', '')} vs {row['td'].get('away_team', '')}"
+
+
+def build_schedule_entry(row: dict) -> dict:
+    """
+    Converts a schedule row to a compact entry of the schedule index
+    :param row: The schedule row dict created by the parser backend's get_schedule_rows
+    :return: Dict of {"match_id", "date", "gameweek", "match_url", "status", "score", "digest"}
+    """
+    cells = row["td"]
+    href = row["match_report_href"]
+    is_completed = bool(href) and cells.get("match_report") == "Match Report"
+    digest_values = [cells.get(field, "") for field in DIGEST_FIELDS] + [href or ""]
+    return {
+        # Match report urls look like /en/matches/<match id>/<description>
+        "match_id": href.split("/")[3] if is_completed else None,
+        "date": cells.get("date"),
+        "gameweek": row["th"].get("gameweek"),
+        "match_url": "https://fbref.com" + href if is_completed else None,
+        "status": COMPLETED if is_completed else SCHEDULED,
+        "score": cells.get("score"),
+        "digest": hashlib.sha1("|".join(digest_values).encode("utf-8")).hexdigest()[:16],
+    }
+
+
+class ScheduleIndex:
+    """
+    Compact copy of a season's scores and fixtures table that is kept between runs, so a new fetch of the schedule
+    only has to be diffed against it instead of walking every row for the matches after the last run.
+    The index is a json document of {"season": YYYY, "fixtures": {fixture key: entry}}, see build_schedule_entry. Each
+    entry also records the digest of the row when its match report was scraped ("scraped_digest"), so the pending
+    matches are the completed fixtures that were never scraped, or whose details changed after they were scraped
+    (e.g. a late score correction). Subclasses decide where the document is stored.
+    """
+
+    def __init__(self, season: int):
+        """
+        :param season: YYYY - the starting year of the season
+        """
+        self.season = season
+        data = self._read() or {}
+        self.fixtures = data.get("fixtures", {})
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _write(self, data: dict):
+        raise NotImplementedError
+
+    def save(self):
+        self._write({"season": self.season, "fixtures": self.fixtures})
+
+    def update(self, match_rows: list, start_date=None) -> dict:
+        """
+        Replaces the index with a new fetch of the schedule, keeping what has been scraped
+        On the first update of a season (an empty index) the completed matches before start_date are taken as already
+        scraped, as the previous runs wrote them without an index
+        :param match_rows: The schedule rows created by the parser backend's get_schedule_rows
+        :param start_date: The date the scraper would have started from without an index (In the format YYYY-MM-DD)
+        :return: Dict of {"completed": newly completed fixture keys, "changed": keys of scraped fixtures whose
+        details changed}
+        """
+        is_new_index = not self.fixtures
+        fixtures = {}
+        diff = {"completed": [], "changed": []}
+        for row in match_rows:
+            # Skip the spacer rows between gameweeks
+            if not row["td"].get("home_team"):
+                continue
+            key = get_fixture_key(row)
+            entry = build_schedule_entry(row)
+            previous = self.fixtures.get(key, {})
+            entry["scraped_digest"] = previous.get("scraped_digest")
+
+            if is_new_index and entry["status"] == COMPLETED and start_date and entry["date"] < start_date:
+                entry["scraped_digest"] = entry["digest"]
+            elif entry["status"] == COMPLETED and previous.get("status") != COMPLETED:
+                diff["completed"].append(key)
+            elif entry["scraped_digest"] and entry["scraped_digest"] != entry["digest"]:
+                diff["changed"].append(key)
+            fixtures[key] = entry
+
+        self.fixtures = fixtures
+        logger.info(f"Schedule index for season {self.season}: {len(diff['completed'])} newly completed and "
+                    f"{len(diff['changed'])} changed matches")
+        return diff
+
+    def get_pending(self, end_date=None) -> list:
+        """
+        :param end_date: Only return matches up to this date (inclusive) (In the format YYYY-MM-DD)
+        :return: The entries of the completed matches that still have to be scraped, in fixture order
+        """
+        return [entry for entry in self.fixtures.values()
+                if entry["status"] == COMPLETED and entry["scraped_digest"] != entry["digest"]
+                and not (end_date and entry["date"] > end_date)]
+
+    def get_changed_urls(self) -> set:
+        """
+        :return: The match urls of the scraped matches whose details changed since they were scraped
+        """
+        return {entry["match_url"] for entry in self.fixtures.values()
+                if entry["status"] == COMPLETED and entry["scraped_digest"]
+                and entry["scraped_digest"] != entry["digest"]}
+
+    def mark_scraped(self, match_urls: list):
+        """
+        Records the current details of the matches as scraped, this should only be called once their data is written
+        """
+        match_urls = set(match_urls)
+        for entry in self.fixtures.values():
+            if entry["match_url"] in match_urls:
+                entry["scraped_digest"] = entry["digest"]
+
+    def get_summary(self) -> dict:
+        """
+        :return: Dict of {"completed", "scheduled", "pending"} numbers of matches
+        """
+        summary = {COMPLETED: 0, SCHEDULED: 0, "pending": len(self.get_pending())}
+        for entry in self.fixtures.values():
+            summary[entry["status"]] += 1
+        return summary
+
+
+class LocalScheduleIndex(ScheduleIndex):
+    """
+    Schedule index stored as a json file in a local directory
+    """
+
+    def __init__(self, directory: str, season: int):
+        """
+        :param directory: Local directory the index files are stored in, one file per season
+        :param season: YYYY - the starting year of the season
+        """
+        self.path = Path(directory) / f"{season}-{season + 1}.schedule.json"
+        super().__init__(season)
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def _write(self, data: dict):
+        # Replace the file in one step so a crash never leaves a partial index
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class S3ScheduleIndex(ScheduleIndex):
+    """
+    Schedule index stored as a json object in S3
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, season: int):
+        """
+        :param s3_client: Boto3 S3 client
+        :param bucket: Name of the S3 bucket
+        :param key: Key of the index object
+        :param season: YYYY - the starting year of the season
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        super().__init__(season)
+
+    def _read(self):
+        return read_json_from_s3(self.s3_client, bucket=self.bucket, key=self.key)
+
+    def _write(self, data: dict):
+        """
+        Merges the index into the stored one, so the matches marked as scraped by concurrent writers of the season
+        (e.g. orchestrator workers) since this index was read are kept
+        """
+        def merge(stored):
+            stored_fixtures = (stored or {}).get("fixtures", {})
+            fixtures = {key: entry for key, entry in stored_fixtures.items() if key not in data["fixtures"]}
+            for key, entry in data["fixtures"].items():
+                stored_entry = stored_fixtures.get(key, {})
+                if entry["scraped_digest"] != entry["digest"] and stored_entry.get("scraped_digest") == entry["digest"]:
+                    # Another writer scraped the current details of the match
+                    entry = {**entry, "scraped_digest": entry["digest"]}
+                fixtures[key] = entry
+            return {**data, "fixtures": fixtures}
+
+        self.fixtures = update_json_in_s3(self.s3_client, bucket=self.bucket, key=self.key, update=merge)["fixtures"]
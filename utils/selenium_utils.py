@@ -0,0 +1,128 @@
+import atexit
+import logging
+import queue
+import threading
+
+# selenium is imported when a driver is first needed, most runs never fall back to it
+logger = logging.getLogger(__name__)
+
+CHROME_USER_AGENT = ("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                     "AppleWebKit/537.36 (KHTML, like Gecko) "
+                     "Chrome/116.0.5845.96 Safari/537.36")
+
+
+def get_chrome_options():
+    """
+    Creates the options used to run headless chrome in the docker image
+    :return: Chrome options
+    """
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # keep it headless if you want
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("start-maximized")
+    chrome_options.add_argument(CHROME_USER_AGENT)
+    return chrome_options
+
+
+def create_chrome_driver():
+    """
+    Launches a new headless chrome driver
+    :return: Chrome webdriver instance
+    """
+    from selenium import webdriver
+
+    return webdriver.Chrome(options=get_chrome_options())
+
+
+class ChromeDriverPool:
+    """
+    A pool of long-lived chrome drivers used to load pages when requests is blocked.
+    1) Drivers are only launched when a page is first requested and are reused for later urls
+    2) At most `size` drivers are in use at once, callers block until one is free
+    3) A driver is recycled (quit and replaced on the next request) after it has loaded `max_pages` pages, or if it
+    crashes while loading a page. A page that fails because of a crash is retried once with a fresh driver
+    4) All idle drivers are quit when the pool is closed, which happens automatically when the process exits
+    """
+
+    def __init__(self, size: int = 1, max_pages: int = 50, driver_factory=create_chrome_driver):
+        """
+        :param size: Maximum number of drivers running at once
+        :param max_pages: Number of pages a driver loads before it is recycled
+        :param driver_factory: Function that launches a new driver
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory
+        self.idle_drivers = queue.LifoQueue()
+        self.available = threading.BoundedSemaphore(size)
+        self.drivers_created = 0
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _checkout(self):
+        try:
+            return self.idle_drivers.get_nowait()
+        except queue.Empty:
+            logger.info("Launching new chrome driver")
+            driver = self.driver_factory()
+            with self.lock:
+                self.drivers_created += 1
+            return driver, 0
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit chrome driver: {e}")
+
+    def get_page_source(self, url: str) -> str:
+        """
+        Loads the url with a pooled driver
+        :param url: The url to load
+        :return: The html of the page
+        """
+        from selenium.common.exceptions import WebDriverException
+
+        with self.available:
+            for attempt in range(2):
+                driver, pages = self._checkout()
+                try:
+                    driver.get(url)
+                    html = driver.page_source
+                except WebDriverException as e:
+                    # The driver may have crashed, replace it and retry the page once
+                    logger.warning(f"Chrome driver failed to load {url}, recycling driver: {e}")
+                    self._quit(driver)
+                    if attempt:
+                        raise
+                    continue
+                except BaseException:
+                    # Anything else (e.g. a KeyboardInterrupt) leaves the driver in an unknown state, so it is not
+                    # returned to the pool
+                    self._quit(driver)
+                    raise
+
+                pages += 1
+                if pages >= self.max_pages:
+                    logger.info(f"Recycling chrome driver after {pages} pages")
+                    self._quit(driver)
+                else:
+                    self.idle_drivers.put((driver, pages))
+                return html
+
+    def close(self):
+        """
+        Quits all idle drivers in the pool
+        """
+        while True:
+            try:
+                driver, _ = self.idle_drivers.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)